@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking, BookingClosure, CancellationToken
+from .models import Booking, BookingClosure, CancellationToken, RecurringBooking, SlotHold
 
 
 class BookingClosureInline(admin.StackedInline):
@@ -49,3 +49,18 @@ class CancellationTokenAdmin(admin.ModelAdmin):
     list_display = ['token', 'booking', 'created_at']
     search_fields = ['token', 'booking__customer_name']
     readonly_fields = ['token', 'created_at']
+
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(admin.ModelAdmin):
+    list_display = ['customer_name', 'court', 'weekday', 'start_time', 'end_time', 'start_date', 'end_date', 'is_active']
+    list_filter = ['is_active', 'court', 'weekday']
+    search_fields = ['customer_name', 'customer_phone']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ['court', 'date', 'start_time', 'end_time', 'expires_at', 'created_at']
+    list_filter = ['court', 'date']
+    readonly_fields = ['token', 'created_at']
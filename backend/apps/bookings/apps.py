@@ -5,3 +5,7 @@ class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.bookings'
     verbose_name = 'Turnos'
+    
+    def ready(self):
+        import apps.bookings.checks
+        import apps.bookings.signals
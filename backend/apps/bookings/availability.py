@@ -0,0 +1,148 @@
+from datetime import timedelta
+from django.utils import timezone
+from .models import Booking, SlotHold
+
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def time_to_minutes(value):
+    """Convertir un time en minutos desde medianoche"""
+    return value.hour * 60 + value.minute
+
+
+def minutes_to_str(minutes):
+    """Formatear minutos desde medianoche como HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def interval_mask(start_minute, end_minute):
+    """
+    Máscara de bits para el intervalo [start_minute, end_minute)
+    El bit i representa el minuto i del día
+    """
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def past_cutoff(day, now):
+    """
+    Último minuto del día que ya pasó (-1 si el día es futuro)
+    Un slot que empieza en un minuto <= cutoff no se ofrece
+    """
+    today = now.date()
+    if day < today:
+        return MINUTES_PER_DAY
+    if day > today:
+        return -1
+    # Un slot que empieza exactamente ahora ya no está disponible
+    return now.hour * 60 + now.minute
+
+
+class AvailabilityEngine:
+    """
+    Motor de disponibilidad por bitmaps de ocupación
+
+    Cada cancha-día se representa como un entero donde cada bit es un minuto
+    del día. Un slot está libre si su máscara no se intersecta con el bitmap.
+    """
+
+    def __init__(self, config, now=None):
+        self.config = config
+        self.now = timezone.localtime(now or timezone.now())
+        self.grid = self.build_grid(config)
+
+    @staticmethod
+    def build_grid(config):
+        """
+        Grilla de slots del día como lista de (inicio, fin, máscara) en minutos
+        """
+        opening = time_to_minutes(config.opening_time)
+        closing = time_to_minutes(config.closing_time)
+        duration = config.slot_duration_minutes
+
+        grid = []
+        if duration <= 0:
+            return grid
+
+        start = opening
+        while start + duration <= closing:
+            end = start + duration
+            grid.append((start, end, interval_mask(start, end)))
+            start = end
+        return grid
+
+    @staticmethod
+    def build_occupancy(court_ids, date_from, date_to=None):
+        """
+        Bitmaps de ocupación {(court_id, date): int} en una sola query
+        """
+        date_to = date_to or date_from
+        bookings = Booking.objects.filter(
+            court_id__in=court_ids,
+            date__gte=date_from,
+            date__lte=date_to,
+        ).exclude(status='cancelled').values_list('court_id', 'date', 'start_time', 'end_time')
+
+        occupancy = {}
+        for court_id, day, start_time, end_time in bookings:
+            key = (court_id, day)
+            occupancy[key] = occupancy.get(key, 0) | interval_mask(
+                time_to_minutes(start_time), time_to_minutes(end_time)
+            )
+        return occupancy
+
+    @staticmethod
+    def add_live_holds(occupancy, court_ids, date_from, date_to=None, now=None):
+        """
+        Marcar como ocupados los horarios retenidos vigentes (SlotHold)
+        Devuelve el vencimiento más próximo (o None) para acotar el cache
+        """
+        date_to = date_to or date_from
+        holds = SlotHold.objects.filter(
+            court_id__in=court_ids,
+            date__gte=date_from,
+            date__lte=date_to,
+            expires_at__gt=now or timezone.now(),
+        ).values_list('court_id', 'date', 'start_time', 'end_time', 'expires_at')
+
+        earliest_expiry = None
+        for court_id, day, start_time, end_time, expires_at in holds:
+            key = (court_id, day)
+            occupancy[key] = occupancy.get(key, 0) | interval_mask(
+                time_to_minutes(start_time), time_to_minutes(end_time)
+            )
+            if earliest_expiry is None or expires_at < earliest_expiry:
+                earliest_expiry = expires_at
+        return earliest_expiry
+
+    def past_cutoff(self, day):
+        """Último minuto ya transcurrido del día (ver past_cutoff)"""
+        return past_cutoff(day, self.now)
+
+    def free_slots(self, bitmap):
+        """
+        Slots de la grilla sin ocupación, sin aplicar el corte de horarios pasados
+        (resultado cacheable: no depende de la hora actual)
+        """
+        return [not (bitmap & mask) for _start, _end, mask in self.grid]
+
+    def day_slots(self, day, bitmap):
+        """
+        Disponibilidad de la grilla para un bitmap de cancha-día
+        Devuelve lista de (inicio, fin, disponible)
+        """
+        cutoff = self.past_cutoff(day)
+        return [
+            (start, end, start > cutoff and not (bitmap & mask))
+            for start, end, mask in self.grid
+        ]
+
+    @staticmethod
+    def dates(date_from, date_to):
+        """Iterar las fechas del rango (inclusive)"""
+        day = date_from
+        while day <= date_to:
+            yield day
+            day += timedelta(days=1)
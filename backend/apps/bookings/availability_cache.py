@@ -0,0 +1,154 @@
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .counters import incr_counter, get_counters, reset_counters
+
+
+class AvailabilityCache:
+    """
+    Cache de disponibilidad por (fecha, cancha)
+
+    Guarda la ocupación calculada por BookingService.compute_day_availability,
+    sin el corte de horarios pasados (que se aplica al leer). Se invalida desde
+    las señales de Booking, Court y TimeSlotConfiguration (ver signals.py).
+
+    - Cada (fecha, cancha) y (fecha, todas las canchas) tiene una versión que
+      forma parte de la clave de sus entradas. Un cambio en un Booking
+      incrementa las dos versiones de su fecha y cancha.
+    - La versión se lee ANTES de calcular: si un turno se confirma mientras
+      se calcula, el resultado queda guardado con la versión vieja, que nadie
+      vuelve a leer (sin esto un borrado podía llegar antes del set y dejar
+      cacheado un horario ya tomado como libre).
+    - Un cambio en canchas o configuración incrementa la generación, lo que
+      invalida todas las entradas de una vez.
+    """
+    PREFIX = 'availability'
+    GENERATION_KEY = f'{PREFIX}:generation'
+    VERSION_PREFIX = f'{PREFIX}:version'
+    HITS_KEY = f'{PREFIX}:hits'
+    MISSES_KEY = f'{PREFIX}:misses'
+    ALL_COURTS = 'all'
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 3600)
+
+    @staticmethod
+    def fresh_version():
+        # Un valor nuevo (milisegundos) nunca coincide con uno anterior, así
+        # una clave de versión perdida no reutiliza entradas viejas
+        return int(time.time() * 1000)
+
+    @classmethod
+    def generation(cls):
+        generation = cache.get(cls.GENERATION_KEY)
+        if generation is None:
+            cache.add(cls.GENERATION_KEY, cls.fresh_version(), timeout=None)
+            generation = cache.get(cls.GENERATION_KEY)
+        return generation
+
+    @classmethod
+    def court_key(cls, court_id):
+        # int(): '02' y 2 son la misma cancha y tienen que compartir clave
+        return int(court_id) if court_id else cls.ALL_COURTS
+
+    @classmethod
+    def version_key(cls, date, court_id=None):
+        return f'{cls.VERSION_PREFIX}:{date.isoformat()}:{cls.court_key(court_id)}'
+
+    @classmethod
+    def key(cls, date, court_id=None):
+        """Clave actual de la entrada (generación y versión en una lectura)"""
+        version_key = cls.version_key(date, court_id)
+        values = cache.get_many([cls.GENERATION_KEY, version_key])
+        generation = values.get(cls.GENERATION_KEY)
+        if generation is None:
+            generation = cls.generation()
+        version = values.get(version_key)
+        if version is None:
+            # La versión puede vencer: las entradas que la usaban quedan
+            # inalcanzables porque el valor nuevo es siempre distinto
+            cache.add(version_key, cls.fresh_version(), timeout=2 * cls.timeout())
+            version = cache.get(version_key)
+        return f'{cls.PREFIX}:{generation}:{date.isoformat()}:{cls.court_key(court_id)}:{version}'
+
+    @classmethod
+    def lookup(cls, date, court_id=None):
+        """
+        (valor o None, clave con la que guardarlo)
+        La clave se pasa a store() después de calcular el valor
+        """
+        key = cls.key(date, court_id)
+        value = cache.get(key)
+        incr_counter(cls.HITS_KEY if value is not None else cls.MISSES_KEY)
+        return value, key
+
+    @classmethod
+    def get(cls, date, court_id=None):
+        return cls.lookup(date, court_id)[0]
+
+    @classmethod
+    def store(cls, key, value, expires_at=None):
+        """
+        Guardar la disponibilidad con la clave obtenida en lookup(); si
+        incluye retenciones, la entrada vence junto con la retención más
+        próxima a vencer
+        """
+        timeout = cls.timeout()
+        if expires_at is not None:
+            remaining = math.ceil((expires_at - timezone.now()).total_seconds())
+            timeout = max(1, min(timeout, remaining))
+        cache.add(key, value, timeout=timeout)
+
+    @classmethod
+    def bump(cls, date, court_id=None):
+        version_key = cls.version_key(date, court_id)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.add(version_key, cls.fresh_version(), timeout=2 * cls.timeout())
+
+    @classmethod
+    def invalidate(cls, date, court_id):
+        """Invalidar la disponibilidad de una cancha-día"""
+        cls.bump(date, court_id)
+        cls.bump(date)
+
+    @classmethod
+    def invalidate_on_commit(cls, date, court_id):
+        """
+        Invalidar inmediatamente (lecturas dentro de la misma transacción) y
+        de nuevo al confirmarla: las lecturas que empezaron antes del commit
+        guardan con una versión que deja de usarse
+        """
+        cls.invalidate(date, court_id)
+        transaction.on_commit(lambda: cls.invalidate(date, court_id))
+
+    @classmethod
+    def invalidate_all(cls):
+        """Invalidar toda la disponibilidad (cambio de canchas o configuración)"""
+        generation = cls.generation()
+        try:
+            cache.incr(cls.GENERATION_KEY)
+        except ValueError:
+            cache.set(cls.GENERATION_KEY, generation + 1, timeout=None)
+
+    @classmethod
+    def stats(cls):
+        """Contadores de hits/misses para verificar el hit ratio"""
+        counters = get_counters(cls.HITS_KEY, cls.MISSES_KEY)
+        hits = counters[cls.HITS_KEY]
+        misses = counters[cls.MISSES_KEY]
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        reset_counters(cls.HITS_KEY, cls.MISSES_KEY)
@@ -0,0 +1,137 @@
+import base64
+import pickle
+import random
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.db import DatabaseCache as BaseDatabaseCache
+from django.db import connections, router, transaction
+from django.utils.timezone import now as tz_now
+
+
+class DatabaseCache(BaseDatabaseCache):
+    """
+    Cache compartido por todos los workers sobre PostgreSQL, sin servicios externos
+
+    Usa la tabla creada por la migración bookings 0009 (UNLOGGED, con
+    fillfactor para updates HOT e índice por expires). Respecto del
+    DatabaseCache de Django:
+    - set/add son un único INSERT ... ON CONFLICT: sin COUNT(*) por escritura
+      y add es atómico (solo un worker gana la clave)
+    - incr bloquea la fila, así dos workers no pierden incrementos
+    - Las entradas vencidas se borran en lotes, en una de cada CULL_EVERY
+      escrituras (fuera de transacciones) o con `manage.py cull_cache`
+
+    Opciones (OPTIONS): MAX_ENTRIES, CULL_FREQUENCY, CULL_EVERY, CULL_BATCH_SIZE
+    """
+
+    def __init__(self, table, params):
+        super().__init__(table, params)
+        options = params.get('OPTIONS', {})
+        self._cull_every = int(options.get('CULL_EVERY', 200))
+        self._cull_batch_size = int(options.get('CULL_BATCH_SIZE', 1000))
+
+    def _connection(self):
+        return connections[router.db_for_write(self.cache_model_class)]
+
+    def _encode(self, value):
+        return base64.b64encode(pickle.dumps(value, self.pickle_protocol)).decode('latin1')
+
+    def _expires(self, timeout):
+        if timeout is None:
+            expires = datetime.max
+        else:
+            expires = datetime.fromtimestamp(timeout, tz=timezone.utc if settings.USE_TZ else None)
+        return expires.replace(microsecond=0)
+
+    def _base_set(self, mode, key, value, timeout=DEFAULT_TIMEOUT):
+        connection = self._connection()
+        adapt = connection.ops.adapt_datetimefield_value
+        table = connection.ops.quote_name(self._table)
+        expires = adapt(self._expires(self.get_backend_timeout(timeout)))
+        now = adapt(tz_now().replace(microsecond=0))
+
+        with connection.cursor() as cursor:
+            if mode == 'touch':
+                cursor.execute(
+                    f'UPDATE {table} SET expires = %s WHERE cache_key = %s AND expires >= %s',
+                    [expires, key, now]
+                )
+            else:
+                # add solo reemplaza una entrada vencida; set siempre
+                condition = f'WHERE {table}.expires < %s' if mode == 'add' else ''
+                cursor.execute(
+                    f'INSERT INTO {table} (cache_key, value, expires) VALUES (%s, %s, %s) '
+                    f'ON CONFLICT (cache_key) DO UPDATE '
+                    f'SET value = EXCLUDED.value, expires = EXCLUDED.expires {condition}',
+                    [key, self._encode(value), expires] + ([now] if mode == 'add' else [])
+                )
+            written = cursor.rowcount > 0
+
+        if mode != 'touch' and self._cull_every and random.randrange(self._cull_every) == 0:
+            self.cull(max_batches=1)
+        return written
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        table = connection.ops.quote_name(self._table)
+        now = connection.ops.adapt_datetimefield_value(tz_now().replace(microsecond=0))
+
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT value FROM {table} WHERE cache_key = %s AND expires >= %s FOR UPDATE',
+                [key, now]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found.")
+            value = pickle.loads(base64.b64decode(row[0].encode())) + delta
+            cursor.execute(
+                f'UPDATE {table} SET value = %s WHERE cache_key = %s',
+                [self._encode(value), key]
+            )
+        return value
+
+    def cull(self, batch_size=None, max_batches=None):
+        """
+        Borrar entradas vencidas en lotes de batch_size (y las más próximas a
+        vencer si se supera MAX_ENTRIES). Cada lote es un DELETE corto que
+        saltea las filas bloqueadas por otro worker.
+        Dentro de una transacción no hace nada, para no retener los locks.
+        Devuelve la cantidad de entradas borradas
+        """
+        connection = self._connection()
+        if connection.in_atomic_block:
+            return 0
+
+        batch_size = batch_size or self._cull_batch_size
+        table = connection.ops.quote_name(self._table)
+        now = connection.ops.adapt_datetimefield_value(tz_now().replace(microsecond=0))
+        deleted = batches = 0
+
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE cache_key IN ('
+                    f'SELECT cache_key FROM {table} WHERE expires < %s '
+                    f'ORDER BY expires LIMIT %s FOR UPDATE SKIP LOCKED)',
+                    [now, batch_size]
+                )
+                deleted += cursor.rowcount
+                batches += 1
+                if cursor.rowcount < batch_size or (max_batches and batches >= max_batches):
+                    break
+
+            # Solo acá se cuenta la tabla, no en cada escritura
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            count = cursor.fetchone()[0]
+            if count > self._max_entries:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE cache_key IN ('
+                    f'SELECT cache_key FROM {table} ORDER BY expires LIMIT %s FOR UPDATE SKIP LOCKED)',
+                    [count // self._cull_frequency if self._cull_frequency else count]
+                )
+                deleted += cursor.rowcount
+        return deleted
@@ -0,0 +1,18 @@
+from django.core import checks
+from django.db import connections
+
+
+@checks.register()
+def check_postgresql(app_configs, **kwargs):
+    """
+    Los turnos dependen de PostgreSQL: constraint de exclusión con btree_gist,
+    advisory locks, SKIP LOCKED, LISTEN/NOTIFY y el cache sobre tabla UNLOGGED
+    """
+    vendor = connections['default'].vendor
+    if vendor == 'postgresql':
+        return []
+    return [checks.Error(
+        f'padelApp requiere PostgreSQL (motor configurado: {vendor})',
+        hint='Configurá DATABASES["default"] con django.db.backends.postgresql.',
+        id='bookings.E001',
+    )]
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Incrementos de este proceso todavía no volcados al cache compartido
+_pending = defaultdict(int)
+_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def flush_interval():
+    return getattr(settings, 'COUNTERS_FLUSH_INTERVAL', 10)
+
+
+def incr_counter(key, delta=1):
+    """
+    Incrementar un contador (sin expiración)
+    Se acumula en memoria del proceso y se vuelca al cache compartido como
+    mucho cada COUNTERS_FLUSH_INTERVAL segundos, un incr por clave: con el
+    cache en la base, incrementar en cada llamada es un UPDATE de la misma
+    fila desde todos los workers. Nunca se vuelca dentro de una transacción,
+    para no retener el lock de la fila del contador hasta el commit.
+    """
+    with _lock:
+        _pending[key] += delta
+    if time.monotonic() - _flushed_at >= flush_interval() and not transaction.get_connection().in_atomic_block:
+        flush_counters()
+
+
+def flush_counters():
+    """Volcar los incrementos pendientes de este proceso al cache compartido"""
+    global _flushed_at
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    for key, delta in pending.items():
+        _incr(key, delta)
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # La clave no existe todavía
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def get_counters(*keys):
+    """
+    Leer varios contadores (0 si no existen)
+    Suma lo volcado por todos los workers más lo pendiente de este proceso
+    """
+    values = cache.get_many(keys)
+    with _lock:
+        return {key: values.get(key, 0) + _pending.get(key, 0) for key in keys}
+
+
+def reset_counters(*keys):
+    """Poner en cero varios contadores (compartidos y pendientes locales)"""
+    with _lock:
+        for key in keys:
+            _pending.pop(key, None)
+    cache.delete_many(keys)
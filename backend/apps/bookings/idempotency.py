@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyService:
+    """
+    Reintentos seguros con la cabecera Idempotency-Key
+
+    La primera solicitud inserta la clave y ejecuta la operación dentro de la
+    misma transacción. Un reintento concurrente queda bloqueado en el índice
+    único hasta que la primera confirma, y luego recibe la respuesta guardada
+    sin volver a ejecutar el servicio. Solo se guardan respuestas exitosas
+    (2xx): ante un error la clave se descarta y el cliente puede reintentar.
+    """
+
+    @staticmethod
+    def ttl():
+        return timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+    @staticmethod
+    def request_hash(request):
+        """Hash de método, ruta y cuerpo para detectar claves reutilizadas"""
+        data = request.data
+        if hasattr(data, 'lists'):
+            data = dict(data.lists())
+        payload = json.dumps(data, sort_keys=True, default=str)
+        raw = f'{request.method} {request.path}\n{payload}'
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def replay(record):
+        return Response(
+            record.response_body,
+            status=record.status_code,
+            headers={REPLAYED_HEADER: 'true'},
+        )
+
+    @classmethod
+    def execute(cls, request, scope, handler):
+        """
+        Ejecutar handler() una sola vez por (scope, clave, usuario)
+        Sin cabecera Idempotency-Key se ejecuta normalmente
+        """
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler()
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'La cabecera {IDEMPOTENCY_HEADER} no puede superar {MAX_KEY_LENGTH} caracteres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user if request.user.is_authenticated else None
+        request_hash = cls.request_hash(request)
+        lookup = {'scope': scope, 'key': key, 'user': user}
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(request_hash=request_hash, **lookup)
+            except IntegrityError:
+                record = IdempotencyKey.objects.select_for_update().get(**lookup)
+                if record.created_at > timezone.now() - cls.ttl():
+                    if record.request_hash != request_hash:
+                        return Response(
+                            {'error': f'La cabecera {IDEMPOTENCY_HEADER} ya se usó con otra solicitud'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                        )
+                    return cls.replay(record)
+                # Clave vencida todavía no purgada: se reutiliza como nueva
+                record.delete()
+                record = IdempotencyKey.objects.create(request_hash=request_hash, **lookup)
+
+            response = handler()
+
+            if status.is_success(response.status_code):
+                record.status_code = response.status_code
+                record.response_body = response.data
+                record.save(update_fields=['status_code', 'response_body'])
+            else:
+                record.delete()
+            return response
+
+    @classmethod
+    def purge_expired(cls, batch_size=1000, now=None):
+        """
+        Borrar claves vencidas en lotes de batch_size
+        Cada lote es un DELETE corto para no bloquear la tabla
+        """
+        cutoff = (now or timezone.now()) - cls.ttl()
+        deleted = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(created_at__lte=cutoff)
+                .order_by('created_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            count, _ = IdempotencyKey.objects.filter(id__in=ids).delete()
+            deleted += count
+
+
+def idempotent(scope):
+    """
+    Decorador para vistas de DRF (funciones o métodos de ViewSet)
+    Debe aplicarse debajo de @api_view / @action
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            return IdempotencyService.execute(request, scope, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+import time
+from django.db import connection
+from .counters import incr_counter, get_counters, reset_counters
+
+
+class CourtDayLock:
+    """
+    Lock transaccional por (cancha, día) para operaciones que cambian turnos
+
+    En PostgreSQL usa pg_advisory_xact_lock(court_id, ordinal de la fecha): se
+    libera solo al terminar la transacción, por lo que debe tomarse dentro de
+    un transaction.atomic. Siempre se toma ANTES de cualquier lock de fila
+    (select_for_update) para mantener un orden consistente y evitar deadlocks.
+
+    Registra métricas de contención (ver stats()).
+    """
+    PREFIX = 'court_day_lock'
+    ACQUIRED_KEY = f'{PREFIX}:acquired'
+    CONTENDED_KEY = f'{PREFIX}:contended'
+    WAIT_MS_KEY = f'{PREFIX}:wait_ms'
+
+    @classmethod
+    def acquire(cls, court_id, date):
+        """
+        Tomar el lock de la cancha-día dentro de la transacción actual
+        """
+        if not connection.in_atomic_block:
+            raise RuntimeError('CourtDayLock.acquire debe usarse dentro de transaction.atomic')
+
+        key = (int(court_id), date.toordinal())
+        with connection.cursor() as cursor:
+            # Intento sin espera: el caso normal no paga el costo de medir
+            cursor.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', key)
+            acquired = cursor.fetchone()[0]
+            if not acquired:
+                started = time.monotonic()
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', key)
+                waited_ms = int((time.monotonic() - started) * 1000)
+                incr_counter(cls.CONTENDED_KEY)
+                incr_counter(cls.WAIT_MS_KEY, waited_ms)
+
+        incr_counter(cls.ACQUIRED_KEY)
+
+    @classmethod
+    def stats(cls):
+        """Métricas de contención de locks por cancha-día"""
+        counters = get_counters(cls.ACQUIRED_KEY, cls.CONTENDED_KEY, cls.WAIT_MS_KEY)
+        acquired = counters[cls.ACQUIRED_KEY]
+        contended = counters[cls.CONTENDED_KEY]
+        wait_ms = counters[cls.WAIT_MS_KEY]
+        return {
+            'acquired': acquired,
+            'contended': contended,
+            'contention_ratio': round(contended / acquired, 4) if acquired else None,
+            'total_wait_ms': wait_ms,
+            'avg_wait_ms': round(wait_ms / contended, 1) if contended else None,
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        reset_counters(cls.ACQUIRED_KEY, cls.CONTENDED_KEY, cls.WAIT_MS_KEY)
@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Borrar en lotes las entradas vencidas del cache en la base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de entradas borradas por lote (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        cache = caches['default']
+        if not hasattr(cache, 'cull'):
+            self.stdout.write(f'El cache {cache.__class__.__name__} vence sus entradas solo')
+            return
+        deleted = cache.cull(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Entradas de cache borradas: {deleted}'))
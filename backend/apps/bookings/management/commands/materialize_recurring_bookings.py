@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.bookings.services import RecurringBookingService
+
+
+class Command(BaseCommand):
+    help = 'Materializar los turnos fijos activos hasta N semanas adelante (correr todas las noches)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=settings.RECURRING_BOOKINGS_WEEKS_AHEAD,
+            help='Semanas hacia adelante a materializar',
+        )
+
+    def handle(self, *args, **options):
+        result = RecurringBookingService.materialize(weeks=options['weeks'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Turnos creados: {result['created']} - ya existentes: {result['skipped']}"
+        ))
+        for conflict in result['conflicts']:
+            self.stdout.write(self.style.WARNING(
+                f"  Conflicto: {conflict['customer_name']} - {conflict['court_name']} "
+                f"{conflict['date']} {conflict['start_time']}-{conflict['end_time']}: {conflict['error']}"
+            ))
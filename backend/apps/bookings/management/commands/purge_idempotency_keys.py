@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.bookings.idempotency import IdempotencyService
+
+
+class Command(BaseCommand):
+    help = 'Borrar en lotes las claves Idempotency-Key vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de claves borradas por lote (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyService.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Claves de idempotencia borradas: {deleted}'))
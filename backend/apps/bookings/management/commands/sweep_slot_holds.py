@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.bookings.services import SlotHoldService
+
+
+class Command(BaseCommand):
+    help = 'Borrar en lote las retenciones de horarios vencidas'
+
+    def handle(self, *args, **options):
+        deleted = SlotHoldService.sweep_expired()
+        self.stdout.write(self.style.SUCCESS(f'Retenciones vencidas borradas: {deleted}'))
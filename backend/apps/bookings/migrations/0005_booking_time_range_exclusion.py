@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:55
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+def require_postgresql(apps, schema_editor):
+    """El rango generado y la constraint de exclusión solo existen en PostgreSQL"""
+    vendor = schema_editor.connection.vendor
+    if vendor != 'postgresql':
+        raise RuntimeError(f'padelApp requiere PostgreSQL (motor configurado: {vendor})')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_remove_bookingclosure_payment_method_and_more'),
+        ('courts', '0002_timeslotconfiguration_court_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(require_postgresql, migrations.RunPython.noop),
+        BtreeGistExtension(),
+        migrations.AlterUniqueTogether(
+            name='booking',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='time_range',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.functions.datetime.ExtractHour('start_time'), models.IntegerField()), '*', models.Value(60)), '+', django.db.models.functions.comparison.Cast(django.db.models.functions.datetime.ExtractMinute('start_time'), models.IntegerField())), django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.functions.datetime.ExtractHour('end_time'), models.IntegerField()), '*', models.Value(60)), '+', django.db.models.functions.comparison.Cast(django.db.models.functions.datetime.ExtractMinute('end_time'), models.IntegerField())), function='INT4RANGE', output_field=django.contrib.postgres.fields.ranges.IntegerRangeField()), output_field=django.contrib.postgres.fields.ranges.IntegerRangeField(), verbose_name='Rango horario'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), expressions=[('court', '='), ('date', '='), ('time_range', '&&')], name='booking_no_overlap'),
+        ),
+    ]
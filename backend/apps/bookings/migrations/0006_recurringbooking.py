@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_time_range_exclusion'),
+        ('courts', '0002_timeslotconfiguration_court_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día de la semana')),
+                ('start_time', models.TimeField(verbose_name='Hora inicio')),
+                ('end_time', models.TimeField(verbose_name='Hora fin')),
+                ('start_date', models.DateField(verbose_name='Vigente desde')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Vigente hasta')),
+                ('customer_name', models.CharField(max_length=200, verbose_name='Nombre del cliente')),
+                ('customer_phone', models.CharField(blank=True, max_length=50, verbose_name='Teléfono del cliente')),
+                ('notes', models.TextField(blank=True, verbose_name='Notas')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to='courts.court', verbose_name='Cancha')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_bookings_created', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Turno Fijo',
+                'verbose_name_plural': 'Turnos Fijos',
+                'ordering': ['weekday', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='recurring_booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='bookings.recurringbooking', verbose_name='Turno fijo'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringbooking',
+            index=models.Index(fields=['is_active', 'court'], name='bookings_re_is_acti_5d3ab5_idx'),
+        ),
+    ]
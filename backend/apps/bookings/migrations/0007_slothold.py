@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_recurringbooking'),
+        ('courts', '0002_timeslotconfiguration_court_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('start_time', models.TimeField(verbose_name='Hora inicio')),
+                ('end_time', models.TimeField(verbose_name='Hora fin')),
+                ('token', models.CharField(max_length=32, unique=True, verbose_name='Código de retención')),
+                ('expires_at', models.DateTimeField(verbose_name='Vence')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='courts.court', verbose_name='Cancha')),
+            ],
+            options={
+                'verbose_name': 'Retención de Horario',
+                'verbose_name_plural': 'Retenciones de Horarios',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['court', 'date', 'expires_at'], name='bookings_sl_court_i_60fd26_idx'), models.Index(fields=['expires_at'], name='bookings_sl_expires_640215_idx')],
+            },
+        ),
+    ]
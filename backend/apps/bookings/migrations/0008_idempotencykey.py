@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:31
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_slothold'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, verbose_name='Operación')),
+                ('key', models.CharField(max_length=255, verbose_name='Clave')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='Hash de la solicitud')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código de respuesta')),
+                ('response_body', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Respuesta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Clave de Idempotencia',
+                'verbose_name_plural': 'Claves de Idempotencia',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='bookings_id_created_ad5b56_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('scope', 'key', 'user'), name='idempotency_key_unique', nulls_distinct=False),
+        ),
+    ]
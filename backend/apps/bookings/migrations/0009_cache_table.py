@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Infraestructura del proyecto (no del modelo de turnos): vive en bookings
+# porque el backend del cache compartido es apps.bookings.cache_backend
+CACHE_BACKEND = 'apps.bookings.cache_backend.DatabaseCache'
+
+
+def cache_table():
+    """Tabla configurada en CACHES['default'], o None si no se usa el cache en la base"""
+    default = settings.CACHES.get('default', {})
+    if default.get('BACKEND') != CACHE_BACKEND:
+        return None
+    return default['LOCATION']
+
+
+def create_cache_table(apps, schema_editor):
+    table = cache_table()
+    if table is None or schema_editor.connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f'CREATE UNLOGGED TABLE IF NOT EXISTS {quote(table)} ('
+        'cache_key varchar(255) NOT NULL PRIMARY KEY, '
+        'value text NOT NULL, '
+        'expires timestamp with time zone NOT NULL'
+        ') WITH (fillfactor = 70)'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {quote(table + "_expires")} ON {quote(table)} (expires)'
+    )
+
+
+def drop_cache_table(apps, schema_editor):
+    table = cache_table()
+    if table is None or schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {schema_editor.quote_name(table)}')
+
+
+class Migration(migrations.Migration):
+    """
+    Tabla del cache compartido (ver apps.bookings.cache_backend)
+    UNLOGGED: no escribe WAL (si la base se cae se vacía, como un cache);
+    fillfactor 70 deja lugar para que los UPDATE de contadores sean HOT.
+    El nombre sale de CACHES['default']['LOCATION']; con Redis no se crea.
+    """
+
+    dependencies = [
+        ('bookings', '0008_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, drop_cache_table),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'start_time', 'id'], name='bookings_bo_date_a4a46e_idx'),
+        ),
+    ]
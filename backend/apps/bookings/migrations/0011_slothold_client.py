@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_booking_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slothold',
+            name='client',
+            field=models.CharField(blank=True, help_text='Identificador del cliente que retuvo el horario (IP)', max_length=64, verbose_name='Cliente'),
+        ),
+        migrations.AddIndex(
+            model_name='slothold',
+            index=models.Index(fields=['client', 'expires_at'], name='bookings_sl_client_4293a4_idx'),
+        ),
+    ]
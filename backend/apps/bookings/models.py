@@ -1,9 +1,26 @@
 import uuid
+from datetime import timedelta
 from django.db import models
+from django.db.models import Func, Q
+from django.db.models.functions import Cast, ExtractHour, ExtractMinute
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import IntegerRangeField, RangeOperators
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 
+# Nombre de la constraint de exclusión que impide turnos superpuestos
+BOOKING_OVERLAP_CONSTRAINT = 'booking_no_overlap'
+
+
+def minute_of_day(field_name):
+    """Expresión SQL: minutos desde medianoche de un TimeField"""
+    return Cast(ExtractHour(field_name), models.IntegerField()) * 60 + Cast(
+        ExtractMinute(field_name), models.IntegerField()
+    )
+
+
 class Booking(models.Model):
     """
     Turno de cancha
@@ -35,6 +52,19 @@ class Booking(models.Model):
     end_time = models.TimeField(
         verbose_name='Hora fin'
     )
+    # Rango [inicio, fin) en minutos del día, calculado por la base
+    # Lo usa la constraint de exclusión para impedir superposiciones
+    time_range = models.GeneratedField(
+        expression=Func(
+            minute_of_day('start_time'),
+            minute_of_day('end_time'),
+            function='INT4RANGE',
+            output_field=IntegerRangeField(),
+        ),
+        output_field=IntegerRangeField(),
+        db_persist=True,
+        verbose_name='Rango horario'
+    )
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -65,6 +95,14 @@ class Booking(models.Model):
         blank=True,
         verbose_name='Notas'
     )
+    recurring_booking = models.ForeignKey(
+        'bookings.RecurringBooking',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        verbose_name='Turno fijo'
+    )
     created_by = models.ForeignKey(
         'users.User',
         on_delete=models.SET_NULL,
@@ -86,10 +124,24 @@ class Booking(models.Model):
         verbose_name = 'Turno'
         verbose_name_plural = 'Turnos'
         ordering = ['date', 'start_time']
-        unique_together = ['court', 'date', 'start_time']
         indexes = [
             models.Index(fields=['court', 'date', 'start_time']),
             models.Index(fields=['date', 'status']),
+            # Orden total de la paginación por clave (ver pagination.KEYSET_FIELDS)
+            models.Index(fields=['date', 'start_time', 'id']),
+        ]
+        constraints = [
+            # Dos turnos activos de la misma cancha y día no pueden superponerse
+            # (requiere la extensión btree_gist)
+            ExclusionConstraint(
+                name=BOOKING_OVERLAP_CONSTRAINT,
+                expressions=[
+                    ('court', RangeOperators.EQUAL),
+                    ('date', RangeOperators.EQUAL),
+                    ('time_range', RangeOperators.OVERLAPS),
+                ],
+                condition=~Q(status='cancelled'),
+            ),
         ]
     
     def __str__(self):
@@ -119,9 +171,20 @@ class Booking(models.Model):
         # Solo validar en creación o cuando skip_validation no está presente
         skip_validation = kwargs.pop('skip_validation', False)
         if not skip_validation:
-            self.full_clean()
+            # time_range lo calcula la base; la superposición la garantiza
+            # la constraint de exclusión al insertar (sin query previa)
+            self.full_clean(exclude=['time_range'])
         super().save(*args, **kwargs)
     
+    @staticmethod
+    def is_overlap_error(error):
+        """Determina si un IntegrityError viene de la constraint de superposición"""
+        cause = getattr(error, '__cause__', None)
+        diag = getattr(cause, 'diag', None)
+        if diag is not None and getattr(diag, 'constraint_name', None):
+            return diag.constraint_name == BOOKING_OVERLAP_CONSTRAINT
+        return BOOKING_OVERLAP_CONSTRAINT in str(error)
+    
     @property
     def duration_minutes(self):
         """Duración del turno en minutos"""
@@ -142,6 +205,118 @@ class Booking(models.Model):
         return self.status == 'reserved'
 
 
+class RecurringBooking(models.Model):
+    """
+    Turno fijo: misma cancha, mismo día de la semana y horario todas las semanas
+    Las ocurrencias se materializan como Booking (ver RecurringBookingService)
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Lunes'),
+        (1, 'Martes'),
+        (2, 'Miércoles'),
+        (3, 'Jueves'),
+        (4, 'Viernes'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+    
+    court = models.ForeignKey(
+        'courts.Court',
+        on_delete=models.CASCADE,
+        related_name='recurring_bookings',
+        verbose_name='Cancha'
+    )
+    weekday = models.IntegerField(
+        choices=WEEKDAY_CHOICES,
+        verbose_name='Día de la semana'
+    )
+    start_time = models.TimeField(
+        verbose_name='Hora inicio'
+    )
+    end_time = models.TimeField(
+        verbose_name='Hora fin'
+    )
+    start_date = models.DateField(
+        verbose_name='Vigente desde'
+    )
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Vigente hasta'
+    )
+    customer_name = models.CharField(
+        max_length=200,
+        verbose_name='Nombre del cliente'
+    )
+    customer_phone = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Teléfono del cliente'
+    )
+    notes = models.TextField(
+        blank=True,
+        verbose_name='Notas'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name='Activo'
+    )
+    created_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recurring_bookings_created',
+        verbose_name='Creado por'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de actualización'
+    )
+    
+    class Meta:
+        verbose_name = 'Turno Fijo'
+        verbose_name_plural = 'Turnos Fijos'
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['is_active', 'court']),
+        ]
+    
+    def __str__(self):
+        return f"{self.customer_name} - {self.court.name} {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+    
+    def clean(self):
+        super().clean()
+        
+        if self.start_time and self.end_time and self.end_time <= self.start_time:
+            raise ValidationError({
+                'end_time': 'La hora de fin debe ser posterior a la hora de inicio'
+            })
+        
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({
+                'end_date': 'La fecha de fin debe ser posterior a la fecha de inicio'
+            })
+    
+    def occurrence_dates(self, date_from, date_to):
+        """
+        Fechas de ocurrencia dentro de [date_from, date_to] respetando la vigencia
+        """
+        first = max(date_from, self.start_date)
+        last = min(date_to, self.end_date) if self.end_date else date_to
+        # Primer día del rango que cae en el día de la semana del turno fijo
+        current = first + timedelta(days=(self.weekday - first.weekday()) % 7)
+        dates = []
+        while current <= last:
+            dates.append(current)
+            current += timedelta(weeks=1)
+        return dates
+
+
 class BookingClosure(models.Model):
     """
     Cierre de turno con información de pago
@@ -207,11 +382,15 @@ class BookingClosure(models.Model):
     @property
     def payment_summary(self):
         """Resumen de métodos de pago usados"""
+        return self.format_payment_summary(self.cash_amount, self.transfer_amount)
+    
+    @staticmethod
+    def format_payment_summary(cash_amount, transfer_amount):
         parts = []
-        if self.cash_amount > 0:
-            parts.append(f"Efectivo: ${self.cash_amount}")
-        if self.transfer_amount > 0:
-            parts.append(f"Transferencia: ${self.transfer_amount}")
+        if cash_amount > 0:
+            parts.append(f"Efectivo: ${cash_amount}")
+        if transfer_amount > 0:
+            parts.append(f"Transferencia: ${transfer_amount}")
         return ' / '.join(parts) if parts else 'Sin pago'
     
     def save(self, *args, **kwargs):
@@ -252,3 +431,128 @@ class CancellationToken(models.Model):
         if not self.token:
             self.token = uuid.uuid4().hex[:8].upper()
         super().save(*args, **kwargs)
+
+
+class SlotHold(models.Model):
+    """
+    Reserva temporal de un horario mientras el cliente completa la reserva online
+    Mientras está vigente el horario figura como ocupado para los demás
+    """
+    court = models.ForeignKey(
+        'courts.Court',
+        on_delete=models.CASCADE,
+        related_name='slot_holds',
+        verbose_name='Cancha'
+    )
+    date = models.DateField(
+        verbose_name='Fecha'
+    )
+    start_time = models.TimeField(
+        verbose_name='Hora inicio'
+    )
+    end_time = models.TimeField(
+        verbose_name='Hora fin'
+    )
+    token = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name='Código de retención'
+    )
+    client = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Cliente',
+        help_text='Identificador del cliente que retuvo el horario (IP)'
+    )
+    expires_at = models.DateTimeField(
+        verbose_name='Vence'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+    
+    class Meta:
+        verbose_name = 'Retención de Horario'
+        verbose_name_plural = 'Retenciones de Horarios'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['court', 'date', 'expires_at']),
+            models.Index(fields=['expires_at']),
+            models.Index(fields=['client', 'expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"Retención: {self.court.name} - {self.date} {self.start_time}-{self.end_time}"
+    
+    def save(self, *args, **kwargs):
+        if not self.token:
+            self.token = uuid.uuid4().hex
+        super().save(*args, **kwargs)
+    
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada para una clave Idempotency-Key
+
+    Permite que un reintento (doble click, reconexión) reciba la misma
+    respuesta sin volver a ejecutar la operación. Ver idempotency.py.
+    """
+    scope = models.CharField(
+        max_length=50,
+        verbose_name='Operación'
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name='Clave'
+    )
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='idempotency_keys',
+        verbose_name='Usuario'
+    )
+    request_hash = models.CharField(
+        max_length=64,
+        verbose_name='Hash de la solicitud'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Código de respuesta'
+    )
+    response_body = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Respuesta'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+    
+    class Meta:
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
+        ordering = ['-created_at']
+        constraints = [
+            # Las solicitudes públicas no tienen usuario: NULL cuenta como igual
+            models.UniqueConstraint(
+                fields=['scope', 'key', 'user'],
+                name='idempotency_key_unique',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope}: {self.key}"
@@ -0,0 +1,122 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, time
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Orden total de turnos para paginar por clave: (fecha, hora inicio, id)
+KEYSET_FIELDS = ('date', 'start_time', 'id')
+
+
+def encode_cursor(booking):
+    """Cursor opaco con la posición (fecha, hora inicio, id) de un turno"""
+    position = [booking.date.isoformat(), booking.start_time.isoformat(), booking.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodificar un cursor generado por encode_cursor
+    Lanza ValueError si el cursor es inválido
+    """
+    try:
+        day, start, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(day), time.fromisoformat(start), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Cursor inválido')
+
+
+def keyset_page(queryset, cursor=None, limit=50, descending=False):
+    """
+    Página de turnos a partir de un cursor, sin COUNT ni OFFSET
+
+    Ordena por (date, start_time, id) y filtra las filas posteriores al cursor.
+    La condición redundante sobre date acota el rango que recorre el índice.
+    Devuelve (turnos, cursor_siguiente o None).
+    """
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(*[f'{prefix}{field}' for field in KEYSET_FIELDS])
+
+    if cursor:
+        day, start, pk = decode_cursor(cursor)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'date__{op}': day})
+            | Q(date=day, **{f'start_time__{op}': start})
+            | Q(date=day, start_time=start, **{f'id__{op}': pk}),
+            **{f'date__{op}e': day},
+        )
+
+    # Pedir una fila extra para saber si hay página siguiente
+    items = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+class BookingPagination(PageNumberPagination):
+    """
+    Paginación de turnos seleccionable por request
+
+    Por defecto numera páginas (page=N). Con ?pagination=keyset pagina por
+    clave (fecha, hora inicio, id) usando ?cursor=..., sin COUNT(*) ni OFFSET,
+    por lo que las páginas profundas cuestan lo mismo que la primera.
+    En modo keyset el orden es siempre ascendente y se ignora ?ordering;
+    ?limit=N cambia el tamaño de página (solo en ese modo, hasta max_limit).
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    max_limit = 200
+    KEYSET = 'keyset'
+
+    def is_keyset(self, request):
+        return request.query_params.get(self.mode_query_param) == self.KEYSET
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param],
+                strict=True,
+                cutoff=self.max_limit
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_keyset(request):
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        try:
+            items, self.next_cursor = keyset_page(
+                queryset,
+                cursor=request.query_params.get(self.cursor_query_param),
+                limit=self.get_limit(request),
+            )
+        except ValueError as e:
+            raise NotFound(str(e))
+        return items
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
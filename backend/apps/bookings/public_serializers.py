@@ -12,6 +12,7 @@ class PublicBookingCreateSerializer(serializers.Serializer):
     end_time = serializers.TimeField()
     customer_name = serializers.CharField(max_length=200)
     customer_phone = serializers.CharField(max_length=50)
+    hold_id = serializers.CharField(max_length=32, required=False, allow_blank=True)
     
     def validate_customer_name(self, value):
         if len(value.strip()) < 2:
@@ -48,6 +49,16 @@ class PublicBookingResponseSerializer(serializers.ModelSerializer):
         return None
 
 
+class PublicSlotHoldCreateSerializer(serializers.Serializer):
+    """
+    Serializer para retener un horario durante la reserva online
+    """
+    court = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+
+
 class PublicCancelSerializer(serializers.Serializer):
     """
     Serializer para cancelar reserva con token
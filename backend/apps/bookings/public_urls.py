@@ -2,7 +2,10 @@ from django.urls import path
 from .public_views import (
     public_courts_list,
     public_available_slots,
+    public_availability_matrix,
     public_create_booking,
+    public_create_hold,
+    public_release_hold,
     public_cancel_booking,
     public_verify_booking,
     public_search_bookings,
@@ -13,7 +16,10 @@ from .public_views import (
 urlpatterns = [
     path('courts/', public_courts_list, name='public-courts'),
     path('available-slots/', public_available_slots, name='public-available-slots'),
+    path('availability/', public_availability_matrix, name='public-availability-matrix'),
     path('bookings/', public_create_booking, name='public-create-booking'),
+    path('holds/', public_create_hold, name='public-create-hold'),
+    path('holds/<str:hold_id>/', public_release_hold, name='public-release-hold'),
     path('bookings/cancel/', public_cancel_booking, name='public-cancel-booking'),
     path('bookings/verify/', public_verify_booking, name='public-verify-booking'),
     path('bookings/search/', public_search_bookings, name='public-search-bookings'),
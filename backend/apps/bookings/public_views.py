@@ -7,18 +7,29 @@ from datetime import datetime
 
 from apps.courts.models import Court, TimeSlotConfiguration
 from apps.courts.serializers import CourtListSerializer
-from .services import BookingService
+from .services import BookingService, SlotHoldService
+from .idempotency import idempotent
 from .public_serializers import (
     PublicBookingCreateSerializer,
     PublicBookingResponseSerializer,
     PublicCancelSerializer,
+    PublicSlotHoldCreateSerializer,
 )
 
 
+# Máximo de días por consulta de disponibilidad por rango
+MAX_AVAILABILITY_RANGE_DAYS = 31
+
+
 class PublicBookingThrottle(AnonRateThrottle):
     rate = '30/hour'
 
 
+class PublicSlotHoldThrottle(AnonRateThrottle):
+    scope = 'public_hold'
+    rate = '60/hour'
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_courts_list(request):
@@ -30,6 +41,19 @@ def public_courts_list(request):
     return Response(serializer.data)
 
 
+def parse_court_id(value):
+    """
+    court_id opcional de los query params
+    Lanza ValueError si no es un id válido
+    """
+    if value in (None, ''):
+        return None
+    court_id = int(value)
+    if court_id <= 0:
+        raise ValueError('court_id inválido')
+    return court_id
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_available_slots(request):
@@ -38,7 +62,6 @@ def public_available_slots(request):
     Query params: date (YYYY-MM-DD), court_id (optional)
     """
     date_str = request.query_params.get('date')
-    court_id = request.query_params.get('court_id')
     
     if not date_str:
         return Response(
@@ -46,6 +69,14 @@ def public_available_slots(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    try:
+        court_id = parse_court_id(request.query_params.get('court_id'))
+    except ValueError:
+        return Response(
+            {'error': 'court_id debe ser un id de cancha'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     try:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
@@ -77,12 +108,83 @@ def public_available_slots(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def public_availability_matrix(request):
+    """
+    Ver disponibilidad de un rango de fechas en una sola request
+    Query params: date_from, date_to (YYYY-MM-DD), court_id (optional)
+    Máximo MAX_AVAILABILITY_RANGE_DAYS días por request
+    """
+    date_from_str = request.query_params.get('date_from')
+    date_to_str = request.query_params.get('date_to')
+    
+    if not date_from_str or not date_to_str:
+        return Response(
+            {'error': 'Los parámetros date_from y date_to son obligatorios (formato: YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        court_id = parse_court_id(request.query_params.get('court_id'))
+    except ValueError:
+        return Response(
+            {'error': 'court_id debe ser un id de cancha'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+        date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+    except ValueError:
+        return Response(
+            {'error': 'Formato de fecha inválido. Usá YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if date_to < date_from:
+        return Response(
+            {'error': 'date_to debe ser igual o posterior a date_from'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if (date_to - date_from).days + 1 > MAX_AVAILABILITY_RANGE_DAYS:
+        return Response(
+            {'error': f'El rango no puede superar {MAX_AVAILABILITY_RANGE_DAYS} días'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # No permitir fechas pasadas
+    if date_from < datetime.now().date():
+        return Response(
+            {'error': 'No se pueden ver horarios de fechas pasadas'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    matrix = BookingService.generate_availability_matrix(date_from, date_to, court_id)
+    config = matrix['config']
+    
+    return Response({
+        'date_from': date_from_str,
+        'date_to': date_to_str,
+        'config': {
+            'opening_time': config.opening_time.strftime('%H:%M'),
+            'closing_time': config.closing_time.strftime('%H:%M'),
+            'slot_duration_minutes': config.slot_duration_minutes,
+        },
+        'slots': matrix['slots'],
+        'courts': matrix['courts'],
+    })
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @throttle_classes([PublicBookingThrottle])
+@idempotent('public_booking')
 def public_create_booking(request):
     """
     Crear reserva pública (sin autenticación)
+    Acepta la cabecera Idempotency-Key para reintentos seguros
     """
     serializer = PublicBookingCreateSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -105,6 +207,7 @@ def public_create_booking(request):
             end_time=data['end_time'],
             customer_name=data['customer_name'],
             customer_phone=data['customer_phone'],
+            hold_id=data.get('hold_id') or None,
         )
         
         response_serializer = PublicBookingResponseSerializer(booking)
@@ -117,6 +220,68 @@ def public_create_booking(request):
         )
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([PublicSlotHoldThrottle])
+def public_create_hold(request):
+    """
+    Retener un horario mientras el cliente completa la reserva
+    Devuelve un hold_id que se envía al crear la reserva
+    """
+    serializer = PublicSlotHoldCreateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    data = serializer.validated_data
+    
+    try:
+        court = Court.objects.get(pk=data['court'], is_active=True)
+    except Court.DoesNotExist:
+        return Response(
+            {'error': 'Cancha no encontrada o inactiva'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    try:
+        hold = SlotHoldService.create_hold(
+            court=court,
+            date=data['date'],
+            start_time=data['start_time'],
+            end_time=data['end_time'],
+            # Misma identificación que el throttle (respeta NUM_PROXIES)
+            client=PublicSlotHoldThrottle().get_ident(request),
+        )
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({
+        'hold_id': hold.token,
+        'court': court.id,
+        'date': hold.date.isoformat(),
+        'start_time': hold.start_time.strftime('%H:%M'),
+        'end_time': hold.end_time.strftime('%H:%M'),
+        'expires_at': hold.expires_at.isoformat(),
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['DELETE'])
+@permission_classes([AllowAny])
+def public_release_hold(request, hold_id):
+    """
+    Liberar una retención de horario
+    """
+    try:
+        SlotHoldService.release_hold(hold_id)
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def public_cancel_booking(request):
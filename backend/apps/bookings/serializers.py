@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from django.db.models import Q
-from .models import Booking, BookingClosure
+from django.db import IntegrityError, transaction
+from .models import Booking, BookingClosure, RecurringBooking
 from apps.courts.serializers import CourtListSerializer
 from apps.users.serializers import UserSerializer
 
 
+OVERLAP_MESSAGE = 'Ya existe un turno en este horario para esta cancha'
+
+
 class BookingClosureSerializer(serializers.ModelSerializer):
     """
     Serializer para cierre de turno
@@ -23,7 +26,32 @@ class BookingClosureSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'consumptions_amount', 'total_amount', 'closed_by', 'closed_at']
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingOverlapMixin:
+    """
+    Guardar el turno de forma optimista y traducir la violación de la
+    constraint de exclusión (turnos superpuestos) en un error de validación
+    """
+    
+    def overlap_error(self):
+        return OVERLAP_MESSAGE
+    
+    def _save_or_overlap_error(self, save, *args):
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError as e:
+            if Booking.is_overlap_error(e):
+                raise serializers.ValidationError(self.overlap_error())
+            raise
+    
+    def create(self, validated_data):
+        return self._save_or_overlap_error(super().create, validated_data)
+    
+    def update(self, instance, validated_data):
+        return self._save_or_overlap_error(super().update, instance, validated_data)
+
+
+class BookingSerializer(BookingOverlapMixin, serializers.ModelSerializer):
     """
     Serializer completo para turnos
     """
@@ -50,7 +78,6 @@ class BookingSerializer(serializers.ModelSerializer):
         Validaciones del turno
         """
         court = attrs.get('court')
-        date = attrs.get('date')
         start_time = attrs.get('start_time')
         end_time = attrs.get('end_time')
         
@@ -67,33 +94,12 @@ class BookingSerializer(serializers.ModelSerializer):
                 'court': 'No se pueden crear turnos en una cancha inactiva'
             })
         
-        # Validar overlap solo si es creación o si se cambia algún campo de tiempo
-        if not self.instance or any(k in attrs for k in ['court', 'date', 'start_time', 'end_time']):
-            # Usar valores actuales si no se proveen nuevos
-            if self.instance:
-                court = court or self.instance.court
-                date = date or self.instance.date
-                start_time = start_time or self.instance.start_time
-                end_time = end_time or self.instance.end_time
-            
-            # Buscar overlaps
-            overlapping = Booking.objects.filter(
-                court=court,
-                date=date,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            ).exclude(status='cancelled')
-            
-            # Excluir la instancia actual en updates
-            if self.instance:
-                overlapping = overlapping.exclude(pk=self.instance.pk)
-            
-            if overlapping.exists():
-                raise serializers.ValidationError({
-                    'non_field_errors': 'Ya existe un turno en este horario para esta cancha'
-                })
-        
+        # La superposición la valida la constraint de exclusión al guardar
+        # (ver BookingOverlapMixin)
         return attrs
+    
+    def overlap_error(self):
+        return {'non_field_errors': OVERLAP_MESSAGE}
 
 
 class BookingListSerializer(serializers.ModelSerializer):
@@ -126,7 +132,7 @@ class BookingCalendarSerializer(serializers.ModelSerializer):
         ]
 
 
-class BookingCreateUpdateSerializer(serializers.ModelSerializer):
+class BookingCreateUpdateSerializer(BookingOverlapMixin, serializers.ModelSerializer):
     """
     Serializer para crear y actualizar turnos
     """
@@ -143,7 +149,6 @@ class BookingCreateUpdateSerializer(serializers.ModelSerializer):
         """
         # Aplicar las mismas validaciones
         court = attrs.get('court')
-        date = attrs.get('date')
         start_time = attrs.get('start_time')
         end_time = attrs.get('end_time')
         
@@ -158,30 +163,12 @@ class BookingCreateUpdateSerializer(serializers.ModelSerializer):
                 'court': 'No se pueden crear turnos en una cancha inactiva'
             })
         
-        # Validar overlap
-        if not self.instance or any(k in attrs for k in ['court', 'date', 'start_time', 'end_time']):
-            if self.instance:
-                court = court or self.instance.court
-                date = date or self.instance.date
-                start_time = start_time or self.instance.start_time
-                end_time = end_time or self.instance.end_time
-            
-            overlapping = Booking.objects.filter(
-                court=court,
-                date=date,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            ).exclude(status='cancelled')
-            
-            if self.instance:
-                overlapping = overlapping.exclude(pk=self.instance.pk)
-            
-            if overlapping.exists():
-                raise serializers.ValidationError(
-                    'Ya existe un turno en este horario para esta cancha'
-                )
-        
+        # La superposición la valida la constraint de exclusión al guardar
+        # (ver BookingOverlapMixin)
         return attrs
+    
+    def overlap_error(self):
+        return OVERLAP_MESSAGE
 
 
 class CloseBookingSerializer(serializers.Serializer):
@@ -220,3 +207,64 @@ class CloseBookingSerializer(serializers.Serializer):
             )
         
         return attrs
+
+
+class BulkCloseItemSerializer(serializers.Serializer):
+    """
+    Línea de un cierre por lote
+    """
+    booking_id = serializers.IntegerField()
+    booking_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    cash_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    transfer_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class BulkCloseSerializer(serializers.Serializer):
+    """
+    Serializer para cerrar varios turnos de una vez
+    El estado de cada turno y la suma de montos se validan en el servicio
+    """
+    items = BulkCloseItemSerializer(many=True, allow_empty=False)
+
+
+class RecurringBookingSerializer(serializers.ModelSerializer):
+    """
+    Serializer para turnos fijos
+    """
+    court_name = serializers.CharField(source='court.name', read_only=True)
+    weekday_display = serializers.CharField(source='get_weekday_display', read_only=True)
+    
+    class Meta:
+        model = RecurringBooking
+        fields = [
+            'id', 'court', 'court_name', 'weekday', 'weekday_display',
+            'start_time', 'end_time', 'start_date', 'end_date',
+            'customer_name', 'customer_phone', 'notes', 'is_active',
+            'created_by', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        start_time = attrs.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = attrs.get('end_time', getattr(self.instance, 'end_time', None))
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        court = attrs.get('court')
+        
+        if start_time and end_time and end_time <= start_time:
+            raise serializers.ValidationError({
+                'end_time': 'La hora de fin debe ser posterior a la hora de inicio'
+            })
+        
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({
+                'end_date': 'La fecha de fin debe ser posterior a la fecha de inicio'
+            })
+        
+        if court and not court.is_active:
+            raise serializers.ValidationError({
+                'court': 'No se pueden crear turnos en una cancha inactiva'
+            })
+        
+        return attrs
@@ -1,11 +1,55 @@
-from django.db import transaction
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from decimal import Decimal
+from django.db.models import F, Q, Sum
 from django.utils import timezone
 from datetime import time, datetime, timedelta
-from .models import Booking, BookingClosure, CancellationToken
+from django.conf import settings
+from .models import Booking, BookingClosure, CancellationToken, RecurringBooking, SlotHold
+from .availability import AvailabilityEngine, interval_mask, minutes_to_str, past_cutoff, time_to_minutes
+from .availability_cache import AvailabilityCache
+from .locks import CourtDayLock
 from apps.products.models import Consumption
 from apps.courts.models import TimeSlotConfiguration
-from apps.notifications.models import Notification
+from apps.notifications.outbox import OutboxService
+
+
+def _insert_booking(overlap_message, **fields):
+    """
+    Insertar un turno de forma optimista
+    La constraint de exclusión rechaza superposiciones con turnos activos;
+    el IntegrityError se traduce al mensaje de error de negocio
+    """
+    try:
+        with transaction.atomic():
+            return Booking.objects.create(**fields)
+    except IntegrityError as e:
+        if Booking.is_overlap_error(e):
+            raise ValueError(overlap_message)
+        raise
+
+
+def _lock_booking(booking_id, not_found_message, queryset=None):
+    """
+    Tomar el lock de la cancha-día del turno y devolverlo releído bajo el lock
+    Debe llamarse dentro de transaction.atomic
+    """
+    try:
+        key = Booking.objects.values_list('court_id', 'date').get(pk=booking_id)
+    except Booking.DoesNotExist:
+        raise ValueError(not_found_message)
+    
+    queryset = queryset if queryset is not None else Booking.objects.all()
+    while True:
+        CourtDayLock.acquire(*key)
+        try:
+            booking = queryset.get(pk=booking_id)
+        except Booking.DoesNotExist:
+            raise ValueError(not_found_message)
+        if (booking.court_id, booking.date) == key:
+            return booking
+        # Lo movieron a otra cancha o día antes de tomar el lock:
+        # tomar también el de su cancha-día actual y volver a leer
+        key = (booking.court_id, booking.date)
 
 
 class BookingService:
@@ -14,6 +58,7 @@ class BookingService:
     """
     
     @staticmethod
+    @transaction.atomic
     def create_booking(court, date, start_time, end_time, customer_name, customer_phone='', notes='', user=None):
         """
         Crear un nuevo turno con validaciones (desde panel admin)
@@ -26,19 +71,11 @@ class BookingService:
         if end_time <= start_time:
             raise ValueError('La hora de fin debe ser posterior a la hora de inicio')
         
-        # Validar overlap
-        overlapping = Booking.objects.filter(
-            court=court,
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exclude(status='cancelled')
-        
-        if overlapping.exists():
-            raise ValueError('Ya existe un turno en este horario para esta cancha')
+        CourtDayLock.acquire(court.id, date)
         
-        # Crear booking
-        booking = Booking.objects.create(
+        # Crear booking (la constraint de exclusión rechaza superposiciones)
+        booking = _insert_booking(
+            'Ya existe un turno en este horario para esta cancha',
             court=court,
             date=date,
             start_time=start_time,
@@ -55,9 +92,10 @@ class BookingService:
     
     @staticmethod
     @transaction.atomic
-    def create_public_booking(court, date, start_time, end_time, customer_name, customer_phone, customer_email=''):
+    def create_public_booking(court, date, start_time, end_time, customer_name, customer_phone, customer_email='', hold_id=None):
         """
         Crear una reserva pública (sin autenticación) + generar token de cancelación
+        Si se envía hold_id, consume la retención del horario (ver SlotHoldService)
         """
         # Validar que la cancha esté activa
         if not court.is_active:
@@ -67,19 +105,33 @@ class BookingService:
         if end_time <= start_time:
             raise ValueError('La hora de fin debe ser posterior a la hora de inicio')
         
-        # Validar overlap
-        overlapping = Booking.objects.filter(
-            court=court,
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        ).exclude(status='cancelled')
+        CourtDayLock.acquire(court.id, date)
         
-        if overlapping.exists():
+        # La retención enviada tiene que ser de este mismo horario y estar vigente
+        now = timezone.now()
+        hold = None
+        if hold_id:
+            hold = SlotHold.objects.filter(
+                token=hold_id,
+                court=court,
+                date=date,
+                start_time=start_time,
+                end_time=end_time,
+                expires_at__gt=now,
+            ).first()
+            if not hold:
+                raise ValueError('La retención del horario no es válida o ya venció. Por favor elegí el horario de nuevo.')
+        
+        # Retenciones vigentes de otros clientes bloquean el horario
+        other_holds = SlotHoldService.live_overlapping(court.id, date, start_time, end_time, now)
+        if hold:
+            other_holds = other_holds.exclude(pk=hold.pk)
+        if other_holds.exists():
             raise ValueError('Este horario ya no está disponible. Por favor elegí otro.')
         
-        # Crear booking
-        booking = Booking.objects.create(
+        # Crear booking (la constraint de exclusión rechaza superposiciones)
+        booking = _insert_booking(
+            'Este horario ya no está disponible. Por favor elegí otro.',
             court=court,
             date=date,
             start_time=start_time,
@@ -92,11 +144,16 @@ class BookingService:
             created_by=None
         )
         
+        # Consumir la retención
+        if hold:
+            hold.delete()
+            AvailabilityCache.invalidate_on_commit(hold.date, hold.court_id)
+        
         # Generar token de cancelación
         token = CancellationToken.objects.create(booking=booking)
         
-        # Notificar a administradores
-        Notification.notify_admins(
+        # Notificar a administradores (el worker del outbox las entrega)
+        OutboxService.enqueue(
             title='Nueva reserva online',
             message=f'{customer_name} reservó {court.name} el {date.strftime("%d/%m/%Y")} de {start_time.strftime("%H:%M")} a {end_time.strftime("%H:%M")}',
             notification_type='booking_created',
@@ -106,14 +163,12 @@ class BookingService:
         return booking, token
     
     @staticmethod
+    @transaction.atomic
     def cancel_booking(booking_id, user=None):
         """
         Cancelar un turno (desde panel admin)
         """
-        try:
-            booking = Booking.objects.get(pk=booking_id)
-        except Booking.DoesNotExist:
-            raise ValueError('Turno no encontrado')
+        booking = _lock_booking(booking_id, 'Turno no encontrado')
         
         # Validar que el turno puede ser cancelado
         if not booking.can_be_cancelled:
@@ -126,17 +181,22 @@ class BookingService:
         return booking
     
     @staticmethod
+    @transaction.atomic
     def cancel_booking_with_token(token_str):
         """
         Cancelar reserva con código de cancelación (público)
         Valida anticipación mínima según configuración
         """
         try:
-            cancellation_token = CancellationToken.objects.select_related('booking', 'booking__court').get(token=token_str)
+            booking_id = CancellationToken.objects.values_list('booking_id', flat=True).get(token=token_str)
         except CancellationToken.DoesNotExist:
             raise ValueError('Código de cancelación no válido')
         
-        booking = cancellation_token.booking
+        booking = _lock_booking(
+            booking_id,
+            'Código de cancelación no válido',
+            Booking.objects.select_related('court'),
+        )
         
         # Validar que el turno puede ser cancelado
         if not booking.can_be_cancelled:
@@ -160,8 +220,8 @@ class BookingService:
         booking.status = 'cancelled'
         booking.save(skip_validation=True)
         
-        # Notificar a administradores
-        Notification.notify_admins(
+        # Notificar a administradores (el worker del outbox las entrega)
+        OutboxService.enqueue(
             title='Reserva cancelada',
             message=f'{booking.customer_name} canceló {booking.court.name} el {booking.date.strftime("%d/%m/%Y")} de {booking.start_time.strftime("%H:%M")} a {booking.end_time.strftime("%H:%M")}',
             notification_type='booking_cancelled',
@@ -204,10 +264,12 @@ class BookingService:
         """
         Cerrar un turno creando el BookingClosure
         """
-        try:
-            booking = Booking.objects.select_for_update().get(pk=booking_id)
-        except Booking.DoesNotExist:
-            raise ValueError('Turno no encontrado')
+        # Lock de cancha-día primero, después el lock de fila
+        booking = _lock_booking(
+            booking_id,
+            'Turno no encontrado',
+            Booking.objects.select_for_update(),
+        )
         
         # Validar que el turno puede ser cerrado
         if not booking.can_be_closed:
@@ -217,8 +279,10 @@ class BookingService:
         if hasattr(booking, 'closure'):
             raise ValueError('Este turno ya fue cerrado')
         
-        # Calcular monto de consumos
-        consumptions_amount = sum(c.total_price for c in booking.consumptions.all())
+        # Calcular monto de consumos (agregado en la base)
+        consumptions_amount = booking.consumptions.aggregate(
+            total=Sum('total_price')
+        )['total'] or Decimal('0')
         
         # Crear closure
         closure = BookingClosure.objects.create(
@@ -236,6 +300,160 @@ class BookingService:
         booking.save(skip_validation=True)
         
         return closure
+
+    @staticmethod
+    @transaction.atomic
+    def close_bookings(items, user=None):
+        """
+        Cerrar varios turnos de una vez (cierre de caja del día)
+        items: dicts con booking_id, cash_amount, transfer_amount y opcionalmente
+        booking_amount (por defecto el precio de la cancha) y notes
+        - Locks de cancha-día en orden fijo y un solo select_for_update
+        - Montos de consumos con una agregación agrupada por turno
+        - bulk_create de los cierres y un UPDATE de estado para todos
+        Los turnos que no se pueden cerrar no frenan al resto.
+        Devuelve un resultado por item, en el mismo orden:
+        {'booking_id', 'closure' (o None), 'error' (o None)}
+        """
+        from apps.payments.services import ROLLUP_AMOUNT_FIELDS, RevenueRollupService
+        
+        results = []
+        ids = [item['booking_id'] for item in items]
+        
+        # Locks de cancha-día primero, en orden fijo para evitar deadlocks
+        keys = Booking.objects.filter(pk__in=ids).values_list('court_id', 'date').distinct()
+        for court_id, day in sorted(keys):
+            CourtDayLock.acquire(court_id, day)
+        
+        bookings = Booking.objects.select_for_update(of=('self',)).filter(
+            pk__in=ids
+        ).select_related('court', 'closure').order_by('id').in_bulk()
+        
+        seen = set()
+        to_close = []
+        for item in items:
+            booking_id = item['booking_id']
+            booking = bookings.get(booking_id)
+            cash = item.get('cash_amount') or Decimal('0')
+            transfer = item.get('transfer_amount') or Decimal('0')
+            
+            error = None
+            if booking is None:
+                error = 'Turno no encontrado'
+            elif booking_id in seen:
+                error = 'El turno está repetido en la solicitud'
+            elif not booking.can_be_closed:
+                error = f'Solo se pueden cerrar turnos reservados. Estado actual: {booking.get_status_display()}'
+            elif hasattr(booking, 'closure'):
+                error = 'Este turno ya fue cerrado'
+            else:
+                booking_amount = item.get('booking_amount')
+                if booking_amount is None:
+                    booking_amount = booking.court.price
+                if cash + transfer != booking_amount:
+                    error = (
+                        f'La suma de efectivo (${cash}) + transferencia (${transfer}) '
+                        f'debe ser igual al monto del turno (${booking_amount})'
+                    )
+            seen.add(booking_id)
+            
+            results.append({'booking_id': booking_id, 'closure': None, 'error': error})
+            if error:
+                continue
+            
+            results[-1]['closure'] = BookingClosure(
+                booking=booking,
+                booking_amount=booking_amount,
+                cash_amount=cash,
+                transfer_amount=transfer,
+                notes=item.get('notes', ''),
+                closed_by=user,
+            )
+            to_close.append(results[-1]['closure'])
+        
+        if not to_close:
+            return results
+        
+        totals = dict(
+            Consumption.objects.filter(booking_id__in=[c.booking_id for c in to_close])
+            .values('booking_id')
+            .annotate(total=Sum('total_price'))
+            .values_list('booking_id', 'total')
+        )
+        for closure in to_close:
+            closure.consumptions_amount = totals.get(closure.booking_id) or Decimal('0')
+            # bulk_create no llama a save(): calcular el total acá
+            closure.total_amount = closure.booking_amount + closure.consumptions_amount
+        
+        closures = BookingClosure.objects.bulk_create(to_close)
+        Booking.objects.filter(pk__in=[c.booking_id for c in closures]).update(
+            status='completed',
+            updated_at=timezone.now()
+        )
+        
+        # bulk_create y update no disparan señales: acumulado y cache a mano
+        RevenueRollupService.apply_changes([
+            (
+                closure.booking.date,
+                closure.booking.court_id,
+                None,
+                {field: getattr(closure, field) for field in ROLLUP_AMOUNT_FIELDS},
+            )
+            for closure in closures
+        ])
+        for court_id, day in {(c.booking.court_id, c.booking.date) for c in closures}:
+            AvailabilityCache.invalidate_on_commit(day, court_id)
+        
+        for closure in closures:
+            closure.booking.status = 'completed'
+        return results
+    
+    @staticmethod
+    @transaction.atomic
+    def recalculate_consumptions_amount(booking_ids):
+        """
+        Recalcular consumptions_amount y total_amount de los cierres de los turnos
+        - Lock de los cierres primero, así un consumo concurrente espera y su
+          suma ya ve el consumo confirmado
+        - Una sola agregación agrupada por turno (sin cargar los consumos)
+        - UPDATE puntual con F() solo en los cierres que cambian, y el
+          acumulado DailyRevenue con la diferencia
+        Devuelve la cantidad de cierres actualizados
+        """
+        from apps.payments.services import ROLLUP_AMOUNT_FIELDS, RevenueRollupService
+        
+        closures = list(
+            BookingClosure.objects.select_for_update(of=('self',))
+            .filter(booking_id__in=set(booking_ids))
+            .order_by('id')
+            .values('id', 'booking_id', 'booking__date', 'booking__court_id', *ROLLUP_AMOUNT_FIELDS)
+        )
+        if not closures:
+            return 0
+        
+        totals = dict(
+            Consumption.objects.filter(booking_id__in=[c['booking_id'] for c in closures])
+            .values('booking_id')
+            .annotate(total=Sum('total_price'))
+            .values_list('booking_id', 'total')
+        )
+        
+        updated = 0
+        for closure in closures:
+            amount = totals.get(closure['booking_id']) or Decimal('0')
+            if amount == closure['consumptions_amount']:
+                continue
+            BookingClosure.objects.filter(pk=closure['id']).update(
+                consumptions_amount=amount,
+                total_amount=F('booking_amount') + amount,
+            )
+            previous = {field: closure[field] for field in ROLLUP_AMOUNT_FIELDS}
+            current = dict(previous, consumptions_amount=amount, total_amount=closure['booking_amount'] + amount)
+            RevenueRollupService.apply_change(
+                closure['booking__date'], closure['booking__court_id'], previous, current
+            )
+            updated += 1
+        return updated
     
     @staticmethod
     def search_bookings_by_customer(name=None, phone=None):
@@ -265,14 +483,16 @@ class BookingService:
         return queryset.order_by('date', 'start_time')
     
     @staticmethod
+    @transaction.atomic
     def cancel_booking_public(booking_id):
         """
         Cancelar reserva pública por ID
         """
-        try:
-            booking = Booking.objects.select_related('court').get(pk=booking_id)
-        except Booking.DoesNotExist:
-            raise ValueError('Reserva no encontrada')
+        booking = _lock_booking(
+            booking_id,
+            'Reserva no encontrada',
+            Booking.objects.select_related('court'),
+        )
         
         if not booking.can_be_cancelled:
             raise ValueError(f'Este turno no puede ser cancelado (estado: {booking.get_status_display()})')
@@ -294,8 +514,8 @@ class BookingService:
         booking.status = 'cancelled'
         booking.save(skip_validation=True)
         
-        # Notificar a administradores
-        Notification.notify_admins(
+        # Notificar a administradores (el worker del outbox las entrega)
+        OutboxService.enqueue(
             title='Reserva cancelada',
             message=f'{booking.customer_name} canceló {booking.court.name} el {booking.date.strftime("%d/%m/%Y")} de {booking.start_time.strftime("%H:%M")} a {booking.end_time.strftime("%H:%M")}',
             notification_type='booking_cancelled',
@@ -305,81 +525,123 @@ class BookingService:
         return booking
 
     @staticmethod
-    def generate_available_slots(date, court_id=None):
+    def compute_day_availability(date, court_id=None):
         """
-        Generar slots disponibles según configuración global
-        Si se proporciona court_id, filtra por esa cancha
-        OPTIMIZADO: Una sola query para todos los bookings del día
+        Ocupación del día por cancha, sin aplicar el corte de horarios pasados
+        Es lo que se guarda en AvailabilityCache
         """
         from apps.courts.models import Court
         
         config = TimeSlotConfiguration.get_active()
         
         # Obtener canchas
+        courts = Court.objects.filter(is_active=True)
         if court_id:
-            courts = Court.objects.filter(id=court_id, is_active=True)
-        else:
-            courts = Court.objects.filter(is_active=True)
+            courts = courts.filter(id=court_id)
+        courts = list(courts.only('id', 'name', 'price'))
         
-        if not courts.exists():
-            return []
+        if not courts:
+            return {'grid': [], 'courts': [], 'expires_at': None}
         
-        # OPTIMIZACIÓN: Obtener todos los bookings del día en una sola query
+        # Una sola query para todos los bookings del día (+ retenciones vigentes)
+        engine = AvailabilityEngine(config)
         court_ids = [c.id for c in courts]
-        bookings = Booking.objects.filter(
-            court_id__in=court_ids,
-            date=date
-        ).exclude(status='cancelled').values('court_id', 'start_time', 'end_time')
+        occupancy = engine.build_occupancy(court_ids, date)
+        expires_at = engine.add_live_holds(occupancy, court_ids, date)
         
-        # Crear un dict para búsqueda rápida: {court_id: [bookings]}
-        bookings_by_court = {}
-        for court in courts:
-            bookings_by_court[court.id] = []
-        for booking in bookings:
-            bookings_by_court[booking['court_id']].append(booking)
+        return {
+            'expires_at': expires_at,
+            'grid': [(start, end) for start, end, _mask in engine.grid],
+            'courts': [
+                (court.id, court.name, str(court.price),
+                 engine.free_slots(occupancy.get((court.id, date), 0)))
+                for court in courts
+            ],
+        }
+    
+    @staticmethod
+    def generate_available_slots(date, court_id=None):
+        """
+        Generar slots disponibles según configuración global
+        Si se proporciona court_id, filtra por esa cancha
+        OPTIMIZADO: bitmap de ocupación por cancha-día (ver AvailabilityEngine),
+        cacheado por (fecha, cancha) en AvailabilityCache
+        """
+        # La clave (con la versión de la cancha-día) se lee antes de calcular
+        day, key = AvailabilityCache.lookup(date, court_id)
+        if day is None:
+            day = BookingService.compute_day_availability(date, court_id)
+            AvailabilityCache.store(key, day, expires_at=day['expires_at'])
         
-        slots = []
-        current_time = config.opening_time
-        end_time = config.closing_time
-        now = timezone.now()
+        # El corte de horarios pasados se aplica al leer, no se cachea
+        cutoff = past_cutoff(date, timezone.localtime(timezone.now()))
         
-        while current_time < end_time:
-            # Calcular slot_end
-            current_dt = datetime.combine(date, current_time)
-            slot_end_dt = current_dt + timedelta(minutes=config.slot_duration_minutes)
-            slot_end = slot_end_dt.time()
-            
-            if slot_end > end_time:
-                break
-            
-            for court in courts:
-                # Verificar si hay overlap con bookings existentes (en memoria)
-                is_available = True
-                for booking in bookings_by_court[court.id]:
-                    if booking['start_time'] < slot_end and booking['end_time'] > current_time:
-                        is_available = False
-                        break
-                
-                # No mostrar slots en el pasado
-                slot_datetime = timezone.make_aware(datetime.combine(date, current_time))
-                if slot_datetime <= now:
-                    is_available = False
-                
+        slots = []
+        for index, (start, end) in enumerate(day['grid']):
+            start_str = minutes_to_str(start)
+            end_str = minutes_to_str(end)
+            for slot_court_id, court_name, court_price, free in day['courts']:
                 slots.append({
-                    'court_id': court.id,
-                    'court_name': court.name,
-                    'court_price': str(court.price),
-                    'start_time': current_time.strftime('%H:%M'),
-                    'end_time': slot_end.strftime('%H:%M'),
-                    'available': is_available,
+                    'court_id': slot_court_id,
+                    'court_name': court_name,
+                    'court_price': court_price,
+                    'start_time': start_str,
+                    'end_time': end_str,
+                    'available': free[index] and start > cutoff,
                 })
-            
-            # Avanzar al siguiente slot
-            current_dt += timedelta(minutes=config.slot_duration_minutes)
-            current_time = current_dt.time()
         
         return slots
     
+    @staticmethod
+    def generate_availability_matrix(date_from, date_to, court_id=None):
+        """
+        Matriz de disponibilidad canchas x días x slots para un rango de fechas
+        Una query de configuración, una de canchas y una de bookings para todo el rango
+        """
+        from apps.courts.models import Court
+        
+        config = TimeSlotConfiguration.get_active()
+        
+        courts = Court.objects.filter(is_active=True)
+        if court_id:
+            courts = courts.filter(id=court_id)
+        courts = list(courts.only('id', 'name', 'price'))
+        
+        engine = AvailabilityEngine(config)
+        occupancy = {}
+        if courts:
+            court_ids = [c.id for c in courts]
+            occupancy = engine.build_occupancy(court_ids, date_from, date_to)
+            engine.add_live_holds(occupancy, court_ids, date_from, date_to)
+        days = list(engine.dates(date_from, date_to))
+        
+        matrix = []
+        for court in courts:
+            matrix.append({
+                'court_id': court.id,
+                'court_name': court.name,
+                'court_price': str(court.price),
+                'days': [
+                    {
+                        'date': day.isoformat(),
+                        'available': [
+                            available for _start, _end, available
+                            in engine.day_slots(day, occupancy.get((court.id, day), 0))
+                        ],
+                    }
+                    for day in days
+                ],
+            })
+        
+        return {
+            'config': config,
+            'slots': [
+                {'start_time': minutes_to_str(start), 'end_time': minutes_to_str(end)}
+                for start, end, _mask in engine.grid
+            ],
+            'courts': matrix,
+        }
+    
     @staticmethod
     def get_available_slots(court, date, slot_duration_minutes=90):
         """
@@ -420,3 +682,279 @@ class BookingService:
             current_time = current_dt.time()
         
         return slots
+
+
+class SlotHoldService:
+    """
+    Retenciones temporales de horarios durante la reserva online
+    Las retenciones vencidas se ignoran al leer y se borran en lote (sweep_expired)
+    """
+    
+    @staticmethod
+    def live_overlapping(court_id, date, start_time, end_time, now=None):
+        """Retenciones vigentes que se superponen con el intervalo"""
+        return SlotHold.objects.filter(
+            court_id=court_id,
+            date=date,
+            start_time__lt=end_time,
+            end_time__gt=start_time,
+            expires_at__gt=now or timezone.now(),
+        )
+    
+    @staticmethod
+    @transaction.atomic
+    def create_hold(court, date, start_time, end_time, client=''):
+        """
+        Retener un horario por SLOT_HOLD_MINUTES minutos
+        - Solo turnos de la grilla configurada (inicio y duración exactos)
+        - Cada cliente puede tener como mucho SLOT_HOLD_MAX_PER_CLIENT
+          retenciones vigentes
+        """
+        if not court.is_active:
+            raise ValueError('No se pueden crear turnos en una cancha inactiva')
+        
+        if end_time <= start_time:
+            raise ValueError('La hora de fin debe ser posterior a la hora de inicio')
+        
+        now = timezone.now()
+        if timezone.make_aware(datetime.combine(date, start_time)) <= now:
+            raise ValueError('No se pueden reservar horarios pasados')
+        
+        grid = AvailabilityEngine.build_grid(TimeSlotConfiguration.get_active())
+        interval = (time_to_minutes(start_time), time_to_minutes(end_time))
+        if interval not in {(start, end) for start, end, _mask in grid}:
+            raise ValueError('El horario no corresponde a un turno disponible')
+        
+        if client and SlotHold.objects.filter(client=client, expires_at__gt=now).count() >= settings.SLOT_HOLD_MAX_PER_CLIENT:
+            raise ValueError('Ya tenés horarios retenidos. Completá o liberá esas reservas primero.')
+        
+        CourtDayLock.acquire(court.id, date)
+        
+        # Bajo el lock: el horario no debe estar reservado ni retenido
+        taken = Booking.objects.filter(
+            court=court,
+            date=date,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        ).exclude(status='cancelled').exists()
+        if taken or SlotHoldService.live_overlapping(court.id, date, start_time, end_time, now).exists():
+            raise ValueError('Este horario ya no está disponible. Por favor elegí otro.')
+        
+        hold = SlotHold.objects.create(
+            court=court,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            client=client,
+            expires_at=now + timedelta(minutes=settings.SLOT_HOLD_MINUTES),
+        )
+        AvailabilityCache.invalidate_on_commit(date, court.id)
+        
+        return hold
+    
+    @staticmethod
+    def release_hold(hold_id):
+        """
+        Liberar una retención antes de que venza
+        """
+        hold = SlotHold.objects.filter(token=hold_id).first()
+        if not hold:
+            raise ValueError('Retención no encontrada')
+        
+        hold.delete()
+        AvailabilityCache.invalidate_on_commit(hold.date, hold.court_id)
+    
+    @staticmethod
+    def sweep_expired(now=None):
+        """
+        Borrar en lote las retenciones vencidas (un solo DELETE)
+        No hace falta invalidar el cache: las entradas ya vencen con la retención
+        """
+        deleted, _ = SlotHold.objects.filter(expires_at__lte=now or timezone.now()).delete()
+        return deleted
+
+
+class RecurringBookingService:
+    """
+    Lógica de negocio para turnos fijos
+    """
+    
+    @staticmethod
+    @transaction.atomic
+    def materialize(weeks=None, recurring_bookings=None, date_from=None):
+        """
+        Crear las ocurrencias de los turnos fijos activos hasta `weeks` semanas adelante
+        - Una sola query de turnos existentes para todo el rango (bitmap por cancha-día)
+        - Un único bulk_create para todas las ocurrencias nuevas
+        Es idempotente: las ocurrencias ya materializadas (aunque estén canceladas)
+        no se vuelven a crear.
+        Devuelve {'created': n, 'skipped': n, 'conflicts': [...]}
+        """
+        weeks = weeks or settings.RECURRING_BOOKINGS_WEEKS_AHEAD
+        date_from = date_from or timezone.localdate()
+        date_to = date_from + timedelta(weeks=weeks) - timedelta(days=1)
+        
+        if recurring_bookings is None:
+            recurring_bookings = RecurringBooking.objects.filter(is_active=True)
+        recurrences = list(recurring_bookings.select_related('court'))
+        
+        result = {'created': 0, 'skipped': 0, 'conflicts': []}
+        
+        candidates = [
+            (recurrence, day)
+            for recurrence in recurrences
+            for day in recurrence.occurrence_dates(date_from, date_to)
+        ]
+        if not candidates:
+            return result
+        
+        # Ocurrencias ya materializadas
+        existing = set(Booking.objects.filter(
+            recurring_booking__in=recurrences,
+            date__gte=date_from,
+            date__lte=date_to,
+        ).values_list('recurring_booking_id', 'date'))
+        
+        pending = [(r, day) for r, day in candidates if (r.id, day) not in existing]
+        result['skipped'] = len(candidates) - len(pending)
+        if not pending:
+            return result
+        
+        # Locks de cancha-día en orden fijo para evitar deadlocks
+        for court_id, day in sorted({(r.court_id, day) for r, day in pending}):
+            CourtDayLock.acquire(court_id, day)
+        
+        # Una query para la ocupación de todas las canchas del rango
+        occupancy = AvailabilityEngine.build_occupancy(
+            {r.court_id for r, _day in pending}, date_from, date_to
+        )
+        
+        to_create = []
+        for recurrence, day in sorted(pending, key=lambda item: (item[1], item[0].start_time, item[0].id)):
+            conflict = None
+            mask = interval_mask(
+                time_to_minutes(recurrence.start_time), time_to_minutes(recurrence.end_time)
+            )
+            key = (recurrence.court_id, day)
+            
+            if not recurrence.court.is_active:
+                conflict = 'No se pueden crear turnos en una cancha inactiva'
+            elif occupancy.get(key, 0) & mask:
+                conflict = 'Ya existe un turno en este horario para esta cancha'
+            
+            if conflict:
+                result['conflicts'].append({
+                    'recurring_booking_id': recurrence.id,
+                    'court_name': recurrence.court.name,
+                    'date': day.isoformat(),
+                    'start_time': recurrence.start_time.strftime('%H:%M'),
+                    'end_time': recurrence.end_time.strftime('%H:%M'),
+                    'customer_name': recurrence.customer_name,
+                    'error': conflict,
+                })
+                continue
+            
+            # Reservar en memoria para detectar choques entre turnos fijos
+            occupancy[key] = occupancy.get(key, 0) | mask
+            to_create.append(Booking(
+                court_id=recurrence.court_id,
+                date=day,
+                start_time=recurrence.start_time,
+                end_time=recurrence.end_time,
+                status='reserved',
+                customer_name=recurrence.customer_name,
+                customer_phone=recurrence.customer_phone,
+                notes=recurrence.notes,
+                origin='admin',
+                created_by_id=recurrence.created_by_id,
+                recurring_booking=recurrence,
+            ))
+        
+        if to_create:
+            try:
+                with transaction.atomic():
+                    Booking.objects.bulk_create(to_create)
+            except IntegrityError as e:
+                if Booking.is_overlap_error(e):
+                    raise ValueError('Ya existe un turno en este horario para esta cancha')
+                raise
+            
+            # bulk_create no dispara señales: invalidar el cache de disponibilidad
+            for court_id, day in {(b.court_id, b.date) for b in to_create}:
+                AvailabilityCache.invalidate_on_commit(day, court_id)
+        
+        result['created'] = len(to_create)
+        return result
+    
+    # Campos que definen las fechas y el horario de las ocurrencias
+    SCHEDULE_FIELDS = ('court_id', 'weekday', 'start_time', 'end_time', 'start_date', 'end_date', 'is_active')
+    # Datos del cliente que se copian a cada ocurrencia
+    CUSTOMER_FIELDS = ('customer_name', 'customer_phone', 'notes')
+    
+    @staticmethod
+    def schedule(recurrence):
+        return tuple(getattr(recurrence, field) for field in RecurringBookingService.SCHEDULE_FIELDS)
+    
+    @staticmethod
+    @transaction.atomic
+    def cancel_future_occurrences(recurrence, detach=False, date_from=None):
+        """
+        Cancelar las ocurrencias futuras todavía reservadas de un turno fijo
+        Las pasadas, jugadas y ya canceladas no se tocan.
+        Con detach=True además se desvinculan del turno fijo, para que
+        materialize() pueda crear las del horario nuevo en esas fechas.
+        Devuelve la cantidad de turnos cancelados
+        """
+        date_from = date_from or timezone.localdate()
+        occurrences = Booking.objects.filter(
+            recurring_booking=recurrence,
+            date__gte=date_from,
+            status__in=['available', 'reserved'],
+        )
+        
+        # Locks de cancha-día en orden fijo, después releer bajo lock de fila
+        for court_id, day in sorted(set(occurrences.values_list('court_id', 'date'))):
+            CourtDayLock.acquire(court_id, day)
+        rows = list(occurrences.select_for_update().values_list('id', 'court_id', 'date'))
+        if not rows:
+            return 0
+        
+        fields = {'status': 'cancelled', 'updated_at': timezone.now()}
+        if detach:
+            fields['recurring_booking'] = None
+        Booking.objects.filter(id__in=[row[0] for row in rows]).update(**fields)
+        
+        # update() no dispara señales: invalidar el cache de disponibilidad
+        for court_id, day in {(court_id, day) for _id, court_id, day in rows}:
+            AvailabilityCache.invalidate_on_commit(day, court_id)
+        return len(rows)
+    
+    @staticmethod
+    @transaction.atomic
+    def sync_occurrences(recurrence, previous_schedule):
+        """
+        Llevar las ocurrencias futuras al estado actual del turno fijo
+        - Si cambió el horario, la cancha, la vigencia o se desactivó: cancelar
+          las ocurrencias futuras y materializar de nuevo (si sigue activo)
+        - Si solo cambiaron los datos del cliente: copiarlos a las futuras
+        Devuelve {'cancelled': n, 'created': n, 'skipped': n, 'conflicts': [...]}
+        """
+        result = {'cancelled': 0, 'created': 0, 'skipped': 0, 'conflicts': []}
+        
+        if RecurringBookingService.schedule(recurrence) == previous_schedule:
+            Booking.objects.filter(
+                recurring_booking=recurrence,
+                date__gte=timezone.localdate(),
+                status__in=['available', 'reserved'],
+            ).update(
+                updated_at=timezone.now(),
+                **{field: getattr(recurrence, field) for field in RecurringBookingService.CUSTOMER_FIELDS}
+            )
+            return result
+        
+        result['cancelled'] = RecurringBookingService.cancel_future_occurrences(recurrence, detach=True)
+        if recurrence.is_active:
+            result.update(RecurringBookingService.materialize(
+                recurring_bookings=RecurringBooking.objects.filter(pk=recurrence.pk)
+            ))
+        return result
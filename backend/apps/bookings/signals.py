@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from apps.courts.models import Court, TimeSlotConfiguration
+from .availability_cache import AvailabilityCache
+from .models import Booking
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_availability_key(sender, instance, **kwargs):
+    """
+    Recordar la cancha-día original para invalidarla si el turno se mueve
+    """
+    # Leer de __dict__ para no disparar queries con campos diferidos
+    instance._availability_key = (
+        instance.__dict__.get('court_id'),
+        instance.__dict__.get('date'),
+    )
+
+
+@receiver(post_save, sender=Booking)
+def invalidate_availability_on_booking_save(sender, instance, **kwargs):
+    keys = {(instance.court_id, instance.date), instance._availability_key}
+    for court_id, date in keys:
+        if court_id and date:
+            AvailabilityCache.invalidate_on_commit(date, court_id)
+    instance._availability_key = (instance.court_id, instance.date)
+
+
+@receiver(post_delete, sender=Booking)
+def invalidate_availability_on_booking_delete(sender, instance, **kwargs):
+    AvailabilityCache.invalidate_on_commit(instance.date, instance.court_id)
+
+
+@receiver([post_save, post_delete], sender=Court)
+@receiver(post_save, sender=TimeSlotConfiguration)
+def invalidate_availability_on_config_change(sender, instance, **kwargs):
+    AvailabilityCache.invalidate_all()
+    transaction.on_commit(AvailabilityCache.invalidate_all)
@@ -1,14 +1,30 @@
+import threading
+from io import StringIO
+from unittest import mock
 from decimal import Decimal
 from datetime import date, time, timedelta
 
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache, caches
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from .models import Booking, BookingClosure, CancellationToken
-from .services import BookingService
+from .models import (
+    Booking, BookingClosure, CancellationToken, IdempotencyKey, RecurringBooking, SlotHold,
+)
+from .services import BookingService, RecurringBookingService, SlotHoldService
+from .availability import AvailabilityEngine, interval_mask, minutes_to_str
+from .availability_cache import AvailabilityCache
+from .locks import CourtDayLock
+from .counters import get_counters, incr_counter, reset_counters
+from .idempotency import IdempotencyService
+from .pagination import keyset_page
+from apps.courts.config_cache import ConfigurationCache
 from apps.courts.models import Court, TimeSlotConfiguration
 
 User = get_user_model()
@@ -23,6 +39,11 @@ def future_date(days=7):
     return date.today() + timedelta(days=days)
 
 
+def app_queries(context):
+    """Queries captured outside the shared cache table."""
+    return [q['sql'] for q in context.captured_queries if 'django_cache' not in q['sql']]
+
+
 class BaseBookingTestCase(TestCase):
     """Base class with common setup for booking tests."""
 
@@ -289,6 +310,76 @@ class BookingServiceCreateTest(BaseBookingTestCase):
             )
         self.assertIn('Ya existe', str(ctx.exception))
 
+    def test_create_booking_after_cancel_same_slot(self):
+        first = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            customer_name='First',
+            user=self.admin,
+        )
+        BookingService.cancel_booking(first.id)
+        booking = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            customer_name='Second',
+            user=self.admin,
+        )
+        self.assertEqual(booking.status, 'reserved')
+
+    def test_create_booking_adjacent_slots_allowed(self):
+        for start, end in [(time(10, 0), time(11, 30)), (time(11, 30), time(13, 0))]:
+            BookingService.create_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=start,
+                end_time=end,
+                customer_name='Adjacent',
+                user=self.admin,
+            )
+        self.assertEqual(Booking.objects.filter(court=self.court).count(), 2)
+
+    def test_create_booking_without_overlap_query(self):
+        # La superposición la valida la constraint, sin SELECT previo de turnos
+        with CaptureQueriesContext(connection) as ctx:
+            BookingService.create_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(10, 0),
+                end_time=time(11, 30),
+                customer_name='Single',
+                user=self.admin,
+            )
+        selects = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'bookings_booking' in q['sql']
+        ]
+        self.assertEqual(selects, [])
+
+    def test_overlap_constraint_rejects_direct_insert(self):
+        Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            status='reserved',
+            customer_name='First',
+        )
+        with self.assertRaises(IntegrityError) as ctx:
+            with transaction.atomic():
+                Booking.objects.create(
+                    court=self.court,
+                    date=future_date(),
+                    start_time=time(11, 0),
+                    end_time=time(12, 0),
+                    status='reserved',
+                    customer_name='Overlap',
+                )
+        self.assertTrue(Booking.is_overlap_error(ctx.exception))
+
     def test_create_booking_inactive_court_raises(self):
         inactive = Court.objects.create(
             name='Inactiva', court_type='outdoor', is_active=False
@@ -331,6 +422,7 @@ class BookingServicePublicTest(BaseBookingTestCase):
 
     def test_public_booking_creates_notification(self):
         from apps.notifications.models import Notification
+        from apps.notifications.outbox import OutboxService
         BookingService.create_public_booking(
             court=self.court,
             date=future_date(),
@@ -339,6 +431,9 @@ class BookingServicePublicTest(BaseBookingTestCase):
             customer_name='Cliente',
             customer_phone='1155667788',
         )
+        # Se entrega fuera del request, con el worker del outbox
+        self.assertFalse(Notification.objects.exists())
+        OutboxService.drain()
         notifications = Notification.objects.filter(
             notification_type='booking_created'
         )
@@ -410,6 +505,7 @@ class BookingServiceCancelTest(BaseBookingTestCase):
 
     def test_cancel_creates_notification(self):
         from apps.notifications.models import Notification
+        from apps.notifications.outbox import OutboxService
         booking, _ = BookingService.create_public_booking(
             court=self.court,
             date=future_date(days=14),
@@ -422,6 +518,7 @@ class BookingServiceCancelTest(BaseBookingTestCase):
             notification_type='booking_cancelled'
         ).count()
         BookingService.cancel_booking_public(booking.id)
+        OutboxService.drain()
         new_count = Notification.objects.filter(
             notification_type='booking_cancelled'
         ).count()
@@ -513,6 +610,114 @@ class BookingServiceCloseTest(BaseBookingTestCase):
             )
 
 
+class BookingServiceBulkCloseTest(BaseBookingTestCase):
+    """Tests para BookingService - cierre por lote"""
+
+    def make_booking(self, hour, court=None):
+        return BookingService.create_booking(
+            court=court or self.court,
+            date=future_date(),
+            start_time=time(hour, 0),
+            end_time=time(hour + 1, 30),
+            customer_name=f'Lote {hour}',
+            user=self.admin,
+        )
+
+    def test_close_bookings_reports_each_item(self):
+        from apps.payments.models import DailyRevenue
+        from apps.products.models import Consumption, Product
+        first, second = self.make_booking(10), self.make_booking(10, self.court2)
+        cancelled = self.make_booking(14)
+        BookingService.cancel_booking(cancelled.id)
+        product = Product.objects.create(name='Agua', category='beverage', price=1500, stock=None)
+        Consumption.objects.create(booking=first, product=product, quantity=2, unit_price=Decimal('1500'))
+
+        results = BookingService.close_bookings([
+            {'booking_id': first.id, 'cash_amount': Decimal('24000')},
+            {'booking_id': second.id, 'cash_amount': Decimal('4000'), 'transfer_amount': Decimal('20000')},
+            {'booking_id': cancelled.id, 'cash_amount': Decimal('24000')},
+            {'booking_id': second.id, 'cash_amount': Decimal('24000')},
+            {'booking_id': 999999, 'cash_amount': Decimal('24000')},
+        ], user=self.admin)
+
+        self.assertEqual([r['closure'] is not None for r in results], [True, True, False, False, False])
+        self.assertIn('reservados', results[2]['error'])
+        self.assertIn('repetido', results[3]['error'])
+        self.assertEqual(results[4]['error'], 'Turno no encontrado')
+
+        closure = BookingClosure.objects.get(booking=first)
+        self.assertEqual(closure.consumptions_amount, Decimal('3000'))
+        self.assertEqual(closure.total_amount, Decimal('27000'))
+        self.assertEqual(
+            set(Booking.objects.filter(pk__in=[first.id, second.id]).values_list('status', flat=True)),
+            {'completed'}
+        )
+        rollup = DailyRevenue.objects.get(date=first.date, court=self.court2)
+        self.assertEqual((rollup.closures_count, rollup.transfer_amount), (1, Decimal('20000')))
+        self.assertEqual(DailyRevenue.objects.get(court=self.court).total_amount, Decimal('27000'))
+
+    def test_close_bookings_rejects_wrong_split(self):
+        booking = self.make_booking(10)
+        results = BookingService.close_bookings([
+            {'booking_id': booking.id, 'cash_amount': Decimal('1000')},
+        ])
+        self.assertIn('debe ser igual', results[0]['error'])
+        self.assertFalse(BookingClosure.objects.exists())
+
+
+class ClosureConsumptionsTest(BaseBookingTestCase):
+    """Tests para el recálculo de consumos en el cierre"""
+
+    def setUp(self):
+        super().setUp()
+        from apps.products.models import Product
+        self.product = Product.objects.create(name='Gatorade', category='beverage', price=2000, stock=None)
+
+    def closed_booking(self, hour=10):
+        booking = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(hour, 0),
+            end_time=time(hour + 1, 30),
+            customer_name=f'Consumos {hour}',
+            user=self.admin,
+        )
+        BookingService.close_booking(booking.id, booking_amount=Decimal('24000'), cash_amount=Decimal('24000'))
+        return booking
+
+    def add_consumption(self, booking, quantity=1):
+        from apps.products.models import Consumption
+        return Consumption.objects.create(
+            booking=booking, product=self.product, quantity=quantity, unit_price=Decimal('2000')
+        )
+
+    def test_close_booking_includes_existing_consumptions(self):
+        booking = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(16, 0),
+            end_time=time(17, 30),
+            customer_name='Antes del cierre',
+            user=self.admin,
+        )
+        self.add_consumption(booking, 3)
+        closure = BookingService.close_booking(booking.id, booking_amount=Decimal('24000'), cash_amount=Decimal('24000'))
+        self.assertEqual(closure.consumptions_amount, Decimal('6000'))
+
+    def test_recalculate_several_bookings_at_once(self):
+        from apps.products.models import Consumption
+        first, second = self.closed_booking(10), self.closed_booking(14)
+        Consumption.objects.bulk_create([
+            Consumption(booking=first, product=self.product, quantity=1, unit_price=Decimal('2000'), total_price=Decimal('2000')),
+            Consumption(booking=second, product=self.product, quantity=2, unit_price=Decimal('2000'), total_price=Decimal('4000')),
+        ])
+        self.assertEqual(BookingService.recalculate_consumptions_amount([first.id, second.id]), 2)
+        self.assertEqual(
+            sorted(BookingClosure.objects.values_list('total_amount', flat=True)),
+            [Decimal('26000'), Decimal('28000')],
+        )
+
+
 class BookingServiceSearchTest(BaseBookingTestCase):
     """Tests para BookingService - búsqueda"""
 
@@ -603,6 +808,548 @@ class BookingServiceSlotsTest(BaseBookingTestCase):
             self.assertFalse(booked_slot['available'])
 
 
+class AvailabilityEngineTest(BaseBookingTestCase):
+    """Tests para el motor de disponibilidad por bitmaps"""
+
+    def test_interval_mask(self):
+        self.assertEqual(interval_mask(2, 5), 0b11100)
+        self.assertEqual(interval_mask(5, 5), 0)
+
+    def test_grid_follows_configuration(self):
+        engine = AvailabilityEngine(TimeSlotConfiguration.get_active())
+        starts = [minutes_to_str(start) for start, _end, _mask in engine.grid]
+        self.assertEqual(starts[0], '08:00')
+        self.assertEqual(starts[1], '09:30')
+        _start, last_end, _mask = engine.grid[-1]
+        self.assertLessEqual(last_end, 23 * 60)
+
+    def test_partial_overlap_blocks_slot(self):
+        Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(9, 0),
+            end_time=time(9, 45),
+            status='reserved',
+            customer_name='Partial',
+        )
+        slots = BookingService.generate_available_slots(
+            future_date(), court_id=self.court.id
+        )
+        by_start = {s['start_time']: s['available'] for s in slots}
+        self.assertFalse(by_start['08:00'])
+        self.assertFalse(by_start['09:30'])
+        self.assertTrue(by_start['11:00'])
+
+    def test_cancelled_booking_does_not_block(self):
+        Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(8, 0),
+            end_time=time(9, 30),
+            status='cancelled',
+            customer_name='Cancelled',
+        )
+        occupancy = AvailabilityEngine.build_occupancy([self.court.id], future_date())
+        self.assertEqual(occupancy.get((self.court.id, future_date()), 0), 0)
+
+    def test_past_day_has_no_available_slots(self):
+        engine = AvailabilityEngine(TimeSlotConfiguration.get_active())
+        yesterday = date.today() - timedelta(days=1)
+        self.assertFalse(any(available for _s, _e, available in engine.day_slots(yesterday, 0)))
+
+    def test_today_cutoff_uses_current_time(self):
+        now = timezone.localtime(timezone.now()).replace(hour=12, minute=0, second=0, microsecond=0)
+        engine = AvailabilityEngine(TimeSlotConfiguration.get_active(), now=now)
+        slots = {minutes_to_str(s): available for s, _e, available in engine.day_slots(now.date(), 0)}
+        self.assertFalse(slots['11:00'])
+        self.assertTrue(slots['12:30'])
+
+    def test_generate_slots_query_count(self):
+        # Configuración + canchas + bookings + retenciones (más el cache)
+        with CaptureQueriesContext(connection) as ctx:
+            BookingService.generate_available_slots(future_date())
+        self.assertEqual(len(app_queries(ctx)), 4)
+
+
+class AvailabilityCacheTest(BaseBookingTestCase):
+    """Tests para el cache de disponibilidad"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        AvailabilityCache.reset_stats()
+
+    def test_second_call_is_cache_hit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.generate_available_slots(future_date())
+            with CaptureQueriesContext(connection) as ctx:
+                BookingService.generate_available_slots(future_date())
+        self.assertEqual(app_queries(ctx), [])
+        stats = AvailabilityCache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_booking_save_invalidates_court_day(self):
+        BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        BookingService.generate_available_slots(future_date())
+        BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(8, 0),
+            end_time=time(9, 30),
+            customer_name='Invalidate',
+            user=self.admin,
+        )
+        self.assertIsNone(AvailabilityCache.get(future_date(), self.court.id))
+        self.assertIsNone(AvailabilityCache.get(future_date()))
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        self.assertFalse(slots[0]['available'])
+
+    def test_store_racing_an_invalidation_is_not_served(self):
+        # Una lectura toma la clave y calcula con el estado previo al turno...
+        _, key = AvailabilityCache.lookup(future_date(), self.court.id)
+        stale = BookingService.compute_day_availability(future_date(), self.court.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.create_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(8, 0),
+                end_time=time(9, 30),
+                customer_name='Carrera',
+                user=self.admin,
+            )
+        # ...y guarda recién después de la invalidación del commit
+        AvailabilityCache.store(key, stale, expires_at=stale['expires_at'])
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        self.assertFalse(slots[0]['available'])
+
+    def test_booking_cancel_and_move_invalidate(self):
+        booking = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(8, 0),
+            end_time=time(9, 30),
+            customer_name='Move',
+            user=self.admin,
+        )
+        BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        booking.date = future_date(8)
+        booking.save()
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        self.assertTrue(slots[0]['available'])
+
+    def test_config_change_invalidates_everything(self):
+        BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        config = TimeSlotConfiguration.get_active()
+        config.slot_duration_minutes = 60
+        config.save()
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        self.assertEqual(slots[0]['end_time'], '09:00')
+
+    def test_past_flag_applied_at_read_time(self):
+        today = timezone.localdate()
+        BookingService.generate_available_slots(today, court_id=self.court.id)
+        cached = AvailabilityCache.get(today, self.court.id)
+        # La entrada cacheada no depende de la hora actual
+        self.assertTrue(all(cached['courts'][0][3]))
+
+    def test_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/bookings/availability-cache/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
+
+
+class SharedCacheTest(TransactionTestCase):
+    """Tests para el cache compartido en la base"""
+
+    def setUp(self):
+        cache.clear()
+        # Sin borrado automático de vencidas: el test las borra a mano
+        self.cull_every, caches['default']._cull_every = caches['default']._cull_every, 0
+
+    def tearDown(self):
+        caches['default']._cull_every = self.cull_every
+
+    def test_cache_hit_does_not_write_counters(self):
+        Court.objects.create(name='Cancha 1', court_type='indoor', price=24000, is_active=True)
+        TimeSlotConfiguration.objects.create(is_active=True)
+        ConfigurationCache.clear()
+        AvailabilityCache.reset_stats()
+        BookingService.generate_available_slots(future_date())
+        with CaptureQueriesContext(connection) as ctx:
+            BookingService.generate_available_slots(future_date())
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in ctx.captured_queries))
+        self.assertEqual(AvailabilityCache.stats()['hits'], 1)
+
+    @override_settings(COUNTERS_FLUSH_INTERVAL=0)
+    def test_counters_flush_to_shared_cache(self):
+        reset_counters('contador')
+        incr_counter('contador')
+        incr_counter('contador', 2)
+        self.assertEqual(cache.get('contador'), 3)
+        with transaction.atomic():
+            incr_counter('contador')
+            self.assertEqual(cache.get('contador'), 3)
+        self.assertEqual(get_counters('contador'), {'contador': 4})
+
+    def test_add_is_atomic_and_replaces_expired(self):
+        self.assertTrue(cache.add('clave', 1))
+        self.assertFalse(cache.add('clave', 2))
+        cache.set('vieja', 1, timeout=-1)
+        self.assertTrue(cache.add('vieja', 3))
+        self.assertEqual(cache.get_many(['clave', 'vieja']), {'clave': 1, 'vieja': 3})
+
+    def test_incr(self):
+        cache.set('contador', 5, timeout=None)
+        self.assertEqual(cache.incr('contador', 2), 7)
+        self.assertEqual(cache.get('contador'), 7)
+        with self.assertRaises(ValueError):
+            cache.incr('no-existe')
+
+    def test_cull_deletes_expired_in_batches(self):
+        for i in range(5):
+            cache.set(f'vencida-{i}', i, timeout=-1)
+        cache.set('vigente', 1)
+        self.assertEqual(cache.cull(batch_size=2), 5)
+        self.assertEqual(cache.get('vigente'), 1)
+
+    def test_cull_command(self):
+        cache.set('vencida', 1, timeout=-1)
+        out = StringIO()
+        call_command('cull_cache', stdout=out)
+        self.assertIn('Entradas de cache borradas: 1', out.getvalue())
+
+
+class CourtDayLockTest(BaseBookingTestCase):
+    """Tests para el lock por cancha-día"""
+
+    def setUp(self):
+        super().setUp()
+        CourtDayLock.reset_stats()
+
+    def test_state_changes_take_lock(self):
+        # Los contadores se incrementan al confirmar cada transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = BookingService.create_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(10, 0),
+                end_time=time(11, 30),
+                customer_name='Lock',
+                user=self.admin,
+            )
+            BookingService.cancel_booking(booking.id)
+        self.assertEqual(CourtDayLock.stats()['acquired'], 2)
+
+    def test_cancel_rereads_status_under_lock(self):
+        booking = BookingService.create_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            customer_name='Stale',
+            user=self.admin,
+        )
+        Booking.objects.filter(pk=booking.id).update(status='completed')
+        with self.assertRaises(ValueError):
+            BookingService.cancel_booking(booking.id)
+
+    def test_contention_is_measured(self):
+        other = connection.copy()
+        other.ensure_connection()
+        # Conexión psycopg2 cruda: puede usarse desde el thread del timer
+        raw = other.connection
+        key = (self.court.id, future_date().toordinal())
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s, %s)', key)
+
+            def release():
+                with raw.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s, %s)', key)
+
+            timer = threading.Timer(0.2, release)
+            timer.start()
+            with self.captureOnCommitCallbacks(execute=True):
+                CourtDayLock.acquire(self.court.id, future_date())
+            timer.join()
+        finally:
+            other.close()
+        stats = CourtDayLock.stats()
+        self.assertEqual(stats['contended'], 1)
+        self.assertGreaterEqual(stats['total_wait_ms'], 100)
+
+
+
+class CourtDayLockMoveTest(TransactionTestCase):
+    """El lock sigue al turno si lo mueven de cancha o día antes de tomarlo"""
+
+    def test_lock_follows_moved_booking(self):
+        court = Court.objects.create(name='Cancha 1', court_type='indoor', price=24000)
+        court2 = Court.objects.create(name='Cancha 2', court_type='outdoor', price=24000)
+        booking = Booking.objects.create(
+            court=court, date=future_date(), start_time=time(10, 0), end_time=time(11, 30),
+            status='reserved', customer_name='Movido',
+        )
+        CourtDayLock.reset_stats()
+        other = connection.copy()
+        other.ensure_connection()
+        raw = other.connection
+        key = (court.id, booking.date.toordinal())
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s, %s)', key)
+
+            def move_and_release():
+                # Otra transacción mueve el turno mientras se espera el lock
+                with raw.cursor() as cursor:
+                    cursor.execute(
+                        f'UPDATE {Booking._meta.db_table} SET court_id = %s WHERE id = %s',
+                        [court2.id, booking.id]
+                    )
+                    cursor.execute('SELECT pg_advisory_unlock(%s, %s)', key)
+
+            timer = threading.Timer(0.2, move_and_release)
+            timer.start()
+            cancelled = BookingService.cancel_booking(booking.id)
+            timer.join()
+        finally:
+            other.close()
+        self.assertEqual(cancelled.court_id, court2.id)
+        # Cancha-día original y la nueva
+        self.assertEqual(CourtDayLock.stats()['acquired'], 2)
+
+class KeysetPaginationTest(BaseBookingTestCase):
+    """Tests para paginación por clave de turnos e historial"""
+
+    def setUp(self):
+        super().setUp()
+        for days in (3, 4):
+            for hour in (10, 12, 14):
+                Booking.objects.create(
+                    court=self.court,
+                    date=future_date(days),
+                    start_time=time(hour, 0),
+                    end_time=time(hour + 1, 30),
+                    status='reserved',
+                    customer_name=f'Keyset {days}-{hour}',
+                )
+
+    def walk(self, descending=False):
+        seen, cursor = [], None
+        while True:
+            items, cursor = keyset_page(Booking.objects.all(), cursor=cursor, limit=4, descending=descending)
+            seen.extend(b.id for b in items)
+            if cursor is None:
+                return seen
+
+    def test_walk_ascending_matches_full_ordering(self):
+        expected = list(Booking.objects.order_by('date', 'start_time', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(), expected)
+
+    def test_walk_descending_matches_full_ordering(self):
+        expected = list(Booking.objects.order_by('-date', '-start_time', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(descending=True), expected)
+
+    def test_page_does_not_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            keyset_page(Booking.objects.all(), limit=4)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('COUNT', ctx.captured_queries[0]['sql'])
+
+    def test_invalid_cursor_raises(self):
+        with self.assertRaises(ValueError):
+            keyset_page(Booking.objects.all(), cursor='no-es-un-cursor')
+
+    def test_history_is_paginated(self):
+        from apps.payments.services import ReportService
+        page = ReportService.get_history(limit=4)
+        self.assertEqual(len(page['results']), 4)
+        rest = ReportService.get_history(limit=4, cursor=page['next_cursor'])
+        self.assertEqual(len(rest['results']), 2)
+        self.assertIsNone(rest['next_cursor'])
+
+
+class RecurringBookingServiceTest(BaseBookingTestCase):
+    """Tests para materialización de turnos fijos"""
+
+    def setUp(self):
+        super().setUp()
+        self.start = future_date(1)
+        self.recurrence = RecurringBooking.objects.create(
+            court=self.court,
+            weekday=self.start.weekday(),
+            start_time=time(20, 0),
+            end_time=time(21, 30),
+            start_date=self.start,
+            customer_name='Fijo',
+            created_by=self.admin,
+        )
+
+    def test_occurrence_dates(self):
+        dates = self.recurrence.occurrence_dates(self.start - timedelta(days=3), self.start + timedelta(weeks=2))
+        self.assertEqual(dates, [self.start, self.start + timedelta(weeks=1), self.start + timedelta(weeks=2)])
+
+    def test_materialize_creates_occurrences(self):
+        result = RecurringBookingService.materialize(weeks=4, date_from=self.start)
+        self.assertEqual(result['created'], 4)
+        self.assertEqual(result['conflicts'], [])
+        self.assertEqual(self.recurrence.occurrences.filter(status='reserved').count(), 4)
+
+    def test_materialize_is_idempotent(self):
+        RecurringBookingService.materialize(weeks=4, date_from=self.start)
+        result = RecurringBookingService.materialize(weeks=4, date_from=self.start)
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['skipped'], 4)
+
+    def test_materialize_reports_conflicts(self):
+        Booking.objects.create(
+            court=self.court,
+            date=self.start + timedelta(weeks=1),
+            start_time=time(21, 0),
+            end_time=time(22, 0),
+            status='reserved',
+            customer_name='Ocupado',
+        )
+        result = RecurringBookingService.materialize(weeks=3, date_from=self.start)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(len(result['conflicts']), 1)
+        self.assertEqual(result['conflicts'][0]['date'], (self.start + timedelta(weeks=1)).isoformat())
+
+    def test_materialize_detects_conflicts_between_recurrences(self):
+        RecurringBooking.objects.create(
+            court=self.court,
+            weekday=self.start.weekday(),
+            start_time=time(21, 0),
+            end_time=time(22, 0),
+            start_date=self.start,
+            customer_name='Otro fijo',
+        )
+        result = RecurringBookingService.materialize(weeks=2, date_from=self.start)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(len(result['conflicts']), 2)
+
+    def test_materialize_invalidates_availability_cache(self):
+        cache.clear()
+        BookingService.generate_available_slots(self.start, court_id=self.court.id)
+        RecurringBookingService.materialize(weeks=1, date_from=self.start)
+        self.assertIsNone(AvailabilityCache.get(self.start, self.court.id))
+
+    def test_materialize_command(self):
+        out = StringIO()
+        call_command('materialize_recurring_bookings', weeks=2, stdout=out)
+        self.assertIn('Turnos creados', out.getvalue())
+
+
+class SlotHoldServiceTest(BaseBookingTestCase):
+    """Tests para retenciones temporales de horarios"""
+
+    def hold(self, start=time(9, 30), end=time(11, 0)):
+        return SlotHoldService.create_hold(self.court, future_date(), start, end)
+
+    def test_hold_blocks_slot_in_availability(self):
+        self.hold()
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        by_start = {s['start_time']: s['available'] for s in slots}
+        self.assertFalse(by_start['09:30'])
+
+    def test_overlapping_hold_rejected(self):
+        self.hold()
+        with self.assertRaises(ValueError):
+            self.hold()
+
+    def test_public_booking_consumes_hold(self):
+        hold = self.hold()
+        BookingService.create_public_booking(
+            court=self.court,
+            date=future_date(),
+            start_time=time(9, 30),
+            end_time=time(11, 0),
+            customer_name='Holder',
+            customer_phone='1122334455',
+            hold_id=hold.token,
+        )
+        self.assertFalse(SlotHold.objects.filter(pk=hold.pk).exists())
+
+    def test_public_booking_rejects_hold_for_other_slot(self):
+        self.hold()
+        other = self.hold(time(14, 0), time(15, 30))
+        with self.assertRaises(ValueError) as ctx:
+            BookingService.create_public_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(9, 30),
+                end_time=time(11, 0),
+                customer_name='Other',
+                customer_phone='1122334455',
+                hold_id=other.token,
+            )
+        self.assertIn('retención', str(ctx.exception))
+        self.assertTrue(SlotHold.objects.filter(pk=other.pk).exists())
+
+    def test_public_booking_rejects_expired_hold(self):
+        hold = self.hold()
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        with self.assertRaises(ValueError):
+            BookingService.create_public_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(9, 30),
+                end_time=time(11, 0),
+                customer_name='Holder',
+                customer_phone='1122334455',
+                hold_id=hold.token,
+            )
+        self.assertFalse(Booking.objects.filter(customer_name='Holder').exists())
+
+    def test_public_booking_without_hold_blocked_by_hold(self):
+        self.hold()
+        with self.assertRaises(ValueError) as ctx:
+            BookingService.create_public_booking(
+                court=self.court,
+                date=future_date(),
+                start_time=time(9, 30),
+                end_time=time(11, 0),
+                customer_name='Other',
+                customer_phone='1122334455',
+            )
+        self.assertIn('ya no está disponible', str(ctx.exception))
+
+    def test_expired_hold_is_ignored_and_swept(self):
+        hold = self.hold()
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        cache.clear()
+        slots = BookingService.generate_available_slots(future_date(), court_id=self.court.id)
+        self.assertTrue(all(s['available'] for s in slots))
+        self.assertEqual(SlotHoldService.sweep_expired(), 1)
+        self.assertEqual(SlotHold.objects.count(), 0)
+
+    def test_cache_entry_bounded_by_hold_expiry(self):
+        hold = self.hold()
+        day = BookingService.compute_day_availability(future_date(), self.court.id)
+        self.assertEqual(day['expires_at'], hold.expires_at)
+
+    def test_hold_must_match_a_grid_slot(self):
+        for start, end in [(time(10, 0), time(11, 30)), (time(0, 0), time(23, 59)), (time(9, 30), time(12, 30))]:
+            with self.assertRaises(ValueError) as ctx:
+                self.hold(start, end)
+            self.assertIn('turno', str(ctx.exception))
+        self.assertEqual(SlotHold.objects.count(), 0)
+
+    @override_settings(SLOT_HOLD_MAX_PER_CLIENT=2)
+    def test_live_holds_limited_per_client(self):
+        for start, end in [(time(8, 0), time(9, 30)), (time(9, 30), time(11, 0))]:
+            SlotHoldService.create_hold(self.court, future_date(), start, end, client='10.0.0.1')
+        with self.assertRaises(ValueError):
+            SlotHoldService.create_hold(self.court, future_date(), time(11, 0), time(12, 30), client='10.0.0.1')
+        # Otro cliente no se ve afectado y las vencidas no cuentan
+        SlotHoldService.create_hold(self.court, future_date(), time(11, 0), time(12, 30), client='10.0.0.2')
+        SlotHold.objects.filter(client='10.0.0.1').update(expires_at=timezone.now() - timedelta(minutes=1))
+        SlotHoldService.create_hold(self.court, future_date(), time(12, 30), time(14, 0), client='10.0.0.1')
+
+
 # =============================================================================
 # API Tests - Admin Endpoints
 # =============================================================================
@@ -641,6 +1388,79 @@ class BookingAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['customer_name'], 'API Test')
 
+    def test_create_overlapping_booking_returns_error(self):
+        Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            status='reserved',
+            customer_name='Existing',
+        )
+        response = self.client.post('/api/bookings/', {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '11:00',
+            'end_time': '12:30',
+            'customer_name': 'Overlap',
+            'status': 'reserved',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Ya existe', str(response.data))
+
+    def test_list_bookings_keyset_mode(self):
+        for hour in (10, 12, 14):
+            Booking.objects.create(
+                court=self.court,
+                date=future_date(),
+                start_time=time(hour, 0),
+                end_time=time(hour + 1, 30),
+                status='reserved',
+                customer_name=f'Página {hour}',
+            )
+        response = self.client.get('/api/bookings/?pagination=keyset&limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual([b['customer_name'] for b in response.data['results']], ['Página 14'])
+        self.assertIsNone(response.data['next'])
+
+    def test_export_history_streams_csv_and_ndjson(self):
+        import json
+        booking = Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            status='reserved',
+            customer_name='Export, Test',
+        )
+        response = self.client.get('/api/reports/history/export/?output=csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,court_name,date'))
+        self.assertIn('"Export, Test"', lines[1])
+
+        response = self.client.get('/api/reports/history/export/?output=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows[0]['id'], booking.id)
+        self.assertEqual(rows[0]['status_display'], 'Reservado')
+        self.assertIsNone(rows[0]['total_amount'])
+
+    def test_analytics_api(self):
+        dt = future_date()
+        response = self.client.get(f'/api/reports/analytics/?date_from={dt}&date_to={dt}&group_by=weekday')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['metrics'], ['revenue', 'bookings', 'occupancy'])
+        response = self.client.get('/api/reports/analytics/?date_from=2025-01-01')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_history_invalid_output(self):
+        response = self.client.get('/api/reports/history/export/?output=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_calendar_excludes_cancelled(self):
         booking = Booking.objects.create(
             court=self.court,
@@ -723,6 +1543,187 @@ class BookingAPITest(APITestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_close_booking_idempotent_retry(self):
+        booking = Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(18, 0),
+            end_time=time(19, 30),
+            status='reserved',
+            customer_name='Doble Click',
+        )
+        payload = {'cash_amount': '24000.00', 'transfer_amount': '0.00'}
+        first = self.client.post(
+            f'/api/bookings/{booking.id}/close/', payload, HTTP_IDEMPOTENCY_KEY='close-1'
+        )
+        retry = self.client.post(
+            f'/api/bookings/{booking.id}/close/', payload, HTTP_IDEMPOTENCY_KEY='close-1'
+        )
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(BookingClosure.objects.filter(booking=booking).count(), 1)
+
+    def test_bulk_close(self):
+        bookings = [
+            Booking.objects.create(
+                court=self.court,
+                date=future_date(),
+                start_time=time(hour, 0),
+                end_time=time(hour + 1, 30),
+                status='reserved',
+                customer_name=f'Cierre {hour}',
+            )
+            for hour in (10, 14)
+        ]
+        response = self.client.post('/api/bookings/bulk-close/', {'items': [
+            {'booking_id': bookings[0].id, 'cash_amount': '24000.00'},
+            {'booking_id': bookings[1].id, 'cash_amount': '1.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['closed'], response.data['failed']), (1, 1))
+        self.assertEqual(Decimal(response.data['results'][0]['closure']['total_amount']), Decimal('24000'))
+        self.assertFalse(response.data['results'][1]['closed'])
+        self.assertIsNotNone(response.data['results'][1]['error'])
+
+    def test_create_consumption_idempotent_retry(self):
+        from apps.products.models import Consumption, Product
+        booking = Booking.objects.create(
+            court=self.court,
+            date=future_date(),
+            start_time=time(18, 0),
+            end_time=time(19, 30),
+            status='reserved',
+            customer_name='Consumo',
+        )
+        product = Product.objects.create(name='Agua', category='beverage', price=1500, stock=None)
+        payload = {'booking': booking.id, 'product': product.id, 'quantity': 2, 'unit_price': '1500.00'}
+        for _ in range(2):
+            response = self.client.post('/api/consumptions/', payload, HTTP_IDEMPOTENCY_KEY='cons-1')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Consumption.objects.filter(booking=booking).count(), 1)
+
+
+class RecurringBookingAPITest(APITestCase):
+    """Tests para API de turnos fijos"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', password='admin123', role='admin'
+        )
+        self.court = Court.objects.create(
+            name='Cancha 1', court_type='indoor', price=24000, is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_create_recurring_booking_materializes(self):
+        start = future_date(1)
+        response = self.client.post('/api/recurring-bookings/', {
+            'court': self.court.id,
+            'weekday': start.weekday(),
+            'start_time': '19:00',
+            'end_time': '20:30',
+            'start_date': str(start),
+            'customer_name': 'Fijo API',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(response.data['materialization']['created'], 0)
+        self.assertTrue(Booking.objects.filter(customer_name='Fijo API').exists())
+
+    def test_create_recurring_booking_invalid_times(self):
+        response = self.client.post('/api/recurring-bookings/', {
+            'court': self.court.id,
+            'weekday': 0,
+            'start_time': '20:00',
+            'end_time': '19:00',
+            'start_date': str(future_date(1)),
+            'customer_name': 'Bad',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def create_recurrence(self, start_time='19:00', end_time='20:30'):
+        start = future_date(1)
+        response = self.client.post('/api/recurring-bookings/', {
+            'court': self.court.id,
+            'weekday': start.weekday(),
+            'start_time': start_time,
+            'end_time': end_time,
+            'start_date': str(start),
+            'customer_name': 'Fijo API',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def test_create_failed_materialization_leaves_no_recurrence(self):
+        start = future_date(1)
+        with mock.patch.object(
+            RecurringBookingService, 'materialize',
+            side_effect=ValueError('Ya existe un turno en este horario para esta cancha')
+        ):
+            response = self.client.post('/api/recurring-bookings/', {
+                'court': self.court.id,
+                'weekday': start.weekday(),
+                'start_time': '19:00',
+                'end_time': '20:30',
+                'start_date': str(start),
+                'customer_name': 'Fijo API',
+            })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecurringBooking.objects.exists())
+
+    def test_update_time_rematerializes_future_occurrences(self):
+        recurrence_id = self.create_recurrence()
+        count = Booking.objects.filter(recurring_booking_id=recurrence_id).count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/recurring-bookings/{recurrence_id}/', {
+                'start_time': '21:00', 'end_time': '22:30',
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['materialization']['cancelled'], count)
+        self.assertEqual(response.data['materialization']['created'], count)
+
+        occurrences = Booking.objects.filter(recurring_booking_id=recurrence_id)
+        self.assertEqual(occurrences.count(), count)
+        self.assertTrue(all(b.start_time == time(21, 0) for b in occurrences))
+        self.assertEqual(
+            Booking.objects.filter(start_time=time(19, 0), status='reserved').count(), 0
+        )
+
+    def test_update_customer_propagates_to_future_occurrences(self):
+        recurrence_id = self.create_recurrence()
+        response = self.client.patch(f'/api/recurring-bookings/{recurrence_id}/', {
+            'customer_name': 'Nuevo Nombre',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['materialization']['cancelled'], 0)
+        occurrences = Booking.objects.filter(recurring_booking_id=recurrence_id)
+        self.assertTrue(all(b.customer_name == 'Nuevo Nombre' for b in occurrences))
+
+    def test_delete_cancels_future_occurrences(self):
+        recurrence_id = self.create_recurrence()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/recurring-bookings/{recurrence_id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(RecurringBooking.objects.exists())
+        self.assertFalse(Booking.objects.filter(status='reserved').exists())
+        self.assertTrue(Booking.objects.filter(status='cancelled').exists())
+
+    @override_settings(RECURRING_BOOKINGS_MAX_WEEKS=52)
+    def test_materialize_weeks_out_of_range(self):
+        recurrence_id = self.create_recurrence()
+        for weeks in [0, -1, 53, 10 ** 7, 'x']:
+            response = self.client.post(
+                f'/api/recurring-bookings/{recurrence_id}/materialize/', {'weeks': weeks}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, weeks)
+        response = self.client.post(
+            f'/api/recurring-bookings/{recurrence_id}/materialize/', {'weeks': 52}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 
 # =============================================================================
 # API Tests - Public Endpoints
@@ -753,10 +1754,66 @@ class PublicBookingAPITest(APITestCase):
         self.assertIn('slots', response.data)
         self.assertIn('config', response.data)
 
+    def test_public_available_slots_court_id_is_normalized(self):
+        dt = future_date()
+        url = f'/api/public/available-slots/?date={dt}&court_id='
+        self.client.get(url + f'0{self.court.id}')
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                court=self.court, date=dt, start_time=time(8, 0), end_time=time(9, 30),
+                status='reserved', customer_name='Normalizada',
+            )
+        for court_id in (str(self.court.id), f'0{self.court.id}'):
+            response = self.client.get(url + court_id)
+            self.assertFalse(response.data['slots'][0]['available'])
+        response = self.client.get(url + 'abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_public_available_slots_no_date(self):
         response = self.client.get('/api/public/available-slots/')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_public_availability_matrix(self):
+        Booking.objects.create(
+            court=self.court,
+            date=future_date(2),
+            start_time=time(8, 0),
+            end_time=time(9, 30),
+            status='reserved',
+            customer_name='Matrix',
+        )
+        response = self.client.get(
+            f'/api/public/availability/?date_from={future_date(1)}&date_to={future_date(7)}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['courts']), 1)
+        days = response.data['courts'][0]['days']
+        self.assertEqual(len(days), 7)
+        self.assertEqual(len(days[0]['available']), len(response.data['slots']))
+        self.assertFalse(days[1]['available'][0])
+        self.assertTrue(days[0]['available'][0])
+
+    def test_public_availability_matrix_range_limit(self):
+        response = self.client.get(
+            f'/api/public/availability/?date_from={future_date(1)}&date_to={future_date(40)}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_public_availability_matrix_invalid_court_id(self):
+        response = self.client.get(
+            f'/api/public/availability/?date_from={future_date(1)}&date_to={future_date(7)}&court_id=abc'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            f'/api/public/availability/?date_from={future_date(1)}&date_to={future_date(7)}&court_id=0{self.court.id}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['court_id'] for c in response.data['courts']], [self.court.id])
+
+    def test_public_availability_matrix_requires_dates(self):
+        response = self.client.get(f'/api/public/availability/?date_from={future_date(1)}')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_public_create_booking(self):
         response = self.client.post('/api/public/bookings/', {
             'court': self.court.id,
@@ -770,6 +1827,76 @@ class PublicBookingAPITest(APITestCase):
         self.assertEqual(response.data['customer_name'], 'Cliente Pub')
         self.assertIn('court_price', response.data)
 
+    def test_public_create_booking_idempotent_retry(self):
+        payload = {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '10:00',
+            'end_time': '11:30',
+            'customer_name': 'Doble Tap',
+            'customer_phone': '1155667788',
+        }
+        first = self.client.post('/api/public/bookings/', payload, HTTP_IDEMPOTENCY_KEY='abc-123')
+        retry = self.client.post('/api/public/bookings/', payload, HTTP_IDEMPOTENCY_KEY='abc-123')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Booking.objects.filter(customer_name='Doble Tap').count(), 1)
+
+    def test_public_idempotency_key_reused_with_other_payload(self):
+        payload = {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '10:00',
+            'end_time': '11:30',
+            'customer_name': 'Primero',
+            'customer_phone': '1155667788',
+        }
+        self.client.post('/api/public/bookings/', payload, HTTP_IDEMPOTENCY_KEY='abc-456')
+        payload['start_time'], payload['end_time'] = '14:00', '15:30'
+        response = self.client.post('/api/public/bookings/', payload, HTTP_IDEMPOTENCY_KEY='abc-456')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_purge_expired_idempotency_keys(self):
+        IdempotencyKey.objects.bulk_create([
+            IdempotencyKey(scope='public_booking', key=f'k{i}', request_hash='x') for i in range(5)
+        ])
+        IdempotencyKey.objects.filter(key__in=['k0', 'k1', 'k2']).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(IdempotencyService.purge_expired(batch_size=2), 3)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+    def test_public_hold_and_book(self):
+        response = self.client.post('/api/public/holds/', {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '09:30',
+            'end_time': '11:00',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        hold_id = response.data['hold_id']
+        response = self.client.post('/api/public/bookings/', {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '09:30',
+            'end_time': '11:00',
+            'customer_name': 'Con Retención',
+            'customer_phone': '1122334455',
+            'hold_id': hold_id,
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_public_release_hold(self):
+        response = self.client.post('/api/public/holds/', {
+            'court': self.court.id,
+            'date': str(future_date()),
+            'start_time': '09:30',
+            'end_time': '11:00',
+        })
+        response = self.client.delete(f"/api/public/holds/{response.data['hold_id']}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
     def test_public_create_booking_no_email_required(self):
         """Test que email no es requerido en la reserva pública"""
         response = self.client.post('/api/public/bookings/', {
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import RecurringBookingViewSet
+
+router = DefaultRouter()
+router.register(r'', RecurringBookingViewSet, basename='recurring-booking')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
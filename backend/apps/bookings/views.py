@@ -3,14 +3,21 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from datetime import datetime, timedelta
-from .models import Booking, BookingClosure
+from .models import Booking, BookingClosure, RecurringBooking
 from .serializers import (
     BookingSerializer, BookingListSerializer, BookingCalendarSerializer,
-    BookingCreateUpdateSerializer, BookingClosureSerializer, CloseBookingSerializer
+    BookingCreateUpdateSerializer, BookingClosureSerializer, CloseBookingSerializer,
+    BulkCloseSerializer, RecurringBookingSerializer
 )
-from .services import BookingService
+from .services import BookingService, RecurringBookingService
+from .availability_cache import AvailabilityCache
+from .locks import CourtDayLock
+from .idempotency import idempotent
+from .pagination import BookingPagination
 from apps.users.permissions import IsAdminOrReception
 
 
@@ -25,6 +32,7 @@ class BookingViewSet(viewsets.ModelViewSet):
     search_fields = ['customer_name', 'customer_phone']
     ordering_fields = ['date', 'start_time', 'created_at']
     ordering = ['date', 'start_time']
+    pagination_class = BookingPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -102,9 +110,11 @@ class BookingViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=True, methods=['post'])
+    @idempotent('booking_close')
     def close(self, request, pk=None):
         """
         Cerrar un turno
+        Acepta la cabecera Idempotency-Key para reintentos seguros
         """
         booking = self.get_object()
         
@@ -132,6 +142,34 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['post'], url_path='bulk-close')
+    @idempotent('booking_bulk_close')
+    def bulk_close(self, request):
+        """
+        Cerrar varios turnos de una vez (cierre de caja del día)
+        Body: {"items": [{"booking_id", "cash_amount", "transfer_amount", "booking_amount"?, "notes"?}]}
+        Devuelve el resultado de cada turno; los que fallan no frenan al resto
+        """
+        serializer = BulkCloseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = [
+            {
+                'booking_id': entry['booking_id'],
+                'closed': entry['closure'] is not None,
+                'closure': BookingClosureSerializer(entry['closure']).data if entry['closure'] else None,
+                'error': entry['error'],
+            }
+            for entry in BookingService.close_bookings(serializer.validated_data['items'], user=request.user)
+        ]
+        closed = sum(1 for entry in results if entry['closed'])
+        
+        return Response({
+            'closed': closed,
+            'failed': len(results) - closed,
+            'results': results,
+        })
+    
     @action(detail=True, methods=['get'])
     def closure(self, request, pk=None):
         """
@@ -147,3 +185,124 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         serializer = BookingClosureSerializer(booking.closure)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path='availability-cache')
+    def availability_cache(self, request):
+        """
+        Contadores de hits/misses del cache de disponibilidad pública
+        """
+        return Response(AvailabilityCache.stats())
+    
+    @action(detail=False, methods=['get'], url_path='lock-stats')
+    def lock_stats(self, request):
+        """
+        Métricas de contención de locks por cancha-día
+        """
+        return Response(CourtDayLock.stats())
+
+
+class RecurringBookingViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet para turnos fijos
+    Al crear un turno fijo se materializan sus ocurrencias hasta el horizonte configurado
+    """
+    queryset = RecurringBooking.objects.select_related('court')
+    serializer_class = RecurringBookingSerializer
+    permission_classes = [IsAdminOrReception]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = ['court', 'weekday', 'is_active']
+    search_fields = ['customer_name', 'customer_phone']
+    ordering_fields = ['weekday', 'start_time', 'created_at']
+    ordering = ['weekday', 'start_time']
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Si la materialización falla no queda el turno fijo sin ocurrencias
+        try:
+            with transaction.atomic():
+                recurrence = serializer.save(created_by=request.user)
+                result = RecurringBookingService.materialize(
+                    recurring_bookings=RecurringBooking.objects.filter(pk=recurrence.pk)
+                )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = dict(serializer.data)
+        data['materialization'] = result
+        return Response(data, status=status.HTTP_201_CREATED)
+    
+    def update(self, request, *args, **kwargs):
+        """
+        Actualizar un turno fijo y sus ocurrencias futuras
+        (ver RecurringBookingService.sync_occurrences)
+        """
+        partial = kwargs.pop('partial', False)
+        recurrence = self.get_object()
+        previous_schedule = RecurringBookingService.schedule(recurrence)
+        serializer = self.get_serializer(recurrence, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            with transaction.atomic():
+                recurrence = serializer.save()
+                result = RecurringBookingService.sync_occurrences(recurrence, previous_schedule)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = dict(serializer.data)
+        data['materialization'] = result
+        return Response(data)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Las ocurrencias futuras reservadas se cancelan; las pasadas quedan
+        # como historial (la FK pasa a NULL)
+        RecurringBookingService.cancel_future_occurrences(instance)
+        instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def materialize(self, request, pk=None):
+        """
+        Materializar las ocurrencias de un turno fijo
+        Body opcional: weeks (entre 1 y RECURRING_BOOKINGS_MAX_WEEKS)
+        """
+        recurrence = self.get_object()
+        
+        weeks = request.data.get('weeks')
+        if weeks in (None, ''):
+            weeks = None
+        else:
+            max_weeks = settings.RECURRING_BOOKINGS_MAX_WEEKS
+            try:
+                weeks = int(weeks)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'El parámetro weeks debe ser un número'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not 1 <= weeks <= max_weeks:
+                return Response(
+                    {'error': f'El parámetro weeks debe estar entre 1 y {max_weeks}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            result = RecurringBookingService.materialize(
+                weeks=weeks,
+                recurring_bookings=RecurringBooking.objects.filter(pk=recurrence.pk),
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(result)
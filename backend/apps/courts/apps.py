@@ -5,3 +5,6 @@ class CourtsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.courts'
     verbose_name = 'Canchas'
+    
+    def ready(self):
+        import apps.courts.signals
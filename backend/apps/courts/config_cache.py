@@ -0,0 +1,98 @@
+import copy
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+class ConfigurationCache:
+    """
+    Copia en memoria de la TimeSlotConfiguration activa, por proceso
+
+    Cada worker guarda la configuración junto con la versión con la que la
+    leyó. Para revalidar alcanza con leer la versión del cache compartido
+    (una lectura por clave primaria); si cambió, se vuelve a leer la configuración.
+    Guardar o borrar una configuración incrementa la versión (ver signals.py).
+
+    - La versión se incrementa al guardar y de nuevo al confirmar la
+      transacción: un worker que la lea en el medio puede guardar datos
+      viejos, pero el segundo incremento los descarta.
+    - Solo se guarda la copia leída fuera de un transaction.atomic, así
+      nunca queda en memoria una configuración que después se revierte.
+    - La versión se revalida como mucho cada CONFIGURATION_CACHE_REVALIDATE
+      segundos: dentro de esa ventana la copia se usa sin ninguna query, y un
+      cambio hecho en otro worker se ve con ese retraso (los cambios de este
+      mismo proceso descartan la copia en el momento).
+    - Además la copia vence a los CONFIGURATION_CACHE_MAX_AGE segundos, por si
+      el cache no es compartido entre workers o se pierde la versión.
+    - Cada llamada devuelve una copia: los threads no comparten la instancia.
+    """
+    VERSION_KEY = 'timeslot_configuration:version'
+
+    # (versión, momento de carga, momento de la última revalidación, configuración)
+    _entry = None
+
+    @staticmethod
+    def max_age():
+        return getattr(settings, 'CONFIGURATION_CACHE_MAX_AGE', 60)
+
+    @staticmethod
+    def revalidate_interval():
+        return getattr(settings, 'CONFIGURATION_CACHE_REVALIDATE', 1)
+
+    @classmethod
+    def version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            # Igual que la generación del cache de disponibilidad: arrancar de
+            # un valor nuevo para no reutilizar copias de una versión anterior
+            cache.add(cls.VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    def get(cls, loader):
+        """
+        Configuración activa; loader() la lee de la base si la copia no sirve
+        """
+        entry = cls._entry
+        now = time.monotonic()
+        if entry is not None:
+            entry_version, loaded_at, validated_at, config = entry
+            if now - loaded_at >= cls.max_age():
+                entry = None
+            elif now - validated_at < cls.revalidate_interval():
+                return copy.copy(config)
+
+        # Leer la versión ANTES que la base: si cambia en el medio, la copia
+        # queda guardada con la versión vieja y se descarta en la próxima lectura
+        version = cls.version()
+        if entry is not None and entry_version == version:
+            if not connection.in_atomic_block:
+                cls._entry = (version, loaded_at, now, config)
+            return copy.copy(config)
+
+        config = loader()
+        if not connection.in_atomic_block:
+            cls._entry = (version, now, now, copy.copy(config))
+        return config
+
+    @classmethod
+    def bump(cls):
+        """Incrementar la versión (invalida la copia de todos los workers)"""
+        cls._entry = None
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cls.version()
+
+    @classmethod
+    def bump_on_commit(cls):
+        """Incrementar ahora y de nuevo al confirmar la transacción"""
+        cls.bump()
+        transaction.on_commit(cls.bump)
+
+    @classmethod
+    def clear(cls):
+        """Descartar la copia local de este proceso"""
+        cls._entry = None
@@ -23,7 +23,9 @@ def update_configuration(request):
     """
     Actualizar configuración de horarios
     """
-    config = TimeSlotConfiguration.get_active()
+    # Leer de la base (no la copia cacheada) para no pisar cambios recientes;
+    # al guardar, la señal incrementa la versión del cache de configuración
+    config = TimeSlotConfiguration.load_active()
     partial = request.method == 'PATCH'
     serializer = TimeSlotConfigurationSerializer(config, data=request.data, partial=partial)
     serializer.is_valid(raise_exception=True)
@@ -98,8 +98,20 @@ class TimeSlotConfiguration(models.Model):
     
     @classmethod
     def get_active(cls):
-        """Obtener la configuración activa o crear una por defecto"""
+        """
+        Obtener la configuración activa (cacheada en memoria por proceso)
+        Ver ConfigurationCache; para leerla de la base usar load_active()
+        """
+        from .config_cache import ConfigurationCache
+        return ConfigurationCache.get(cls.load_active)
+    
+    @classmethod
+    def load_active(cls):
+        """Leer la configuración activa de la base o crear una por defecto"""
         config = cls.objects.filter(is_active=True).first()
         if not config:
             config = cls.objects.create(is_active=True)
+            # create() deja los defaults tal cual (horarios como str): releer
+            # para no guardar en el cache una instancia con tipos incorrectos
+            config.refresh_from_db()
         return config
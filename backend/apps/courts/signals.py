@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .config_cache import ConfigurationCache
+from .models import TimeSlotConfiguration
+
+
+@receiver([post_save, post_delete], sender=TimeSlotConfiguration)
+def bump_configuration_version(sender, instance, **kwargs):
+    """
+    Invalidar la copia en memoria de la configuración en todos los workers
+    """
+    ConfigurationCache.bump_on_commit()
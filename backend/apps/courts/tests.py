@@ -1,4 +1,9 @@
-from django.test import TestCase
+from datetime import time
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .config_cache import ConfigurationCache
 from .models import Court, TimeSlotConfiguration
 
 
@@ -44,3 +49,70 @@ class TimeSlotConfigurationTest(TestCase):
     def test_cancellation_hours_default(self):
         config = TimeSlotConfiguration.get_active()
         self.assertEqual(config.min_cancellation_hours, 2)
+
+
+class ConfigurationCacheTest(TransactionTestCase):
+    """Tests para la copia en memoria de la configuración (fuera de transacción)"""
+
+    def setUp(self):
+        cache.clear()
+        TimeSlotConfiguration.objects.create(is_active=True)
+        ConfigurationCache.clear()
+
+    def tearDown(self):
+        ConfigurationCache.clear()
+
+    def test_read_within_revalidate_interval_makes_no_queries(self):
+        TimeSlotConfiguration.get_active()
+        with self.assertNumQueries(0):
+            config = TimeSlotConfiguration.get_active()
+        self.assertEqual(config.slot_duration_minutes, 90)
+
+    def test_default_config_created_with_time_values(self):
+        TimeSlotConfiguration.objects.all().delete()
+        ConfigurationCache.clear()
+        config = TimeSlotConfiguration.get_active()
+        self.assertIsInstance(config.opening_time, time)
+        self.assertIsInstance(config.closing_time, time)
+        self.assertIsInstance(TimeSlotConfiguration.get_active().opening_time, time)
+
+    @override_settings(CONFIGURATION_CACHE_REVALIDATE=0)
+    def test_second_read_only_checks_version(self):
+        TimeSlotConfiguration.get_active()
+        with CaptureQueriesContext(connection) as ctx:
+            config = TimeSlotConfiguration.get_active()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('django_cache', ctx.captured_queries[0]['sql'])
+        self.assertEqual(config.slot_duration_minutes, 90)
+
+    def test_save_bumps_version(self):
+        config = TimeSlotConfiguration.get_active()
+        config.slot_duration_minutes = 60
+        config.save()
+        self.assertEqual(TimeSlotConfiguration.get_active().slot_duration_minutes, 60)
+
+    @override_settings(CONFIGURATION_CACHE_REVALIDATE=0)
+    def test_other_worker_bump_reloads(self):
+        TimeSlotConfiguration.get_active()
+        # Otro worker guardó la configuración: solo cambia la versión compartida
+        TimeSlotConfiguration.objects.update(min_cancellation_hours=6)
+        cache.incr(ConfigurationCache.VERSION_KEY)
+        self.assertEqual(TimeSlotConfiguration.get_active().min_cancellation_hours, 6)
+
+    def test_rolled_back_change_is_not_cached(self):
+        TimeSlotConfiguration.get_active()
+        try:
+            with transaction.atomic():
+                config = TimeSlotConfiguration.get_active()
+                config.opening_time = '10:00'
+                config.save()
+                self.assertEqual(str(TimeSlotConfiguration.get_active().opening_time), '10:00:00')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(str(TimeSlotConfiguration.get_active().opening_time), '08:00:00')
+
+    def test_returns_independent_copies(self):
+        first = TimeSlotConfiguration.get_active()
+        first.slot_duration_minutes = 30
+        self.assertEqual(TimeSlotConfiguration.get_active().slot_duration_minutes, 90)
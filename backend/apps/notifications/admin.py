@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationOutbox
 
 
 @admin.register(Notification)
@@ -7,3 +7,10 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['title', 'recipient', 'notification_type', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['title', 'message']
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['title', 'notification_type', 'attempts', 'available_at', 'processed_at', 'created_at']
+    list_filter = ['notification_type', 'processed_at']
+    search_fields = ['title', 'last_error']
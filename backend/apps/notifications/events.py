@@ -0,0 +1,139 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from django.db import connection, connections
+
+
+logger = logging.getLogger(__name__)
+
+# Canal de LISTEN/NOTIFY de PostgreSQL para avisos de notificaciones
+CHANNEL = 'notifications'
+
+# Eventos publicados en el canal
+CREATED = 'created'
+READ = 'read'
+# Aviso local a los streams después de reconectar el LISTEN (pudieron perderse avisos)
+RESYNC = 'resync'
+
+
+def publish(recipient_ids, event):
+    """
+    Avisar a los streams abiertos de los destinatarios con pg_notify
+    Dentro de una transacción el aviso se entrega recién al confirmarla
+    """
+    recipient_ids = sorted(set(recipient_ids))
+    if not recipient_ids:
+        return
+    payload = json.dumps({'event': event, 'recipients': recipient_ids})
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+
+class NotificationListener:
+    """
+    Un único LISTEN por proceso compartido por todos los streams del worker
+
+    Un thread en segundo plano mantiene una conexión propia escuchando el
+    canal y reparte cada aviso en la cola de los streams del destinatario.
+    Arranca con el primer stream y se cierra cuando no queda ninguno, así un
+    worker sin pestañas abiertas no retiene conexiones.
+    """
+    POLL_SECONDS = 1
+    READY_TIMEOUT = 5
+
+    _lock = threading.Lock()
+    _subscribers = {}
+    _thread = None
+    # Último thread arrancado (sigue referenciado mientras cierra la conexión)
+    _last_thread = None
+    _ready = threading.Event()
+
+    @classmethod
+    def subscribe(cls, user_id):
+        """
+        Registrar un stream y devolver su cola de eventos
+        Espera a que el LISTEN esté activo, así no se pierden avisos entre
+        la lectura inicial del stream y el primer aviso
+        """
+        subscription = queue.SimpleQueue()
+        with cls._lock:
+            cls._subscribers[subscription] = user_id
+            if cls._thread is None:
+                cls._ready.clear()
+                cls._thread = threading.Thread(target=cls._run, name='notifications-listener', daemon=True)
+                cls._thread.start()
+                cls._last_thread = cls._thread
+        cls._ready.wait(cls.READY_TIMEOUT)
+        return subscription
+
+    @classmethod
+    def count(cls):
+        """Cantidad de streams abiertos en este proceso"""
+        with cls._lock:
+            return len(cls._subscribers)
+
+    @classmethod
+    def unsubscribe(cls, subscription):
+        with cls._lock:
+            cls._subscribers.pop(subscription, None)
+
+    @classmethod
+    def join(cls, timeout=None):
+        """Esperar a que el thread termine (después del último unsubscribe)"""
+        thread = cls._last_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @classmethod
+    def _dispatch(cls, event, recipients=None):
+        with cls._lock:
+            targets = [
+                subscription for subscription, user_id in cls._subscribers.items()
+                if recipients is None or user_id in recipients
+            ]
+        for subscription in targets:
+            subscription.put(event)
+
+    @classmethod
+    def _listen(cls):
+        listener = connections['default'].copy()
+        listener.ensure_connection()
+        with listener.connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        return listener
+
+    @classmethod
+    def _run(cls):
+        listener = None
+        reconnected = False
+        try:
+            while True:
+                with cls._lock:
+                    if not cls._subscribers:
+                        cls._thread = None
+                        return
+                try:
+                    if listener is None:
+                        listener = cls._listen()
+                        cls._ready.set()
+                        if reconnected:
+                            cls._dispatch(RESYNC)
+                    raw = listener.connection
+                    if select.select([raw], [], [], cls.POLL_SECONDS)[0]:
+                        raw.poll()
+                        while raw.notifies:
+                            data = json.loads(raw.notifies.pop(0).payload)
+                            cls._dispatch(data['event'], set(data['recipients']))
+                except Exception:
+                    logger.exception('Error escuchando el canal de notificaciones; reconectando')
+                    if listener is not None:
+                        listener.close()
+                    listener = None
+                    reconnected = True
+                    time.sleep(cls.POLL_SECONDS)
+        finally:
+            if listener is not None:
+                listener.close()
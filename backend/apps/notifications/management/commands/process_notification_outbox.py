@@ -0,0 +1,59 @@
+import logging
+import select
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.notifications.outbox import CHANNEL, OutboxService
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Entregar las notificaciones pendientes del outbox (worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Cantidad de eventos tomados por lote (default: 100)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=30,
+            help='Segundos máximos de espera sin avisos, para los reintentos (default: 30)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar los pendientes y salir',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['once']:
+            processed = OutboxService.drain(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Eventos procesados: {processed}'))
+            return
+
+        listening = False
+        while True:
+            try:
+                if not listening:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'LISTEN {CHANNEL}')
+                    listening = True
+                # Vaciar antes de esperar: lo encolado sin worker también se entrega
+                OutboxService.drain(batch_size)
+                raw = connection.connection
+                # Avisos recibidos durante el lote: volver a vaciar sin esperar
+                if not raw.notifies and select.select([raw], [], [], options['poll_interval'])[0]:
+                    raw.poll()
+                raw.notifies.clear()
+            except Exception:
+                logger.exception('Error procesando el outbox de notificaciones; reconectando')
+                connection.close()
+                listening = False
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.notifications.retention import NotificationRetentionService
+
+
+class Command(BaseCommand):
+    help = 'Borrar en lotes las notificaciones vencidas según la política de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de notificaciones borradas por lote (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        deleted = NotificationRetentionService.prune(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Notificaciones borradas: {deleted['read']} leídas, {deleted['unread']} no leídas"
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.notifications.models import NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recalcular los contadores de notificaciones no leídas con una consulta agrupada'
+
+    def handle(self, *args, **options):
+        users = NotificationCounter.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados ({users} usuarios con no leídas)'))
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    """Contadores iniciales a partir de las notificaciones existentes"""
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationCounter = apps.get_model('notifications', 'NotificationCounter')
+    counts = (
+        Notification.objects.filter(is_read=False)
+        .values_list('recipient')
+        .annotate(unread=Count('id'))
+        .order_by()
+    )
+    NotificationCounter.objects.bulk_create([
+        NotificationCounter(user_id=user_id, unread=unread)
+        for user_id, unread in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('unread', models.IntegerField(default=0, verbose_name='No leídas')),
+            ],
+            options={
+                'verbose_name': 'Contador de notificaciones',
+                'verbose_name_plural': 'Contadores de notificaciones',
+            },
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 04:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_cache_table'),
+        ('notifications', '0002_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Título')),
+                ('message', models.TextField(verbose_name='Mensaje')),
+                ('notification_type', models.CharField(choices=[('booking_created', 'Reserva Creada'), ('booking_cancelled', 'Reserva Cancelada')], max_length=30, verbose_name='Tipo de notificación')),
+                ('delivered', models.JSONField(blank=True, default=list, verbose_name='Canales entregados')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible desde')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesada')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notification_outbox', to='bookings.booking', verbose_name='Turno')),
+            ],
+            options={
+                'verbose_name': 'Evento pendiente de notificación',
+                'verbose_name_plural': 'Eventos pendientes de notificación',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['available_at', 'id'], name='notification_outbox_pending')],
+            },
+        ),
+    ]
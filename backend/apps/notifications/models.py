@@ -1,4 +1,7 @@
-from django.db import models
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.utils import timezone
 
 
 class Notification(models.Model):
@@ -50,7 +53,15 @@ class Notification(models.Model):
         verbose_name_plural = 'Notificaciones'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['recipient', 'is_read']),
+            # Feed paginado por clave (created_at, id) de cada destinatario
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notification_feed'),
+            # Solo las no leídas: marcar todas como leídas, recalcular los
+            # contadores y la retención no recorren el historial leído
+            models.Index(
+                fields=['recipient', 'id'],
+                condition=models.Q(is_read=False),
+                name='notification_unread',
+            ),
         ]
 
     def __str__(self):
@@ -61,15 +72,206 @@ class Notification(models.Model):
         """
         Crear notificaciones para todos los usuarios admin
         """
+        return cls.notify_admins_many([cls(
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            booking=booking,
+        )])
+
+    @classmethod
+    def notify_admins_many(cls, events):
+        """
+        Crear una notificación por admin para cada evento
+        events: objetos con title, message, notification_type y booking_id
+        (notificaciones sin destinatario o entradas del outbox).
+        Una sola lectura de admins y un solo INSERT para todos los eventos
+        """
         from apps.users.models import User
-        admins = User.objects.filter(role='admin')
-        notifications = []
-        for admin in admins:
-            notifications.append(cls(
-                recipient=admin,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                booking=booking,
-            ))
+        from .events import CREATED, publish
+        admin_ids = list(User.objects.filter(role='admin').values_list('id', flat=True))
+        notifications = [
+            cls(
+                recipient_id=admin_id,
+                title=event.title,
+                message=event.message,
+                notification_type=event.notification_type,
+                booking_id=event.booking_id,
+            )
+            for event in events
+            for admin_id in admin_ids
+        ]
         cls.objects.bulk_create(notifications)
+        NotificationCounter.add([n.recipient_id for n in notifications])
+        # Avisar a los streams abiertos (se entrega al confirmar la transacción)
+        publish([n.recipient_id for n in notifications], CREATED)
+        return notifications
+
+
+class NotificationCounter(models.Model):
+    """
+    Cantidad de notificaciones no leídas por usuario (desnormalizada)
+
+    Evita el COUNT(*) sobre Notification en cada consulta de no leídas. Se
+    actualiza con F() en la misma transacción que las notificaciones: al
+    crearlas, al marcarlas leídas (solo en la transición no leída -> leída)
+    y al borrarlas. Si se desincroniza (p. ej. ediciones directas en la
+    base), `manage.py rebuild_notification_counters` lo recalcula.
+    """
+    user = models.OneToOneField(
+        'users.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name='Usuario'
+    )
+    unread = models.IntegerField(
+        default=0,
+        verbose_name='No leídas'
+    )
+
+    class Meta:
+        verbose_name = 'Contador de notificaciones'
+        verbose_name_plural = 'Contadores de notificaciones'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}"
+
+    @classmethod
+    def unread_for(cls, user):
+        """Cantidad de no leídas de un usuario (una lectura por clave primaria)"""
+        unread = cls.objects.filter(user=user).values_list('unread', flat=True).first()
+        return unread or 0
+
+    @classmethod
+    def add(cls, user_ids, delta=1):
+        """
+        Sumar delta al contador por cada aparición de un usuario en user_ids
+        Bloquea las filas ordenadas por usuario, así dos transacciones que
+        notifican a los mismos admins no quedan en deadlock
+        """
+        deltas = defaultdict(int)
+        for user_id in user_ids:
+            deltas[user_id] += delta
+        if not deltas:
+            return
+        
+        with transaction.atomic():
+            if delta > 0:
+                # Al restar no se crean filas: sin contador no hay nada que restar
+                # (y el usuario puede estar borrándose en la misma transacción)
+                cls.objects.bulk_create(
+                    [cls(user_id=user_id) for user_id in sorted(deltas)],
+                    ignore_conflicts=True
+                )
+            if len(deltas) > 1:
+                list(
+                    cls.objects.select_for_update()
+                    .filter(user_id__in=deltas)
+                    .order_by('user_id')
+                    .values_list('user_id', flat=True)
+                )
+            # Un UPDATE por valor de delta (al notificar a los admins, uno solo)
+            by_delta = defaultdict(list)
+            for user_id, user_delta in deltas.items():
+                by_delta[user_delta].append(user_id)
+            for user_delta, ids in by_delta.items():
+                cls.objects.filter(user_id__in=ids).update(unread=F('unread') + user_delta)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcular todos los contadores con una sola consulta agrupada
+        Bloquea los contadores antes de contar: las transacciones que crean o
+        leen notificaciones en el medio esperan y aplican su cambio después
+        Devuelve la cantidad de usuarios con notificaciones no leídas
+        """
+        with transaction.atomic():
+            list(cls.objects.select_for_update().order_by('user_id').values_list('user_id', flat=True))
+            counts = dict(
+                Notification.objects.filter(is_read=False)
+                .values_list('recipient')
+                .annotate(unread=Count('id'))
+                .order_by()
+            )
+            cls.objects.bulk_create(
+                [cls(user_id=user_id, unread=unread) for user_id, unread in sorted(counts.items())],
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['unread'],
+            )
+            cls.objects.exclude(user_id__in=counts).exclude(unread=0).update(unread=0)
+        return len(counts)
+
+
+class NotificationOutbox(models.Model):
+    """
+    Evento de notificación pendiente de entrega (transactional outbox)
+
+    Se escribe en la misma transacción que el cambio del turno y el worker
+    `manage.py process_notification_outbox` lo entrega fuera del request a
+    cada canal de NOTIFICATION_CHANNELS. Las entradas entregadas se borran;
+    las que agotan los reintentos quedan con processed_at y last_error.
+    """
+    title = models.CharField(
+        max_length=200,
+        verbose_name='Título'
+    )
+    message = models.TextField(
+        verbose_name='Mensaje'
+    )
+    notification_type = models.CharField(
+        max_length=30,
+        choices=Notification.NOTIFICATION_TYPES,
+        verbose_name='Tipo de notificación'
+    )
+    booking = models.ForeignKey(
+        'bookings.Booking',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notification_outbox',
+        verbose_name='Turno'
+    )
+    delivered = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Canales entregados'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Intentos'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Último error'
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Disponible desde'
+    )
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Procesada'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+
+    class Meta:
+        verbose_name = 'Evento pendiente de notificación'
+        verbose_name_plural = 'Eventos pendientes de notificación'
+        ordering = ['id']
+        indexes = [
+            # Solo las pendientes: el worker las toma por orden de llegada
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=models.Q(processed_at__isnull=True),
+                name='notification_outbox_pending',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_notification_type_display()}: {self.title}"
@@ -0,0 +1,141 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Notification, NotificationOutbox
+
+
+logger = logging.getLogger(__name__)
+
+# Canal de LISTEN/NOTIFY que despierta al worker cuando hay eventos nuevos
+CHANNEL = 'notification_outbox'
+
+# Canal que se entrega dentro de la transacción del worker, en lote
+IN_APP = 'in_app'
+
+
+def send_email(entry):
+    """Canal email (stub): todavía no hay proveedor configurado"""
+    logger.info('Email a administradores: %s - %s', entry.title, entry.message)
+
+
+def send_whatsapp(entry):
+    """Canal WhatsApp (stub): todavía no hay proveedor configurado"""
+    logger.info('WhatsApp a administradores: %s - %s', entry.title, entry.message)
+
+
+# Canales externos: se entregan de a una entrada
+EXTERNAL_CHANNELS = {
+    'email': send_email,
+    'whatsapp': send_whatsapp,
+}
+
+
+class OutboxService:
+    """
+    Entrega de notificaciones fuera del request (transactional outbox)
+    """
+    MAX_ATTEMPTS = 8
+
+    @staticmethod
+    def enqueue(title, message, notification_type, booking=None):
+        """
+        Registrar un evento para los administradores
+        Es un solo INSERT en la transacción del llamador: si se revierte, el
+        evento también. El aviso al worker se entrega al confirmar
+        """
+        entry = NotificationOutbox.objects.create(
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            booking=booking,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, str(entry.id)])
+        return entry
+
+    @staticmethod
+    def channels():
+        return getattr(settings, 'NOTIFICATION_CHANNELS', [IN_APP])
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Espera antes del próximo intento: 30s, 1m, 2m, ... hasta 1 hora"""
+        return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+    @staticmethod
+    def process_batch(batch_size=100):
+        """
+        Tomar y entregar un lote de eventos pendientes
+        SELECT ... FOR UPDATE SKIP LOCKED: varios workers procesan lotes
+        distintos sin esperarse. Cada entrada recuerda los canales ya
+        entregados, así un reintento no duplica las notificaciones in-app.
+        Los canales externos son at-least-once: si la transacción falla
+        después de enviarlos, se reenvían.
+        Devuelve la cantidad de entradas tomadas
+        """
+        channels = OutboxService.channels()
+        now = timezone.now()
+
+        with transaction.atomic():
+            entries = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True)
+                .filter(processed_at__isnull=True, available_at__lte=now)
+                .order_by('available_at', 'id')[:batch_size]
+            )
+            if not entries:
+                return 0
+
+            # In-app: un solo INSERT para todo el lote
+            if IN_APP in channels:
+                pending = [entry for entry in entries if IN_APP not in entry.delivered]
+                if pending:
+                    Notification.notify_admins_many(pending)
+                    for entry in pending:
+                        entry.delivered.append(IN_APP)
+
+            done = []
+            for entry in entries:
+                for channel in channels:
+                    if channel in entry.delivered:
+                        continue
+                    send = EXTERNAL_CHANNELS.get(channel)
+                    if send is None:
+                        entry.last_error = f'{channel}: canal desconocido'
+                        continue
+                    try:
+                        send(entry)
+                    except Exception as exc:
+                        logger.exception('Error entregando la notificación %s por %s', entry.id, channel)
+                        entry.last_error = f'{channel}: {exc}'
+                    else:
+                        entry.delivered.append(channel)
+
+                if all(channel in entry.delivered for channel in channels):
+                    done.append(entry.id)
+                    continue
+                entry.attempts += 1
+                if entry.attempts >= OutboxService.MAX_ATTEMPTS:
+                    # Se abandona; queda en la tabla para revisarla
+                    entry.processed_at = now
+                else:
+                    entry.available_at = now + OutboxService.retry_delay(entry.attempts)
+
+            NotificationOutbox.objects.filter(id__in=done).delete()
+            failed = [entry for entry in entries if entry.id not in done]
+            if failed:
+                NotificationOutbox.objects.bulk_update(
+                    failed, ['delivered', 'attempts', 'last_error', 'available_at', 'processed_at']
+                )
+        return len(entries)
+
+    @staticmethod
+    def drain(batch_size=100):
+        """Procesar lotes hasta vaciar los pendientes; devuelve el total tomado"""
+        total = 0
+        while True:
+            processed = OutboxService.process_batch(batch_size)
+            total += processed
+            if processed < batch_size:
+                return total
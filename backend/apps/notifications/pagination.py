@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+from django.db.models import Q
+
+
+# Orden total del feed de notificaciones: (fecha de creación, id)
+FEED_FIELDS = ('created_at', 'id')
+
+
+def encode_cursor(notification):
+    """Cursor opaco con la posición (created_at, id) de una notificación"""
+    position = [notification.created_at.isoformat(), notification.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodificar un cursor generado por encode_cursor
+    Lanza ValueError si el cursor es inválido
+    """
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Cursor inválido')
+
+
+def position_filter(cursor, op):
+    """
+    Condición sobre (created_at, id) respecto del cursor
+    op: 'lt', 'lte', 'gt' o 'gte' (la igualdad solo aplica al id)
+    La condición redundante sobre created_at acota el rango del índice
+    """
+    created_at, pk = decode_cursor(cursor)
+    strict = op[:2]
+    return (
+        Q(**{f'created_at__{strict}': created_at})
+        | Q(created_at=created_at, **{f'id__{op}': pk})
+    ) & Q(**{f'created_at__{strict}e': created_at})
+
+
+def feed_page(queryset, before=None, after=None, limit=50):
+    """
+    Página del feed de notificaciones sin COUNT ni OFFSET
+
+    - Sin cursor o con before: las más nuevas primero, anteriores al cursor
+    - Con after: las posteriores al cursor, las más viejas primero, para
+      ponerse al día después de reconectar
+    Devuelve (notificaciones, cursor para seguir en la misma dirección o None)
+    """
+    if after:
+        queryset = queryset.filter(position_filter(after, 'gt')).order_by(*FEED_FIELDS)
+    else:
+        queryset = queryset.order_by(*[f'-{field}' for field in FEED_FIELDS])
+        if before:
+            queryset = queryset.filter(position_filter(before, 'lt'))
+
+    # Pedir una fila extra para saber si hay página siguiente
+    items = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
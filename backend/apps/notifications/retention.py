@@ -0,0 +1,58 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Notification, NotificationCounter
+
+
+class NotificationRetentionService:
+    """
+    Política de retención de notificaciones
+    - Leídas: se borran a los NOTIFICATIONS_READ_RETENTION_DAYS días
+    - No leídas: se borran a los NOTIFICATIONS_UNREAD_RETENTION_DAYS días
+    """
+
+    @staticmethod
+    def read_retention():
+        return timedelta(days=getattr(settings, 'NOTIFICATIONS_READ_RETENTION_DAYS', 30))
+
+    @staticmethod
+    def unread_retention():
+        return timedelta(days=getattr(settings, 'NOTIFICATIONS_UNREAD_RETENTION_DAYS', 90))
+
+    @classmethod
+    def prune(cls, batch_size=1000, now=None):
+        """
+        Borrar las notificaciones vencidas en lotes de batch_size por id
+        Cada lote es una transacción corta que saltea las filas bloqueadas
+        (p. ej. una notificación que se está marcando leída). Las no leídas
+        borradas se descuentan del contador de su destinatario.
+        Devuelve {'read': borradas leídas, 'unread': borradas no leídas}
+        """
+        now = now or timezone.now()
+        return {
+            'read': cls._prune(True, now - cls.read_retention(), batch_size),
+            'unread': cls._prune(False, now - cls.unread_retention(), batch_size),
+        }
+
+    @staticmethod
+    def _prune(is_read, cutoff, batch_size):
+        table = connection.ops.quote_name(Notification._meta.db_table)
+        deleted = 0
+        while True:
+            # SQL directo: el DELETE del ORM dispara post_delete por fila
+            # (un UPDATE del contador cada una); acá se descuenta por lote
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE id IN ('
+                    f'SELECT id FROM {table} WHERE is_read = %s AND created_at < %s '
+                    f'ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED) '
+                    f'RETURNING recipient_id',
+                    [is_read, cutoff, batch_size]
+                )
+                recipients = [row[0] for row in cursor.fetchall()]
+                if not is_read:
+                    NotificationCounter.add(recipients, -1)
+            deleted += len(recipients)
+            if len(recipients) < batch_size:
+                return deleted
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Notification
+from .pagination import decode_cursor
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -10,3 +11,27 @@ class NotificationSerializer(serializers.ModelSerializer):
             'booking', 'is_read', 'created_at'
         ]
         read_only_fields = ['id', 'title', 'message', 'notification_type', 'booking', 'created_at']
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """
+    Marcar varias notificaciones como leídas: por ids o hasta un cursor del feed
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=500,
+        required=False
+    )
+    up_to = serializers.CharField(required=False)
+
+    def validate_up_to(self, value):
+        try:
+            decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('up_to' in attrs):
+            raise serializers.ValidationError('Indicá ids o up_to (solo uno de los dos)')
+        return attrs
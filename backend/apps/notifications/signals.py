@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Notification, NotificationCounter
+
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    """
+    Sumar al contador las notificaciones creadas de a una
+    (notify_admins usa bulk_create y actualiza el contador por su cuenta)
+    """
+    if created and not instance.is_read:
+        NotificationCounter.add([instance.recipient_id])
+
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    """
+    Restar del contador las notificaciones no leídas que se borran
+    """
+    if not instance.is_read:
+        NotificationCounter.add([instance.recipient_id], -1)
@@ -1,9 +1,18 @@
-from django.test import TestCase
+from io import StringIO
+from datetime import timedelta
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
-from .models import Notification
+from .events import NotificationListener
+from .models import Notification, NotificationCounter, NotificationOutbox
+from .outbox import OutboxService
+from .retention import NotificationRetentionService
 from apps.bookings.models import Booking
 from apps.courts.models import Court
 
@@ -115,7 +124,8 @@ class NotificationAPITest(APITestCase):
     def test_list_notifications(self):
         response = self.client.get('/api/notifications/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next_cursor'])
 
     def test_unread_count(self):
         response = self.client.get('/api/notifications/unread-count/')
@@ -159,4 +169,283 @@ class NotificationAPITest(APITestCase):
         )
         response = self.client.get('/api/notifications/')
         # Should only see the 5 original notifications, not the other admin's
-        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_notify_admins_publishes_event(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Notification.notify_admins(title='Aviso', message='Msg', notification_type='booking_created')
+        self.assertTrue(any('pg_notify' in q['sql'] for q in ctx.captured_queries))
+
+
+    def test_unread_count_reads_counter(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/notifications/unread-count/')
+        self.assertFalse(any('notifications_notification"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_mark_read_twice_decrements_once(self):
+        notif = Notification.objects.filter(recipient=self.admin).first()
+        self.client.patch(f'/api/notifications/{notif.id}/read/')
+        self.client.patch(f'/api/notifications/{notif.id}/read/')
+        self.assertEqual(NotificationCounter.unread_for(self.admin), 4)
+
+    def test_feed_pages_with_before_cursor(self):
+        first = self.client.get('/api/notifications/', {'limit': 3})
+        self.assertEqual(
+            [n['title'] for n in first.data['results']], ['Notif 4', 'Notif 3', 'Notif 2']
+        )
+        second = self.client.get('/api/notifications/', {'limit': 3, 'before': first.data['next_cursor']})
+        self.assertEqual([n['title'] for n in second.data['results']], ['Notif 1', 'Notif 0'])
+        self.assertIsNone(second.data['next_cursor'])
+
+    def test_feed_syncs_with_after_cursor(self):
+        sync_cursor = self.client.get('/api/notifications/').data['sync_cursor']
+        Notification.objects.create(
+            recipient=self.admin, title='Nueva', message='Msg', notification_type='booking_created'
+        )
+        response = self.client.get('/api/notifications/', {'after': sync_cursor})
+        self.assertEqual([n['title'] for n in response.data['results']], ['Nueva'])
+        caught_up = self.client.get('/api/notifications/', {'after': response.data['sync_cursor']})
+        self.assertEqual(caught_up.data['results'], [])
+        self.assertEqual(caught_up.data['sync_cursor'], response.data['sync_cursor'])
+
+    def test_feed_invalid_cursor(self):
+        response = self.client.get('/api/notifications/', {'before': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_mark_read_by_ids(self):
+        ids = list(Notification.objects.order_by('id').values_list('id', flat=True)[:2])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/notifications/mark-read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "notifications_notification"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(NotificationCounter.unread_for(self.admin), 3)
+
+    def test_bulk_mark_read_up_to_cursor(self):
+        page = self.client.get('/api/notifications/', {'limit': 2}).data
+        # Hasta 'Notif 3' inclusive: quedan sin leer las más nuevas
+        response = self.client.post(
+            '/api/notifications/mark-read/', {'up_to': page['next_cursor']}, format='json'
+        )
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(
+            list(Notification.objects.filter(is_read=False).values_list('title', flat=True)), ['Notif 4']
+        )
+        self.assertEqual(NotificationCounter.unread_for(self.admin), 1)
+
+    def test_bulk_mark_read_requires_ids_or_cursor(self):
+        response = self.client.post('/api/notifications/mark-read/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_mark_read_not_found(self):
+        response = self.client.patch('/api/notifications/999999/read/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class NotificationCounterTest(TestCase):
+    """Tests para el contador de no leídas"""
+
+    def setUp(self):
+        self.admin1 = User.objects.create_user(
+            username='admin1', password='pass123', role='admin'
+        )
+        self.admin2 = User.objects.create_user(
+            username='admin2', password='pass123', role='admin'
+        )
+
+    def test_notify_admins_increments_counters(self):
+        for _ in range(3):
+            Notification.notify_admins(title='Test', message='Msg', notification_type='booking_created')
+        self.assertEqual(NotificationCounter.unread_for(self.admin1), 3)
+        self.assertEqual(NotificationCounter.unread_for(self.admin2), 3)
+
+    def test_delete_unread_decrements_counter(self):
+        Notification.notify_admins(title='Test', message='Msg', notification_type='booking_created')
+        Notification.objects.filter(recipient=self.admin1).delete()
+        self.assertEqual(NotificationCounter.unread_for(self.admin1), 0)
+        self.assertEqual(NotificationCounter.unread_for(self.admin2), 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        Notification.notify_admins(title='Test', message='Msg', notification_type='booking_created')
+        Notification.objects.filter(recipient=self.admin1).update(is_read=True)
+        NotificationCounter.objects.filter(user=self.admin2).update(unread=7)
+        call_command('rebuild_notification_counters', stdout=StringIO())
+        self.assertEqual(NotificationCounter.unread_for(self.admin1), 0)
+        self.assertEqual(NotificationCounter.unread_for(self.admin2), 1)
+
+
+class NotificationOutboxTest(TestCase):
+    """Tests para el outbox de notificaciones"""
+
+    def setUp(self):
+        self.admin1 = User.objects.create_user(
+            username='admin1', password='pass123', role='admin'
+        )
+        self.admin2 = User.objects.create_user(
+            username='admin2', password='pass123', role='admin'
+        )
+
+    def enqueue(self, title='Nueva reserva'):
+        return OutboxService.enqueue(title=title, message='Msg', notification_type='booking_created')
+
+    def test_enqueue_does_not_notify_inline(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.enqueue()
+        # Un INSERT y el aviso al worker, sin leer admins
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_process_batch_fans_out_to_admins(self):
+        for i in range(3):
+            self.enqueue(f'Reserva {i}')
+        self.assertEqual(OutboxService.drain(), 3)
+        self.assertEqual(Notification.objects.filter(recipient=self.admin1).count(), 3)
+        self.assertEqual(NotificationCounter.unread_for(self.admin2), 3)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATION_CHANNELS=['in_app', 'fax'])
+    def test_failed_channel_is_retried_without_duplicates(self):
+        entry = self.enqueue()
+        OutboxService.drain()
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.delivered, ['in_app'])
+        self.assertIn('fax', entry.last_error)
+        self.assertGreater(entry.available_at, timezone.now())
+        # Todavía no vence la espera: no se vuelve a tomar
+        self.assertEqual(OutboxService.drain(), 0)
+
+        NotificationOutbox.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        OutboxService.drain()
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.admin1).count(), 1)
+
+    def test_worker_command_once(self):
+        self.enqueue()
+        out = StringIO()
+        call_command('process_notification_outbox', '--once', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+@override_settings(NOTIFICATIONS_READ_RETENTION_DAYS=30, NOTIFICATIONS_UNREAD_RETENTION_DAYS=90)
+class NotificationRetentionTest(TestCase):
+    """Tests para la retención de notificaciones"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', password='pass123', role='admin'
+        )
+
+    def create(self, days_ago, is_read=False):
+        notification = Notification.objects.create(
+            recipient=self.admin,
+            title=f'Hace {days_ago} días',
+            message='Msg',
+            notification_type='booking_created',
+            is_read=is_read,
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return notification
+
+    def test_prune_applies_retention_in_batches(self):
+        for _ in range(3):
+            self.create(40, is_read=True)
+        recent_read = self.create(10, is_read=True)
+        self.create(100)
+        unread = self.create(40)
+
+        deleted = NotificationRetentionService.prune(batch_size=2)
+
+        self.assertEqual(deleted, {'read': 3, 'unread': 1})
+        self.assertEqual(
+            set(Notification.objects.values_list('id', flat=True)),
+            {recent_read.id, unread.id}
+        )
+        self.assertEqual(NotificationCounter.unread_for(self.admin), 1)
+
+    def test_prune_command_reports_rows(self):
+        self.create(40, is_read=True)
+        out = StringIO()
+        call_command('prune_notifications', stdout=out)
+        self.assertIn('1 leídas, 0 no leídas', out.getvalue())
+
+
+class NotificationStreamTest(APITestCase):
+    """Tests para el stream SSE de notificaciones"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', password='admin123', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_stream_requires_auth(self):
+        response = APIClient().get('/api/notifications/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream_is_admin_only(self):
+        reception = User.objects.create_user(username='recep', password='recep123', role='reception')
+        client = APIClient()
+        client.force_authenticate(reception)
+        response = client.get('/api/notifications/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(NOTIFICATIONS_STREAM_MAX_PER_WORKER=0)
+    def test_stream_over_capacity_returns_503(self):
+        response = self.client.get('/api/notifications/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_stream_resumes_from_last_event_id(self):
+        seen, missed = [
+            Notification.objects.create(
+                recipient=self.admin, title=title, message='Msg', notification_type='booking_created'
+            )
+            for title in ('Vista', 'Perdida')
+        ]
+        response = self.client.get(
+            '/api/notifications/stream/', HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=str(seen.id)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        try:
+            self.assertTrue(next(chunks).startswith(b'retry:'))
+            event = next(chunks).decode()
+            self.assertIn(f'id: {missed.id}', event)
+            self.assertIn('Perdida', event)
+            self.assertIn('"unread_count": 2', next(chunks).decode())
+        finally:
+            response.close()
+
+
+@override_settings(NOTIFICATIONS_STREAM_HEARTBEAT=2)
+class NotificationStreamListenTest(TransactionTestCase):
+    """Tests del stream con LISTEN/NOTIFY real (los avisos se entregan al confirmar)"""
+
+    def tearDown(self):
+        # Cerrar la conexión del LISTEN antes de borrar la base de test
+        NotificationListener.join(timeout=5)
+
+    def test_new_notification_is_pushed(self):
+        admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get('/api/notifications/stream/', HTTP_ACCEPT='text/event-stream')
+        chunks = iter(response.streaming_content)
+        try:
+            next(chunks)
+            self.assertIn('"unread_count": 0', next(chunks).decode())
+            Notification.notify_admins(title='Nueva reserva', message='Msg', notification_type='booking_created')
+            event = next(chunks).decode()
+            self.assertIn('event: notification', event)
+            self.assertIn('Nueva reserva', event)
+            self.assertIn('"unread_count": 1', next(chunks).decode())
+        finally:
+            response.close()
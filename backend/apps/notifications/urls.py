@@ -2,13 +2,17 @@ from django.urls import path
 from .views import (
     notification_list,
     notification_mark_read,
+    notification_mark_read_bulk,
     notification_mark_all_read,
     notification_unread_count,
+    notification_stream,
 )
 
 urlpatterns = [
     path('', notification_list, name='notification-list'),
     path('<int:pk>/read/', notification_mark_read, name='notification-mark-read'),
+    path('mark-read/', notification_mark_read_bulk, name='notification-mark-read-bulk'),
     path('mark-all-read/', notification_mark_all_read, name='notification-mark-all-read'),
     path('unread-count/', notification_unread_count, name='notification-unread-count'),
+    path('stream/', notification_stream, name='notification-stream'),
 ]
@@ -1,22 +1,196 @@
+import json
+import queue
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
-from .models import Notification
-from .serializers import NotificationSerializer
+from apps.users.permissions import IsAdminUser
+from . import events
+from .events import NotificationListener
+from .models import Notification, NotificationCounter
+from .pagination import encode_cursor, feed_page, position_filter
+from .serializers import MarkReadSerializer, NotificationSerializer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Permite negociar Accept: text/event-stream
+    Solo renderiza las respuestas de error; el stream se arma en la vista
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+# Espera sugerida al cliente antes de reconectar (milisegundos)
+STREAM_RETRY_MS = 3000
+
+# Espera sugerida cuando el worker no acepta más streams (segundos)
+STREAM_BUSY_RETRY_AFTER = 30
+
+# Tamaño de página del feed de notificaciones
+FEED_PAGE_SIZE = 50
+FEED_MAX_PAGE_SIZE = 200
+
+
+def sse_event(event, data, event_id=None):
+    """Formatear un evento Server-Sent Events"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data, default=str)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def notification_event_stream(user, last_event_id=None):
+    """
+    Generador del stream de notificaciones de un usuario
+    - Al conectar: las notificaciones posteriores a Last-Event-ID (si se
+      envió) y la cantidad de no leídas
+    - Después solo consulta la base cuando llega un aviso de LISTEN/NOTIFY;
+      sin avisos envía un heartbeat (comentario SSE) sin queries
+    - Entre avisos no retiene una conexión a la base: se cierra después de
+      cada lectura y la próxima query abre otra
+    - Se cierra a los NOTIFICATIONS_STREAM_MAX_SECONDS; el cliente reconecta
+      con Last-Event-ID y no pierde eventos
+    """
+    heartbeat = getattr(settings, 'NOTIFICATIONS_STREAM_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'NOTIFICATIONS_STREAM_MAX_SECONDS', 300)
+    subscription = NotificationListener.subscribe(user.id)
+    notifications = Notification.objects.filter(recipient=user)
+    
+    def notification_event(notification):
+        return sse_event('notification', NotificationSerializer(notification).data, notification.id)
+    
+    def release_connection():
+        # Dentro de un atomic (tests) cerrar invalidaría la transacción
+        if not connection.in_atomic_block:
+            connection.close()
+    
+    def unread_count():
+        count = NotificationCounter.unread_for(user)
+        # Con id = última notificación enviada, el cliente reanuda desde ahí
+        # aunque todavía no haya recibido ninguna notificación
+        return sse_event('unread_count', {'unread_count': count}, last_id)
+    
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        
+        if last_event_id is None:
+            # Primera conexión: el cliente ya lee la lista por la API REST
+            last_id = notifications.order_by('-id').values_list('id', flat=True).first() or 0
+            yield unread_count()
+        else:
+            last_id = last_event_id
+            for notification in notifications.filter(id__gt=last_id).order_by('id'):
+                last_id = notification.id
+                yield notification_event(notification)
+            yield unread_count()
+        
+        while time.monotonic() < deadline:
+            release_connection()
+            try:
+                received = {subscription.get(timeout=heartbeat)}
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            # Varios avisos seguidos se resuelven con una sola lectura
+            while True:
+                try:
+                    received.add(subscription.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if received & {events.CREATED, events.RESYNC}:
+                for notification in notifications.filter(id__gt=last_id).order_by('id'):
+                    last_id = notification.id
+                    yield notification_event(notification)
+            yield unread_count()
+    finally:
+        NotificationListener.unsubscribe(subscription)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def notification_stream(request):
+    """
+    Stream (Server-Sent Events) de notificaciones nuevas y cantidad de no leídas
+    Solo para administradores, los destinatarios de las notificaciones.
+    Reanuda desde la cabecera Last-Event-ID (o el query param last_event_id)
+    Cada stream ocupa un thread del worker: por encima de
+    NOTIFICATIONS_STREAM_MAX_PER_WORKER responde 503 y el cliente consulta
+    /unread-count/ hasta volver a intentar.
+    """
+    if NotificationListener.count() >= getattr(settings, 'NOTIFICATIONS_STREAM_MAX_PER_WORKER', 1):
+        return Response(
+            {'error': 'No hay lugar para más streams de notificaciones; reintentar más tarde'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(STREAM_BUSY_RETRY_AFTER)}
+        )
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    response = StreamingHttpResponse(
+        notification_event_stream(request.user, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffering en nginx para que cada evento llegue en el momento
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def notification_list(request):
     """
-    Listar notificaciones del usuario (más recientes primero)
+    Feed de notificaciones del usuario, paginado por clave (created_at, id)
+    Query params: before, after, limit
+    - Sin cursor: las más recientes primero; next_cursor se pasa como before
+      para pedir las anteriores
+    - after=<cursor>: las posteriores al cursor (más viejas primero);
+      next_cursor se pasa como after mientras haya más
+    sync_cursor es la posición de la más nueva de la página: con
+    after=sync_cursor el cliente se pone al día sin volver a bajar todo
     """
-    notifications = Notification.objects.filter(
-        recipient=request.user
-    ).order_by('-created_at')[:50]
-    serializer = NotificationSerializer(notifications, many=True)
-    return Response(serializer.data)
+    before = request.query_params.get('before')
+    after = request.query_params.get('after')
+    try:
+        limit = min(int(request.query_params.get('limit') or FEED_PAGE_SIZE), FEED_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit debe ser mayor a 0')
+        if before and after:
+            raise ValueError('Indicá before o after, no los dos')
+        notifications, next_cursor = feed_page(
+            Notification.objects.filter(recipient=request.user),
+            before=before,
+            after=after,
+            limit=limit,
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if notifications:
+        newest = notifications[-1] if after else notifications[0]
+        sync_cursor = encode_cursor(newest)
+    else:
+        sync_cursor = after
+    return Response({
+        'results': NotificationSerializer(notifications, many=True).data,
+        'next_cursor': next_cursor,
+        'sync_cursor': sync_cursor,
+    })
 
 
 @api_view(['PATCH'])
@@ -25,28 +199,59 @@ def notification_mark_read(request, pk):
     """
     Marcar una notificación como leída
     """
-    try:
-        notification = Notification.objects.get(pk=pk, recipient=request.user)
-    except Notification.DoesNotExist:
-        return Response(
-            {'error': 'Notificación no encontrada'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    notification.is_read = True
-    notification.save()
+    notifications = Notification.objects.filter(pk=pk, recipient=request.user)
+    with transaction.atomic():
+        # UPDATE condicional: solo la transición no leída -> leída descuenta
+        if notifications.filter(is_read=False).update(is_read=True):
+            NotificationCounter.add([request.user.id], -1)
+            events.publish([request.user.id], events.READ)
+        elif not notifications.exists():
+            return Response(
+                {'error': 'Notificación no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
     return Response({'status': 'ok'})
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def notification_mark_read_bulk(request):
+    """
+    Marcar como leídas varias notificaciones en un solo UPDATE
+    Body: {"ids": [...]} o {"up_to": <cursor del feed>} (todas hasta esa
+    posición inclusive; las que llegaron después quedan sin leer)
+    """
+    serializer = MarkReadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    
+    notifications = Notification.objects.filter(recipient=request.user, is_read=False)
+    if 'ids' in serializer.validated_data:
+        notifications = notifications.filter(id__in=serializer.validated_data['ids'])
+    else:
+        notifications = notifications.filter(position_filter(serializer.validated_data['up_to'], 'lte'))
+    
+    with transaction.atomic():
+        updated = notifications.update(is_read=True)
+        if updated:
+            NotificationCounter.add([request.user.id], -updated)
+            events.publish([request.user.id], events.READ)
+    return Response({'status': 'ok', 'updated': updated})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def notification_mark_all_read(request):
     """
     Marcar todas las notificaciones como leídas
     """
-    Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).update(is_read=True)
+    with transaction.atomic():
+        updated = Notification.objects.filter(
+            recipient=request.user,
+            is_read=False
+        ).update(is_read=True)
+        if updated:
+            NotificationCounter.add([request.user.id], -updated)
+            events.publish([request.user.id], events.READ)
     return Response({'status': 'ok'})
 
 
@@ -56,8 +261,4 @@ def notification_unread_count(request):
     """
     Obtener cantidad de notificaciones no leídas
     """
-    count = Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).count()
-    return Response({'unread_count': count})
+    return Response({'unread_count': NotificationCounter.unread_for(request.user)})
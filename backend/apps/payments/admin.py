@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import DailyRevenue
 
-# No hay modelos para registrar en este módulo
+
+@admin.register(DailyRevenue)
+class DailyRevenueAdmin(admin.ModelAdmin):
+    list_display = ['date', 'court', 'closures_count', 'cash_amount', 'transfer_amount', 'total_amount']
+    list_filter = ['court', 'date']
+    date_hierarchy = 'date'
+    readonly_fields = [
+        'date', 'court', 'total_amount', 'booking_amount', 'consumptions_amount',
+        'cash_amount', 'transfer_amount', 'closures_count', 'cash_count', 'transfer_count', 'updated_at',
+    ]
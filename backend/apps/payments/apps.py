@@ -5,3 +5,6 @@ class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.payments'
     verbose_name = 'Pagos y Reportes'
+    
+    def ready(self):
+        import apps.payments.signals
@@ -0,0 +1,26 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from apps.payments.services import RevenueRollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir el acumulado de facturación diaria desde los cierres de turnos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=date.fromisoformat,
+            help='Fecha inicial (YYYY-MM-DD); por defecto desde el primer cierre',
+        )
+        parser.add_argument(
+            '--date-to',
+            type=date.fromisoformat,
+            help='Fecha final (YYYY-MM-DD); por defecto hasta el último cierre',
+        )
+
+    def handle(self, *args, **options):
+        rows = RevenueRollupService.rebuild(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Filas de facturación diaria generadas: {rows}'))
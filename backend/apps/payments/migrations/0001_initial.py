@@ -0,0 +1,64 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_daily_revenue(apps, schema_editor):
+    """Generar el acumulado desde los cierres existentes"""
+    BookingClosure = apps.get_model('bookings', 'BookingClosure')
+    DailyRevenue = apps.get_model('payments', 'DailyRevenue')
+    amount_fields = ('total_amount', 'booking_amount', 'consumptions_amount', 'cash_amount', 'transfer_amount')
+    rows = BookingClosure.objects.values('booking__date', 'booking__court_id').annotate(
+        closures_count=Count('id'),
+        cash_count=Count('id', filter=Q(cash_amount__gt=0)),
+        transfer_count=Count('id', filter=Q(transfer_amount__gt=0)),
+    ).annotate(
+        # Después de los conteos: las sumas usan el mismo nombre que los campos
+        **{field: Sum(field) for field in amount_fields}
+    ).order_by()
+    DailyRevenue.objects.bulk_create([
+        DailyRevenue(date=row.pop('booking__date'), court_id=row.pop('booking__court_id'), **row)
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courts', '0002_timeslotconfiguration_court_price'),
+        ('bookings', '0008_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Fecha')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto total')),
+                ('booking_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto de turnos')),
+                ('consumptions_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto de consumos')),
+                ('cash_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto en efectivo')),
+                ('transfer_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Monto en transferencia')),
+                ('closures_count', models.PositiveIntegerField(default=0, verbose_name='Turnos cerrados')),
+                ('cash_count', models.PositiveIntegerField(default=0, verbose_name='Cierres con efectivo')),
+                ('transfer_count', models.PositiveIntegerField(default=0, verbose_name='Cierres con transferencia')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenues', to='courts.court', verbose_name='Cancha')),
+            ],
+            options={
+                'verbose_name': 'Facturación Diaria',
+                'verbose_name_plural': 'Facturación Diaria',
+                'ordering': ['date', 'court'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenue',
+            constraint=models.UniqueConstraint(fields=('date', 'court'), name='daily_revenue_date_court'),
+        ),
+        migrations.RunPython(backfill_daily_revenue, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,77 @@
-# Este módulo no tiene modelos propios
-# Los reportes se generan desde BookingClosure
+from django.db import models
+
+
+class DailyRevenue(models.Model):
+    """
+    Acumulado de facturación por (día, cancha)
+
+    Se mantiene en la misma transacción que cada BookingClosure (ver
+    signals.py) para que los reportes lean estas filas en lugar de recorrer
+    todos los cierres. Se puede reconstruir con `rebuild_daily_revenue`.
+    """
+    date = models.DateField(
+        verbose_name='Fecha'
+    )
+    court = models.ForeignKey(
+        'courts.Court',
+        on_delete=models.CASCADE,
+        related_name='daily_revenues',
+        verbose_name='Cancha'
+    )
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Monto total'
+    )
+    booking_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Monto de turnos'
+    )
+    consumptions_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Monto de consumos'
+    )
+    cash_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Monto en efectivo'
+    )
+    transfer_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name='Monto en transferencia'
+    )
+    closures_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Turnos cerrados'
+    )
+    cash_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cierres con efectivo'
+    )
+    transfer_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Cierres con transferencia'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Fecha de actualización'
+    )
+
+    class Meta:
+        verbose_name = 'Facturación Diaria'
+        verbose_name_plural = 'Facturación Diaria'
+        ordering = ['date', 'court']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'court'], name='daily_revenue_date_court'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.court.name}: ${self.total_amount}"
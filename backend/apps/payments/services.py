@@ -1,6 +1,57 @@
-from django.db.models import Sum, Count, Q
-from datetime import date, datetime
-from apps.bookings.models import BookingClosure, Booking
+import csv
+import json
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Sum, Count, Q, F, Value
+from django.db.models.functions import (
+    Coalesce, ExtractHour, ExtractIsoWeekDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear,
+)
+from datetime import date, datetime, timedelta
+from apps.bookings.availability import AvailabilityEngine
+from apps.bookings.models import BookingClosure, Booking, minute_of_day
+from apps.courts.models import Court, TimeSlotConfiguration
+from apps.bookings.pagination import keyset_page
+from .models import DailyRevenue
+
+
+# Tamaño de página del historial (y máximo que puede pedir el cliente)
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Exportación del historial: columna -> campo de values_list
+HISTORY_EXPORT_FORMATS = ('csv', 'ndjson')
+HISTORY_EXPORT_CHUNK_SIZE = 2000
+HISTORY_EXPORT_FIELDS = {
+    'id': 'id',
+    'court_name': 'court__name',
+    'date': 'date',
+    'start_time': 'start_time',
+    'end_time': 'end_time',
+    'status': 'status',
+    'customer_name': 'customer_name',
+    'customer_phone': 'customer_phone',
+    'created_at': 'created_at',
+    'cash_amount': 'closure__cash_amount',
+    'transfer_amount': 'closure__transfer_amount',
+    'booking_amount': 'closure__booking_amount',
+    'consumptions_amount': 'closure__consumptions_amount',
+    'total_amount': 'closure__total_amount',
+    'closed_at': 'closure__closed_at',
+}
+STATUS_DISPLAY = dict(Booking.STATUS_CHOICES)
+
+# Montos de BookingClosure que se acumulan en DailyRevenue
+ROLLUP_AMOUNT_FIELDS = (
+    'total_amount', 'booking_amount', 'consumptions_amount', 'cash_amount', 'transfer_amount',
+)
+ROLLUP_COUNT_FIELDS = ('closures_count', 'cash_count', 'transfer_count')
+
+
+class _LineBuffer:
+    """Buffer para csv.writer que devuelve cada línea en lugar de guardarla"""
+    def write(self, value):
+        return value
 
 
 class ReportService:
@@ -12,16 +63,16 @@ class ReportService:
     def get_daily_summary(target_date):
         """
         Obtener resumen diario de facturación
+        Totales y medios de pago salen de una sola agregación sobre el
+        acumulado del día; los montos se mantienen en Decimal
         """
         if isinstance(target_date, str):
             target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
         
-        # Obtener todos los cierres del día
-        closures = BookingClosure.objects.filter(
-            booking__date=target_date
-        ).select_related('booking', 'booking__court')
+        # Totales del día desde el acumulado por cancha
+        totals = ReportService._sum_rollups(DailyRevenue.objects.filter(date=target_date))
         
-        if not closures.exists():
+        if not totals['closures_count']:
             return {
                 'date': target_date.isoformat(),
                 'total_amount': 0,
@@ -32,74 +83,44 @@ class ReportService:
                 'bookings': []
             }
         
-        # Calcular totales
-        totals = closures.aggregate(
-            total_amount=Sum('total_amount'),
-            total_booking_amount=Sum('booking_amount'),
-            total_consumptions_amount=Sum('consumptions_amount'),
-            count=Count('id')
+        # Detalle de turnos cerrados (una query, montos en Decimal)
+        closures = BookingClosure.objects.filter(
+            booking__date=target_date
+        ).values(
+            'booking_id', 'booking__court__name', 'booking__start_time', 'booking__end_time',
+            'booking__customer_name', 'cash_amount', 'transfer_amount', 'booking_amount',
+            'consumptions_amount', 'total_amount', 'closed_at'
         )
         
-        # Agrupar por método de pago (efectivo y transferencia)
-        total_cash = 0
-        total_transfer = 0
-        for closure in closures:
-            total_cash += float(closure.cash_amount)
-            total_transfer += float(closure.transfer_amount)
-        
-        payment_methods = {}
-        if total_cash > 0:
-            payment_methods['cash'] = {
-                'method': 'cash',
-                'method_display': 'Efectivo',
-                'total': total_cash,
-                'count': sum(1 for c in closures if c.cash_amount > 0)
-            }
-        if total_transfer > 0:
-            payment_methods['transfer'] = {
-                'method': 'transfer',
-                'method_display': 'Transferencia',
-                'total': total_transfer,
-                'count': sum(1 for c in closures if c.transfer_amount > 0)
-            }
-        
-        # Detalle de turnos cerrados
         bookings_detail = []
         for closure in closures:
             bookings_detail.append({
-                'booking_id': closure.booking.id,
-                'court_name': closure.booking.court.name,
-                'time': f"{closure.booking.start_time.strftime('%H:%M')}-{closure.booking.end_time.strftime('%H:%M')}",
-                'customer_name': closure.booking.customer_name,
-                'cash_amount': float(closure.cash_amount),
-                'transfer_amount': float(closure.transfer_amount),
-                'payment_summary': closure.payment_summary,
-                'booking_amount': float(closure.booking_amount),
-                'consumptions_amount': float(closure.consumptions_amount),
-                'total_amount': float(closure.total_amount),
-                'closed_at': closure.closed_at.isoformat()
+                'booking_id': closure['booking_id'],
+                'court_name': closure['booking__court__name'],
+                'time': f"{closure['booking__start_time'].strftime('%H:%M')}-{closure['booking__end_time'].strftime('%H:%M')}",
+                'customer_name': closure['booking__customer_name'],
+                'cash_amount': closure['cash_amount'],
+                'transfer_amount': closure['transfer_amount'],
+                'payment_summary': BookingClosure.format_payment_summary(
+                    closure['cash_amount'], closure['transfer_amount']
+                ),
+                'booking_amount': closure['booking_amount'],
+                'consumptions_amount': closure['consumptions_amount'],
+                'total_amount': closure['total_amount'],
+                'closed_at': closure['closed_at'].isoformat()
             })
         
         return {
             'date': target_date.isoformat(),
-            'total_amount': float(totals['total_amount'] or 0),
-            'total_bookings': totals['count'],
-            'total_booking_amount': float(totals['total_booking_amount'] or 0),
-            'total_consumptions_amount': float(totals['total_consumptions_amount'] or 0),
-            'by_payment_method': list(payment_methods.values()),
+            **ReportService._rollup_summary(totals),
             'bookings': bookings_detail
         }
     
     @staticmethod
-    def get_history(date_from=None, date_to=None, court_id=None, status=None):
+    def filter_history(queryset, date_from=None, date_to=None, court_id=None, status=None):
         """
-        Obtener historial de turnos con filtros
+        Aplicar los filtros del historial a un queryset de turnos
         """
-        queryset = Booking.objects.select_related(
-            'court', 'created_by', 'closure'
-        ).prefetch_related('consumptions')
-        
-        # Aplicar filtros
         if date_from:
             if isinstance(date_from, str):
                 date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
@@ -116,12 +137,34 @@ class ReportService:
         if status:
             queryset = queryset.filter(status=status)
         
+        return queryset
+    
+    @staticmethod
+    def get_history(date_from=None, date_to=None, court_id=None, status=None, cursor=None, limit=None):
+        """
+        Obtener historial de turnos con filtros
+        Paginado por clave (fecha, hora inicio, id) descendente: devuelve
+        {'results': [...], 'next_cursor': ...}; next_cursor se pasa como
+        cursor para pedir la página siguiente
+        """
+        queryset = ReportService.filter_history(
+            Booking.objects.select_related('court', 'closure'),
+            date_from=date_from,
+            date_to=date_to,
+            court_id=court_id,
+            status=status,
+        )
+        
+        limit = min(int(limit or HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit debe ser mayor a 0')
+        
         # Ordenar por fecha descendente
-        queryset = queryset.order_by('-date', '-start_time')
+        bookings, next_cursor = keyset_page(queryset, cursor=cursor, limit=limit, descending=True)
         
         # Construir respuesta
         results = []
-        for booking in queryset:
+        for booking in bookings:
             item = {
                 'id': booking.id,
                 'court_name': booking.court.name,
@@ -139,12 +182,12 @@ class ReportService:
             if hasattr(booking, 'closure'):
                 closure = booking.closure
                 item['closure'] = {
-                    'cash_amount': float(closure.cash_amount),
-                    'transfer_amount': float(closure.transfer_amount),
+                    'cash_amount': closure.cash_amount,
+                    'transfer_amount': closure.transfer_amount,
                     'payment_summary': closure.payment_summary,
-                    'total_amount': float(closure.total_amount),
-                    'booking_amount': float(closure.booking_amount),
-                    'consumptions_amount': float(closure.consumptions_amount),
+                    'total_amount': closure.total_amount,
+                    'booking_amount': closure.booking_amount,
+                    'consumptions_amount': closure.consumptions_amount,
                     'closed_at': closure.closed_at.isoformat()
                 }
             else:
@@ -152,12 +195,147 @@ class ReportService:
             
             results.append(item)
         
-        return results
+        return {
+            'results': results,
+            'next_cursor': next_cursor,
+        }
+    
+    @staticmethod
+    def iter_history_export(output='csv', date_from=None, date_to=None, court_id=None, status=None):
+        """
+        Exportar el historial como líneas CSV o NDJSON, una por turno
+
+        Recorre un cursor del servidor (.iterator) sobre filas values(), sin
+        instanciar modelos ni armar la lista completa: la memoria se mantiene
+        constante sin importar el rango. Los filtros se validan al llamar,
+        antes de empezar a generar líneas.
+        """
+        if output not in HISTORY_EXPORT_FORMATS:
+            raise ValueError(f"Formato inválido. Usar: {', '.join(HISTORY_EXPORT_FORMATS)}")
+        
+        queryset = ReportService.filter_history(
+            Booking.objects.all(),
+            date_from=date_from,
+            date_to=date_to,
+            court_id=court_id,
+            status=status,
+        ).order_by('-date', '-start_time', '-id').values_list(*HISTORY_EXPORT_FIELDS.values())
+        
+        rows = queryset.iterator(chunk_size=HISTORY_EXPORT_CHUNK_SIZE)
+        if output == 'csv':
+            return ReportService._history_csv_lines(rows)
+        return ReportService._history_ndjson_lines(rows)
+    
+    @staticmethod
+    def _history_export_row(values):
+        row = dict(zip(HISTORY_EXPORT_FIELDS, values))
+        row['status_display'] = STATUS_DISPLAY.get(row['status'], row['status'])
+        return row
+    
+    @staticmethod
+    def _history_csv_lines(rows):
+        buffer = _LineBuffer()
+        writer = csv.writer(buffer)
+        columns = list(HISTORY_EXPORT_FIELDS) + ['status_display']
+        yield writer.writerow(columns)
+        for values in rows:
+            row = ReportService._history_export_row(values)
+            yield writer.writerow(['' if row[c] is None else row[c] for c in columns])
+    
+    @staticmethod
+    def _history_ndjson_lines(rows):
+        for values in rows:
+            row = ReportService._history_export_row(values)
+            yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+    
+    @staticmethod
+    def _payment_methods(cash_total, cash_count, transfer_total, transfer_count):
+        """
+        Lista by_payment_method a partir de totales ya agregados
+        """
+        payment_methods = []
+        if cash_total > 0:
+            payment_methods.append({
+                'method': 'cash',
+                'method_display': 'Efectivo',
+                'total': cash_total,
+                'count': cash_count
+            })
+        if transfer_total > 0:
+            payment_methods.append({
+                'method': 'transfer',
+                'method_display': 'Transferencia',
+                'total': transfer_total,
+                'count': transfer_count
+            })
+        return payment_methods
+    
+    @staticmethod
+    def _sum_rollups(queryset):
+        """Sumar filas de DailyRevenue en una sola query"""
+        totals = queryset.aggregate(
+            **{field: Sum(field) for field in ROLLUP_AMOUNT_FIELDS + ROLLUP_COUNT_FIELDS}
+        )
+        return {field: value or 0 for field, value in totals.items()}
+    
+    @staticmethod
+    def _accumulate(target, row):
+        for field in ROLLUP_AMOUNT_FIELDS + ROLLUP_COUNT_FIELDS:
+            target[field] = target.get(field, 0) + row[field]
+        return target
+    
+    @staticmethod
+    def _rollup_summary(totals):
+        """Totales y medios de pago a partir de montos acumulados (Decimal)"""
+        zero = Decimal('0')
+        return {
+            'total_amount': totals.get('total_amount', zero),
+            'total_bookings': totals.get('closures_count', 0),
+            'total_booking_amount': totals.get('booking_amount', zero),
+            'total_consumptions_amount': totals.get('consumptions_amount', zero),
+            'by_payment_method': ReportService._payment_methods(
+                totals.get('cash_amount', zero), totals.get('cash_count', 0),
+                totals.get('transfer_amount', zero), totals.get('transfer_count', 0),
+            ),
+        }
+    
+    @staticmethod
+    def _rollup_report(date_from, date_to, period_of):
+        """
+        Leer las filas de DailyRevenue del rango (una query) y sumarlas
+        por período (period_of(fecha)), por cancha y en total
+        """
+        rows = DailyRevenue.objects.filter(
+            date__gte=date_from,
+            date__lte=date_to
+        ).values(
+            'date', 'court_id', 'court__name', *ROLLUP_AMOUNT_FIELDS, *ROLLUP_COUNT_FIELDS
+        ).order_by('date', 'court__name')
+        
+        totals = {}
+        periods = {}
+        courts = {}
+        for row in rows:
+            ReportService._accumulate(totals, row)
+            ReportService._accumulate(periods.setdefault(period_of(row['date']), {}), row)
+            court = courts.setdefault(row['court_id'], {'name': row['court__name']})
+            ReportService._accumulate(court, row)
+        
+        summary = ReportService._rollup_summary
+        return {
+            **summary(totals),
+            'periods': [(period, summary(period_totals)) for period, period_totals in periods.items()],
+            'by_court': [
+                {'court_id': court_id, 'court_name': court_totals['name'], **summary(court_totals)}
+                for court_id, court_totals in sorted(courts.items(), key=lambda item: item[1]['name'])
+            ],
+        }
     
     @staticmethod
     def get_monthly_summary(year, month):
         """
-        Resumen mensual (utilidad futura)
+        Resumen mensual con detalle por día y por cancha
+        Lee el acumulado DailyRevenue: a lo sumo (días x canchas) filas
         """
         from calendar import monthrange
         
@@ -165,34 +343,314 @@ class ReportService:
         first_day = date(year, month, 1)
         last_day = date(year, month, monthrange(year, month)[1])
         
-        # Obtener cierres del mes
-        closures = BookingClosure.objects.filter(
-            booking__date__gte=first_day,
-            booking__date__lte=last_day
-        )
-        
-        totals = closures.aggregate(
-            total_amount=Sum('total_amount'),
-            total_booking_amount=Sum('booking_amount'),
-            total_consumptions_amount=Sum('consumptions_amount'),
-            count=Count('id')
-        )
-        
-        # Resumen por día
-        daily_summaries = []
-        current_date = first_day
-        while current_date <= last_day:
-            daily = ReportService.get_daily_summary(current_date)
-            if daily['total_bookings'] > 0:
-                daily_summaries.append(daily)
-            current_date = date(current_date.year, current_date.month, current_date.day + 1)
+        report = ReportService._rollup_report(first_day, last_day, lambda day: day)
+        periods = report.pop('periods')
         
         return {
             'year': year,
             'month': month,
-            'total_amount': float(totals['total_amount'] or 0),
-            'total_bookings': totals['count'],
-            'total_booking_amount': float(totals['total_booking_amount'] or 0),
-            'total_consumptions_amount': float(totals['total_consumptions_amount'] or 0),
-            'daily_summaries': daily_summaries
+            **report,
+            'daily_summaries': [
+                {'date': day.isoformat(), **totals} for day, totals in periods
+            ],
+        }
+    
+    @staticmethod
+    def get_yearly_summary(year):
+        """
+        Resumen anual con detalle por mes y por cancha
+        Suma en memoria las filas de DailyRevenue del año (una query)
+        """
+        report = ReportService._rollup_report(date(year, 1, 1), date(year, 12, 31), lambda day: day.month)
+        periods = report.pop('periods')
+        
+        return {
+            'year': year,
+            **report,
+            'monthly_summaries': [
+                {'month': month, **totals} for month, totals in periods
+            ],
+        }
+
+
+class RevenueRollupService:
+    """
+    Mantenimiento del acumulado DailyRevenue por (día, cancha)
+    """
+    
+    @staticmethod
+    def contribution(amounts):
+        """
+        Aporte de un cierre al acumulado a partir de sus montos
+        (dict con ROLLUP_AMOUNT_FIELDS); None aporta cero
+        """
+        if amounts is None:
+            return dict.fromkeys(ROLLUP_AMOUNT_FIELDS + ROLLUP_COUNT_FIELDS, 0)
+        values = {field: amounts[field] for field in ROLLUP_AMOUNT_FIELDS}
+        values['closures_count'] = 1
+        values['cash_count'] = 1 if amounts['cash_amount'] > 0 else 0
+        values['transfer_count'] = 1 if amounts['transfer_amount'] > 0 else 0
+        return values
+    
+    @staticmethod
+    def apply_change(day, court_id, old_amounts, new_amounts):
+        """
+        Aplicar la diferencia entre el aporte anterior y el nuevo de un cierre
+        Usa UPDATE ... SET campo = campo + delta, seguro ante escrituras
+        concurrentes sobre el mismo (día, cancha)
+        """
+        RevenueRollupService.apply_changes([(day, court_id, old_amounts, new_amounts)])
+    
+    @staticmethod
+    def apply_changes(changes):
+        """
+        Aplicar varias diferencias (día, cancha, montos anteriores, montos nuevos)
+        Suma los aportes por (día, cancha) y hace un solo UPDATE por fila,
+        en orden fijo para evitar deadlocks (cierres por lote, bulk_create)
+        """
+        deltas = {}
+        for day, court_id, old_amounts, new_amounts in changes:
+            old = RevenueRollupService.contribution(old_amounts)
+            new = RevenueRollupService.contribution(new_amounts)
+            delta = deltas.setdefault((day, court_id), {})
+            for field in new:
+                delta[field] = delta.get(field, 0) + new[field] - old[field]
+        
+        for (day, court_id), delta in sorted(deltas.items()):
+            delta = {field: value for field, value in delta.items() if value}
+            if not delta:
+                continue
+            rollup, _ = DailyRevenue.objects.get_or_create(date=day, court_id=court_id)
+            DailyRevenue.objects.filter(pk=rollup.pk).update(
+                **{field: F(field) + value for field, value in delta.items()}
+            )
+    
+    @staticmethod
+    @transaction.atomic
+    def rebuild(date_from=None, date_to=None):
+        """
+        Reconstruir el acumulado desde BookingClosure (backfill o corrección)
+        Bloquea la tabla durante la reconstrucción para que los cierres
+        concurrentes apliquen su diferencia sobre las filas ya reconstruidas
+        Devuelve la cantidad de filas generadas
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {DailyRevenue._meta.db_table} IN EXCLUSIVE MODE')
+        
+        rollups = DailyRevenue.objects.all()
+        closures = BookingClosure.objects.all()
+        if date_from:
+            rollups = rollups.filter(date__gte=date_from)
+            closures = closures.filter(booking__date__gte=date_from)
+        if date_to:
+            rollups = rollups.filter(date__lte=date_to)
+            closures = closures.filter(booking__date__lte=date_to)
+        
+        rows = closures.values('booking__date', 'booking__court_id').annotate(
+            closures_count=Count('id'),
+            cash_count=Count('id', filter=Q(cash_amount__gt=0)),
+            transfer_count=Count('id', filter=Q(transfer_amount__gt=0)),
+        ).annotate(
+            # Después de los conteos: las sumas usan el mismo nombre que los campos
+            **{field: Sum(field) for field in ROLLUP_AMOUNT_FIELDS}
+        ).order_by()
+        
+        rollups.delete()
+        created = DailyRevenue.objects.bulk_create([
+            DailyRevenue(
+                date=row.pop('booking__date'),
+                court_id=row.pop('booking__court_id'),
+                **row
+            )
+            for row in rows
+        ], batch_size=1000)
+        return len(created)
+
+
+# Analítica: agrupaciones, métricas y rango máximo
+ANALYTICS_GROUP_BY = ('day', 'week', 'month', 'quarter', 'year', 'court', 'hour', 'weekday')
+ANALYTICS_METRICS = ('revenue', 'cash', 'transfer', 'consumptions', 'bookings', 'closed', 'occupancy')
+ANALYTICS_DEFAULT_METRICS = ('revenue', 'bookings', 'occupancy')
+ANALYTICS_MAX_RANGE_DAYS = 731
+# Inicio del período de cada fecha, igual que Trunc* en la base
+PERIOD_START = {
+    'week': lambda day: day - timedelta(days=day.weekday()),
+    'month': lambda day: day.replace(day=1),
+    'quarter': lambda day: day.replace(month=3 * ((day.month - 1) // 3) + 1, day=1),
+    'year': lambda day: day.replace(month=1, day=1),
+}
+PERIOD_TRUNC = {'week': TruncWeek, 'month': TruncMonth, 'quarter': TruncQuarter, 'year': TruncYear}
+WEEKDAY_LABELS = {1: 'Lunes', 2: 'Martes', 3: 'Miércoles', 4: 'Jueves', 5: 'Viernes', 6: 'Sábado', 7: 'Domingo'}
+
+
+def _money(field):
+    return Coalesce(Sum(field), Value(Decimal('0')))
+
+
+class AnalyticsService:
+    """
+    Facturación y ocupación por rango arbitrario de fechas
+
+    La agrupación se resuelve en PostgreSQL (Trunc*, ExtractHour,
+    ExtractIsoWeekDay) en una sola query sobre los turnos no
+    cancelados. La ocupación se calcula contra la grilla de TimeSlotConfiguration:
+    minutos reservados / minutos ofrecidos por las canchas activas del grupo.
+    """
+    
+    AGGREGATES = {
+        'revenue': lambda: _money('closure__total_amount'),
+        'cash': lambda: _money('closure__cash_amount'),
+        'transfer': lambda: _money('closure__transfer_amount'),
+        'consumptions': lambda: _money('closure__consumptions_amount'),
+        'bookings': lambda: Count('id'),
+        'closed': lambda: Count('closure'),
+        'occupancy': lambda: Coalesce(
+            Sum(minute_of_day('end_time') - minute_of_day('start_time')), Value(0)
+        ),
+    }
+    
+    @staticmethod
+    def parse_metrics(metrics):
+        """Lista de métricas pedidas (str separado por comas o iterable)"""
+        if not metrics:
+            return list(ANALYTICS_DEFAULT_METRICS)
+        if isinstance(metrics, str):
+            metrics = [metric.strip() for metric in metrics.split(',') if metric.strip()]
+        invalid = [metric for metric in metrics if metric not in ANALYTICS_METRICS]
+        if invalid:
+            raise ValueError(f"Métricas inválidas: {', '.join(invalid)}. Usar: {', '.join(ANALYTICS_METRICS)}")
+        return list(dict.fromkeys(metrics))
+    
+    @staticmethod
+    def _grouping(group_by):
+        """
+        (campos de values(), expresión de agrupación o None) para group_by
+        """
+        if group_by == 'day':
+            return ['date'], None
+        if group_by in PERIOD_TRUNC:
+            return ['period'], PERIOD_TRUNC[group_by]('date')
+        if group_by == 'court':
+            return ['court_id', 'court__name'], None
+        if group_by == 'hour':
+            return ['period'], ExtractHour('start_time')
+        return ['period'], ExtractIsoWeekDay('date')
+    
+    @staticmethod
+    def _period(group_by, row):
+        """Clave legible del grupo"""
+        if group_by == 'day':
+            return {'period': row['date'].isoformat()}
+        if group_by == 'week':
+            return {'period': row['period'].isoformat()}
+        if group_by == 'month':
+            return {'period': row['period'].strftime('%Y-%m')}
+        if group_by == 'quarter':
+            return {'period': f"{row['period'].year}-Q{(row['period'].month - 1) // 3 + 1}"}
+        if group_by == 'year':
+            return {'period': row['period'].year}
+        if group_by == 'court':
+            return {'period': row['court_id'], 'court_name': row['court__name']}
+        if group_by == 'weekday':
+            return {'period': row['period'], 'weekday_display': WEEKDAY_LABELS[row['period']]}
+        return {'period': row['period']}
+    
+    @staticmethod
+    def _capacity(group_by, row, days, courts_count, day_minutes, hour_minutes):
+        """Minutos ofrecidos por la grilla para el grupo"""
+        if group_by == 'day':
+            return courts_count * day_minutes
+        if group_by in PERIOD_START:
+            # Solo los días del período que caen dentro del rango pedido
+            period_start = PERIOD_START[group_by]
+            group_days = sum(1 for day in days if period_start(day) == row['period'])
+            return group_days * courts_count * day_minutes
+        if group_by == 'court':
+            return len(days) * day_minutes
+        if group_by == 'weekday':
+            group_days = sum(1 for day in days if day.isoweekday() == row['period'])
+            return group_days * courts_count * day_minutes
+        return len(days) * courts_count * hour_minutes.get(row['period'], 0)
+    
+    @staticmethod
+    def get_analytics(date_from, date_to, group_by='day', metrics=None, court_id=None):
+        """
+        Métricas agrupadas por día, semana, mes, trimestre, año, cancha, hora
+        o día de la semana
+        Devuelve {'results': [...], 'totals': {...}} con una fila por grupo
+        """
+        if isinstance(date_from, str):
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+        if isinstance(date_to, str):
+            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+        if date_to < date_from:
+            raise ValueError('date_to debe ser posterior o igual a date_from')
+        if (date_to - date_from).days + 1 > ANALYTICS_MAX_RANGE_DAYS:
+            raise ValueError(f'El rango no puede superar {ANALYTICS_MAX_RANGE_DAYS} días')
+        if group_by not in ANALYTICS_GROUP_BY:
+            raise ValueError(f"group_by inválido. Usar: {', '.join(ANALYTICS_GROUP_BY)}")
+        metrics = AnalyticsService.parse_metrics(metrics)
+        
+        queryset = Booking.objects.filter(
+            date__gte=date_from,
+            date__lte=date_to
+        ).exclude(status='cancelled')
+        if court_id:
+            queryset = queryset.filter(court_id=court_id)
+        
+        fields, expression = AnalyticsService._grouping(group_by)
+        if expression is not None:
+            queryset = queryset.annotate(period=expression)
+        rows = queryset.values(*fields).annotate(
+            **{metric: AnalyticsService.AGGREGATES[metric]() for metric in metrics}
+        ).order_by(*fields)
+        
+        # Capacidad de la grilla (solo si se pide ocupación)
+        capacity_args = None
+        if 'occupancy' in metrics:
+            grid = AvailabilityEngine.build_grid(TimeSlotConfiguration.get_active())
+            hour_minutes = {}
+            for start, end, _mask in grid:
+                hour_minutes[start // 60] = hour_minutes.get(start // 60, 0) + end - start
+            courts = Court.objects.filter(is_active=True)
+            if court_id:
+                courts = courts.filter(pk=court_id)
+            capacity_args = (
+                list(AvailabilityEngine.dates(date_from, date_to)),
+                courts.count(),
+                sum(end - start for start, end, _mask in grid),
+                hour_minutes,
+            )
+        
+        results = []
+        totals = dict.fromkeys(metrics, 0)
+        booked_total = 0
+        for row in rows:
+            item = AnalyticsService._period(group_by, row)
+            for metric in metrics:
+                if metric == 'occupancy':
+                    capacity = AnalyticsService._capacity(group_by, row, *capacity_args)
+                    booked_total += row[metric]
+                    item['booked_minutes'] = row[metric]
+                    item['occupancy'] = round(row[metric] / capacity, 4) if capacity else None
+                else:
+                    item[metric] = row[metric]
+                    totals[metric] += row[metric]
+            results.append(item)
+        
+        if 'occupancy' in metrics:
+            # Sobre todo el rango, incluidos los grupos sin turnos
+            days, courts_count, day_minutes, _hour_minutes = capacity_args
+            capacity_total = len(days) * courts_count * day_minutes
+            totals['booked_minutes'] = booked_total
+            totals['occupancy'] = round(booked_total / capacity_total, 4) if capacity_total else None
+        
+        return {
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'group_by': group_by,
+            'metrics': metrics,
+            'results': results,
+            'totals': totals,
         }
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from apps.bookings.models import Booking, BookingClosure
+from .services import ROLLUP_AMOUNT_FIELDS, RevenueRollupService
+
+
+def closure_amounts(instance):
+    """Montos acumulables de un cierre (leídos de __dict__, sin queries)"""
+    values = instance.__dict__
+    if values.get('total_amount') is None:
+        return None
+    return {field: values.get(field) or 0 for field in ROLLUP_AMOUNT_FIELDS}
+
+
+def closure_day_court(instance):
+    """(fecha, cancha) del turno del cierre"""
+    if BookingClosure.booking.is_cached(instance):
+        return instance.booking.date, instance.booking.court_id
+    return Booking.objects.values_list('date', 'court_id').get(pk=instance.booking_id)
+
+
+@receiver(post_init, sender=BookingClosure)
+def remember_closure_amounts(sender, instance, **kwargs):
+    """
+    Recordar los montos guardados para aplicar solo la diferencia al acumulado
+    """
+    instance._revenue_amounts = closure_amounts(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=BookingClosure)
+def update_daily_revenue_on_closure_save(sender, instance, created, **kwargs):
+    amounts = closure_amounts(instance)
+    previous = None if created else instance._revenue_amounts
+    RevenueRollupService.apply_change(*closure_day_court(instance), previous, amounts)
+    instance._revenue_amounts = amounts
+
+
+@receiver(post_delete, sender=BookingClosure)
+def update_daily_revenue_on_closure_delete(sender, instance, **kwargs):
+    RevenueRollupService.apply_change(*closure_day_court(instance), closure_amounts(instance), None)
@@ -0,0 +1,196 @@
+from io import StringIO
+from decimal import Decimal
+from datetime import date, time
+
+from django.test import TestCase
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from .models import DailyRevenue
+from .services import AnalyticsService, ReportService
+from apps.bookings.availability import AvailabilityEngine
+from apps.bookings.models import Booking, BookingClosure
+from apps.courts.models import Court, TimeSlotConfiguration
+from apps.products.models import Consumption, Product
+from apps.users.models import User
+
+
+class ReportServiceTest(TestCase):
+    """Tests para los reportes de facturación"""
+
+    def setUp(self):
+        self.court = Court.objects.create(
+            name='Cancha 1', court_type='indoor', price=24000, is_active=True
+        )
+        self.court2 = Court.objects.create(
+            name='Cancha 2', court_type='outdoor', price=24000, is_active=True
+        )
+        self.config = TimeSlotConfiguration.get_active()
+
+    def close(self, day, hour, court=None, cash=Decimal('0'), transfer=Decimal('0')):
+        booking = Booking.objects.create(
+            court=court or self.court,
+            date=day,
+            start_time=time(hour, 0),
+            end_time=time(hour + 1, 30),
+            status='completed',
+            customer_name=f'Reporte {day} {hour}',
+        )
+        return BookingClosure.objects.create(
+            booking=booking,
+            booking_amount=cash + transfer,
+            cash_amount=cash,
+            transfer_amount=transfer,
+        )
+
+    def test_monthly_summary_single_query(self):
+        self.close(date(2025, 1, 30), 10, cash=Decimal('24000'))
+        self.close(date(2025, 1, 31), 10, cash=Decimal('12000'), transfer=Decimal('12000'))
+        self.close(date(2025, 1, 31), 12, court=self.court2, transfer=Decimal('24000'))
+        self.close(date(2025, 2, 1), 10, cash=Decimal('24000'))
+
+        with self.assertNumQueries(1):
+            summary = ReportService.get_monthly_summary(2025, 1)
+
+        self.assertEqual(summary['total_bookings'], 3)
+        self.assertEqual(summary['total_amount'], 72000.0)
+        self.assertEqual([d['date'] for d in summary['daily_summaries']], ['2025-01-30', '2025-01-31'])
+        last_day = summary['daily_summaries'][1]
+        methods = {m['method']: m for m in last_day['by_payment_method']}
+        self.assertEqual(methods['cash']['total'], 12000.0)
+        self.assertEqual(methods['transfer']['count'], 2)
+        by_court = {c['court_name']: c for c in summary['by_court']}
+        self.assertEqual(by_court['Cancha 1']['total_bookings'], 2)
+        self.assertEqual(by_court['Cancha 2']['total_amount'], 24000.0)
+
+    def test_daily_revenue_follows_closures_and_consumptions(self):
+        day = date(2025, 3, 10)
+        closure = self.close(day, 10, cash=Decimal('24000'))
+        self.close(day, 12, transfer=Decimal('24000'))
+
+        product = Product.objects.create(name='Agua', category='beverage', price=1500, stock=None)
+        Consumption.objects.create(booking=closure.booking, product=product, quantity=2, unit_price=Decimal('1500'))
+
+        rollup = DailyRevenue.objects.get(date=day, court=self.court)
+        self.assertEqual(rollup.closures_count, 2)
+        self.assertEqual(rollup.cash_count, 1)
+        self.assertEqual(rollup.transfer_count, 1)
+        self.assertEqual(rollup.consumptions_amount, Decimal('3000'))
+        self.assertEqual(rollup.total_amount, Decimal('51000'))
+
+        closure.booking.delete()
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.closures_count, 1)
+        self.assertEqual(rollup.total_amount, Decimal('24000'))
+
+    def test_rebuild_daily_revenue(self):
+        self.close(date(2025, 3, 10), 10, cash=Decimal('24000'))
+        self.close(date(2025, 3, 11), 10, court=self.court2, transfer=Decimal('24000'))
+        DailyRevenue.objects.all().update(total_amount=0, closures_count=0)
+
+        out = StringIO()
+        call_command('rebuild_daily_revenue', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(
+            sorted(DailyRevenue.objects.values_list('closures_count', 'total_amount')),
+            [(1, Decimal('24000')), (1, Decimal('24000'))],
+        )
+
+    def test_yearly_summary(self):
+        self.close(date(2025, 1, 31), 10, cash=Decimal('24000'))
+        self.close(date(2025, 6, 15), 10, court=self.court2, transfer=Decimal('24000'))
+        with self.assertNumQueries(1):
+            summary = ReportService.get_yearly_summary(2025)
+        self.assertEqual(summary['total_bookings'], 2)
+        self.assertEqual([m['month'] for m in summary['monthly_summaries']], [1, 6])
+        self.assertEqual(len(summary['by_court']), 2)
+
+    def test_daily_summary_keeps_decimal_precision(self):
+        day = date(2025, 3, 10)
+        for hour in (10, 12, 14):
+            self.close(day, hour, cash=Decimal('0.10'), transfer=Decimal('0.20'))
+
+        with self.assertNumQueries(2):
+            summary = ReportService.get_daily_summary(day)
+
+        self.assertEqual(summary['total_amount'], Decimal('0.90'))
+        methods = {m['method']: m for m in summary['by_payment_method']}
+        self.assertEqual(methods['cash']['total'], Decimal('0.30'))
+        self.assertEqual(methods['transfer']['count'], 3)
+        self.assertEqual(len(summary['bookings']), 3)
+        self.assertIsInstance(summary['bookings'][0]['cash_amount'], Decimal)
+        self.assertIn('Transferencia', summary['bookings'][0]['payment_summary'])
+
+    def test_history_keeps_decimal_precision(self):
+        self.close(date(2025, 3, 10), 10, cash=Decimal('0.10'), transfer=Decimal('0.20'))
+
+        closure = ReportService.get_history()['results'][0]['closure']
+
+        self.assertEqual(closure['total_amount'], Decimal('0.30'))
+        self.assertIsInstance(closure['cash_amount'], Decimal)
+
+    def test_analytics_group_by_month_and_hour(self):
+        self.close(date(2025, 1, 31), 10, cash=Decimal('24000'))
+        self.close(date(2025, 2, 3), 10, court=self.court2, transfer=Decimal('20000'))
+        Booking.objects.create(
+            court=self.court, date=date(2025, 2, 3), start_time=time(14, 0), end_time=time(15, 30),
+            status='reserved', customer_name='Sin cerrar',
+        )
+
+        by_month = AnalyticsService.get_analytics('2025-01-01', '2025-02-28', 'month', 'revenue,bookings,closed')
+        self.assertEqual([r['period'] for r in by_month['results']], ['2025-01', '2025-02'])
+        self.assertEqual(by_month['results'][1]['revenue'], Decimal('20000'))
+        self.assertEqual(by_month['results'][1]['bookings'], 2)
+        self.assertEqual(by_month['totals']['closed'], 2)
+
+        by_quarter = AnalyticsService.get_analytics('2025-01-01', '2025-02-28', 'quarter', 'revenue')
+        self.assertEqual(by_quarter['results'], [{'period': '2025-Q1', 'revenue': Decimal('44000')}])
+
+        by_hour = AnalyticsService.get_analytics('2025-02-03', '2025-02-03', 'hour', ['occupancy'])
+        hours = {r['period']: r for r in by_hour['results']}
+        self.assertEqual(hours[10]['booked_minutes'], 90)
+        self.assertIsNotNone(hours[14]['occupancy'])
+
+    def test_analytics_occupancy_by_day(self):
+        config = TimeSlotConfiguration.get_active()
+        grid_minutes = sum(end - start for start, end, _m in AvailabilityEngine.build_grid(config))
+        self.close(date(2025, 2, 3), 10, cash=Decimal('24000'))
+        result = AnalyticsService.get_analytics('2025-02-03', '2025-02-03', 'day', 'occupancy')
+        self.assertEqual(result['results'][0]['occupancy'], round(90 / (2 * grid_minutes), 4))
+
+    def test_analytics_invalid_params(self):
+        with self.assertRaises(ValueError):
+            AnalyticsService.get_analytics('2025-01-01', '2025-01-31', 'decade')
+        with self.assertRaises(ValueError):
+            AnalyticsService.get_analytics('2025-01-01', '2025-01-31', 'day', 'profit')
+
+    def test_monthly_summary_december(self):
+        self.close(date(2024, 12, 31), 10, cash=Decimal('24000'))
+        summary = ReportService.get_monthly_summary(2024, 12)
+        self.assertEqual(summary['total_bookings'], 1)
+
+
+class SummaryAPITest(APITestCase):
+    """Tests para los parámetros de los resúmenes mensual y anual"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', password='admin123', role='admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_monthly_summary_out_of_range(self):
+        for params in [{'year': 0, 'month': 1}, {'year': 10000, 'month': 1}, {'year': 2025, 'month': 13}]:
+            response = self.client.get('/api/reports/monthly-summary/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        response = self.client.get('/api/reports/monthly-summary/', {'year': 9999, 'month': 12})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_yearly_summary_out_of_range(self):
+        for year in [0, -5, 10000]:
+            response = self.client.get('/api/reports/yearly-summary/', {'year': year})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, year)
+        response = self.client.get('/api/reports/yearly-summary/', {'year': 2025})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import DailySummaryView, HistoryView, MonthlySummaryView
+from .views import AnalyticsView, DailySummaryView, HistoryView, HistoryExportView, MonthlySummaryView, YearlySummaryView
 
 urlpatterns = [
     path('daily-summary/', DailySummaryView.as_view(), name='daily-summary'),
     path('history/', HistoryView.as_view(), name='history'),
+    path('history/export/', HistoryExportView.as_view(), name='history-export'),
     path('monthly-summary/', MonthlySummaryView.as_view(), name='monthly-summary'),
+    path('yearly-summary/', YearlySummaryView.as_view(), name='yearly-summary'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
 ]
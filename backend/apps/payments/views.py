@@ -1,8 +1,9 @@
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from datetime import datetime, date
-from .services import ReportService
+from datetime import datetime, date, MINYEAR, MAXYEAR
+from .services import AnalyticsService, ReportService
 from apps.users.permissions import IsAdminOrReception
 
 
@@ -44,19 +45,23 @@ class HistoryView(APIView):
     def get(self, request):
         """
         Obtener historial de turnos
-        Query params: date_from, date_to, court, status
+        Query params: date_from, date_to, court, status, cursor, limit
         """
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
         court_id = request.query_params.get('court')
         status_filter = request.query_params.get('status')
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
         
         try:
             history = ReportService.get_history(
                 date_from=date_from,
                 date_to=date_to,
                 court_id=court_id,
-                status=status_filter
+                status=status_filter,
+                cursor=cursor,
+                limit=limit
             )
             return Response(history)
         except Exception as e:
@@ -66,6 +71,46 @@ class HistoryView(APIView):
             )
 
 
+class HistoryExportView(APIView):
+    """
+    Exportación del historial de turnos en streaming (CSV o NDJSON)
+    """
+    permission_classes = [IsAdminOrReception]
+    
+    CONTENT_TYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+    
+    def get(self, request):
+        """
+        Descargar el historial completo del rango, sin paginar
+        Query params: output (csv|ndjson), date_from, date_to, court, status
+        """
+        output = request.query_params.get('output', 'csv')
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        
+        try:
+            lines = ReportService.iter_history_export(
+                output=output,
+                date_from=date_from,
+                date_to=date_to,
+                court_id=request.query_params.get('court'),
+                status=request.query_params.get('status')
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        filename = f"historial_{date_from or 'inicio'}_{date_to or 'hoy'}.{output}"
+        response = StreamingHttpResponse(lines, content_type=self.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 class MonthlySummaryView(APIView):
     """
     Vista para resumen mensual
@@ -86,6 +131,12 @@ class MonthlySummaryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if not MINYEAR <= year <= MAXYEAR:
+            return Response(
+                {'error': f'Año debe estar entre {MINYEAR} y {MAXYEAR}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         if month < 1 or month > 12:
             return Response(
                 {'error': 'Mes debe estar entre 1 y 12'},
@@ -94,3 +145,70 @@ class MonthlySummaryView(APIView):
         
         summary = ReportService.get_monthly_summary(year, month)
         return Response(summary)
+
+
+class YearlySummaryView(APIView):
+    """
+    Vista para resumen anual
+    """
+    permission_classes = [IsAdminOrReception]
+    
+    def get(self, request):
+        """
+        Obtener resumen anual
+        Query params: year
+        """
+        try:
+            year = int(request.query_params.get('year', date.today().year))
+        except ValueError:
+            return Response(
+                {'error': 'El parámetro year debe ser un número'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not MINYEAR <= year <= MAXYEAR:
+            return Response(
+                {'error': f'Año debe estar entre {MINYEAR} y {MAXYEAR}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        summary = ReportService.get_yearly_summary(year)
+        return Response(summary)
+
+
+class AnalyticsView(APIView):
+    """
+    Vista de analítica de facturación y ocupación
+    """
+    permission_classes = [IsAdminOrReception]
+    
+    def get(self, request):
+        """
+        Obtener métricas agrupadas
+        Query params: date_from, date_to (YYYY-MM-DD, requeridos),
+        group_by (day|week|month|quarter|year|court|hour|weekday), metrics (separadas por coma), court
+        """
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        
+        if not date_from or not date_to:
+            return Response(
+                {'error': 'Se requieren date_from y date_to'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            analytics = AnalyticsService.get_analytics(
+                date_from=date_from,
+                date_to=date_to,
+                group_by=request.query_params.get('group_by', 'day'),
+                metrics=request.query_params.get('metrics'),
+                court_id=request.query_params.get('court')
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(analytics)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Consumption
+from .models import Product, Consumption, StockMovement
 
 
 @admin.register(Product)
@@ -16,3 +16,13 @@ class ConsumptionAdmin(admin.ModelAdmin):
     list_filter = ['created_at', 'product']
     search_fields = ['booking__customer_name', 'product__name']
     readonly_fields = ['created_at', 'total_price']
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['product', 'kind', 'quantity', 'balance_after', 'created_by', 'created_at']
+    list_filter = ['kind', 'product']
+    search_fields = ['product__name', 'notes']
+    readonly_fields = [
+        'product', 'kind', 'quantity', 'balance_after', 'consumption', 'notes', 'created_by', 'created_at',
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.1 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_stock_ledger(apps, schema_editor):
+    """Saldo inicial del libro para los productos que ya controlan stock"""
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('products', 'StockMovement')
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=product_id,
+            kind='adjustment',
+            quantity=stock,
+            balance_after=stock,
+            notes='Saldo inicial',
+        )
+        for product_id, stock in Product.objects.filter(stock__isnull=False).values_list('id', 'stock')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sale', 'Venta'), ('restock', 'Reposición'), ('adjustment', 'Ajuste'), ('reversal', 'Anulación de venta')], max_length=20, verbose_name='Tipo')),
+                ('quantity', models.IntegerField(verbose_name='Cantidad')),
+                ('balance_after', models.IntegerField(verbose_name='Saldo resultante')),
+                ('notes', models.CharField(blank=True, max_length=255, verbose_name='Notas')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock__isnull', False)), fields=['stock'], name='product_low_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='consumption',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='products.consumption', verbose_name='Consumo'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL, verbose_name='Registrado por'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product', verbose_name='Producto'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', '-created_at'], name='products_st_product_3ae061_idx'),
+        ),
+        migrations.RunPython(open_stock_ledger, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 
 class Product(models.Model):
@@ -50,6 +51,14 @@ class Product(models.Model):
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
         ordering = ['category', 'name']
+        indexes = [
+            # Consulta de stock bajo: solo productos activos que controlan stock
+            models.Index(
+                fields=['stock'],
+                name='product_low_stock_idx',
+                condition=Q(is_active=True, stock__isnull=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - ${self.price}"
@@ -102,3 +111,73 @@ class Consumption(models.Model):
         # Calcular total automáticamente
         self.total_price = self.quantity * self.unit_price
         super().save(*args, **kwargs)
+
+
+class StockMovement(models.Model):
+    """
+    Movimiento del libro de stock de un producto
+
+    Product.stock es el saldo actual (cache del libro): cada movimiento se
+    registra en la misma transacción que el UPDATE condicional del saldo.
+    La cantidad es positiva para ingresos y negativa para egresos.
+    """
+    KIND_CHOICES = [
+        ('sale', 'Venta'),
+        ('restock', 'Reposición'),
+        ('adjustment', 'Ajuste'),
+        ('reversal', 'Anulación de venta'),
+    ]
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_movements',
+        verbose_name='Producto'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        verbose_name='Tipo'
+    )
+    quantity = models.IntegerField(
+        verbose_name='Cantidad'
+    )
+    balance_after = models.IntegerField(
+        verbose_name='Saldo resultante'
+    )
+    consumption = models.ForeignKey(
+        Consumption,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name='Consumo'
+    )
+    notes = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Notas'
+    )
+    created_by = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name='Registrado por'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha'
+    )
+    
+    class Meta:
+        verbose_name = 'Movimiento de Stock'
+        verbose_name_plural = 'Movimientos de Stock'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['product', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.product.name} {self.quantity:+d}"
@@ -1,5 +1,6 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Product, Consumption
+from .models import Product, Consumption, StockMovement
 from apps.bookings.models import Booking
 
 
@@ -27,6 +28,26 @@ class ProductSerializer(serializers.ModelSerializer):
         if value is not None and value < 0:
             raise serializers.ValidationError('El stock no puede ser negativo')
         return value
+    
+    def update(self, instance, validated_data):
+        """
+        Guardar solo los campos enviados: el stock lo mueve StockService y
+        el leído al inicio del request puede estar desactualizado
+        """
+        validated_data.pop('stock', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class ProductUpdateSerializer(ProductSerializer):
+    """
+    Serializer para editar productos
+    El stock es de solo lectura: se mueve con restock/adjust (libro de stock)
+    """
+    class Meta(ProductSerializer.Meta):
+        read_only_fields = ['id', 'stock', 'created_at', 'updated_at']
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -78,16 +99,26 @@ class ConsumptionSerializer(serializers.ModelSerializer):
                 'booking': 'Solo se pueden agregar consumos a turnos reservados o completados'
             })
         
+        # Al editar, el stock ya tiene descontada la cantidad anterior del
+        # mismo producto: alcanza con que cubra la diferencia
+        needed = quantity
+        if self.instance is not None:
+            product = product or self.instance.product
+            quantity = attrs.get('quantity', self.instance.quantity)
+            needed = quantity
+            if product.pk == self.instance.product_id:
+                needed = quantity - self.instance.quantity
+        
         # Validar stock si el producto lo controla
         if product and product.stock is not None:
-            if product.stock < quantity:
+            if product.stock < needed:
                 raise serializers.ValidationError({
                     'quantity': f'Stock insuficiente. Disponible: {product.stock}'
                 })
         
         # Si no se provee unit_price, usar el precio actual del producto
-        if 'unit_price' not in attrs and product:
-            attrs['unit_price'] = product.price
+        if 'unit_price' not in attrs and 'product' in attrs:
+            attrs['unit_price'] = attrs['product'].price
         
         return attrs
 
@@ -126,3 +157,84 @@ class ConsumptionCreateSerializer(serializers.ModelSerializer):
             attrs['unit_price'] = product.price
         
         return attrs
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    """
+    Serializer para movimientos de stock
+    """
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    
+    class Meta:
+        model = StockMovement
+        fields = [
+            'id', 'product', 'kind', 'kind_display', 'quantity', 'balance_after',
+            'consumption', 'notes', 'created_by', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class RestockSerializer(serializers.Serializer):
+    """
+    Serializer para ingresar mercadería
+    """
+    quantity = serializers.IntegerField(min_value=1)
+    notes = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    Serializer para ajustar el stock al valor contado
+    """
+    stock = serializers.IntegerField(min_value=0, allow_null=True)
+    notes = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+
+class ConsumptionBatchItemSerializer(serializers.Serializer):
+    """
+    Línea de una carga de consumos por lote
+    """
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False)
+
+
+class ConsumptionBatchSerializer(serializers.Serializer):
+    """
+    Serializer para cargar varios consumos de un turno en una sola solicitud
+    Valida todos los productos y el stock con una sola consulta
+    """
+    booking = serializers.PrimaryKeyRelatedField(queryset=Booking.objects.all())
+    items = ConsumptionBatchItemSerializer(many=True, allow_empty=False)
+    
+    def validate_booking(self, value):
+        if value.status not in ['reserved', 'completed']:
+            raise serializers.ValidationError(
+                'Solo se pueden agregar consumos a turnos reservados o completados'
+            )
+        return value
+    
+    def validate_items(self, value):
+        products = Product.objects.in_bulk([item['product'] for item in value])
+        
+        unknown = sorted({item['product'] for item in value} - set(products))
+        if unknown:
+            raise serializers.ValidationError(f'Productos inexistentes: {unknown}')
+        
+        requested = {}
+        for item in value:
+            requested[item['product']] = requested.get(item['product'], 0) + item['quantity']
+        
+        shortages = [
+            f'{products[pk].name}: disponible {products[pk].stock}'
+            for pk, quantity in requested.items()
+            if products[pk].stock is not None and products[pk].stock < quantity
+        ]
+        if shortages:
+            raise serializers.ValidationError('Stock insuficiente. ' + '; '.join(shortages))
+        
+        for item in value:
+            item['product'] = products[item['product']]
+            # Si no se provee unit_price, usar el precio actual del producto
+            item.setdefault('unit_price', item['product'].price)
+        return value
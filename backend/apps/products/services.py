@@ -0,0 +1,180 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import Product, StockMovement
+
+
+class StockService:
+    """
+    Libro de stock de productos
+
+    El saldo (Product.stock) se modifica solo con UPDATE condicionales sobre
+    F('stock'), así dos ventas concurrentes del último artículo no pueden
+    dejar el stock negativo: la segunda no actualiza ninguna fila y falla.
+    Los productos con stock NULL no controlan stock y no generan movimientos.
+    """
+
+    @staticmethod
+    def _record(product_id, kind, quantity, consumption=None, user=None, notes=''):
+        """
+        Registrar el movimiento leyendo el saldo resultante
+        La fila del producto ya está bloqueada por el UPDATE de esta transacción
+        """
+        balance = Product.objects.values_list('stock', flat=True).get(pk=product_id)
+        return StockMovement.objects.create(
+            product_id=product_id,
+            kind=kind,
+            quantity=quantity,
+            balance_after=balance,
+            consumption=consumption,
+            created_by=user,
+            notes=notes,
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def sell(product_id, quantity, consumption=None, user=None):
+        """
+        Descontar stock por una venta
+        Devuelve el movimiento, o None si el producto no controla stock
+        """
+        updated = Product.objects.filter(
+            pk=product_id,
+            stock__gte=quantity
+        ).update(stock=F('stock') - quantity)
+
+        if not updated:
+            stock = Product.objects.values_list('stock', flat=True).get(pk=product_id)
+            if stock is None:
+                return None
+            raise ValueError(f'Stock insuficiente. Disponible: {stock}')
+
+        return StockService._record(product_id, 'sale', -quantity, consumption=consumption, user=user)
+
+    @staticmethod
+    @transaction.atomic
+    def sell_many(consumptions, user=None):
+        """
+        Descontar stock de varios consumos ya creados (carga por lote)
+        - Un UPDATE condicional por producto con la cantidad total del lote,
+          en orden de id para no bloquearse con otro lote concurrente
+        - Si algún producto no alcanza, ValueError con todos los faltantes
+          (la transacción se revierte completa)
+        - Los movimientos se insertan con un solo bulk_create
+        Devuelve la lista de movimientos registrados
+        """
+        requested = defaultdict(int)
+        for consumption in consumptions:
+            requested[consumption.product_id] += consumption.quantity
+
+        missing = []
+        for product_id in sorted(requested):
+            updated = Product.objects.filter(
+                pk=product_id,
+                stock__gte=requested[product_id]
+            ).update(stock=F('stock') - requested[product_id])
+            if not updated:
+                missing.append(product_id)
+
+        products = Product.objects.in_bulk(list(requested))
+        shortages = [
+            f'{products[product_id].name}: disponible {products[product_id].stock}'
+            for product_id in missing
+            if products[product_id].stock is not None
+        ]
+        if shortages:
+            raise ValueError('Stock insuficiente. ' + '; '.join(shortages))
+
+        # Saldo posterior a cada línea, reconstruido desde el saldo final
+        balances = {pk: product.stock for pk, product in products.items() if product.stock is not None}
+        movements = []
+        for consumption in reversed(consumptions):
+            if consumption.product_id not in balances:
+                continue
+            movements.append(StockMovement(
+                product_id=consumption.product_id,
+                kind='sale',
+                quantity=-consumption.quantity,
+                balance_after=balances[consumption.product_id],
+                consumption=consumption,
+                created_by=user,
+            ))
+            balances[consumption.product_id] += consumption.quantity
+
+        movements.reverse()
+        return StockMovement.objects.bulk_create(movements)
+
+    @staticmethod
+    @transaction.atomic
+    def reverse_sale(consumption, user=None):
+        """
+        Devolver al stock la cantidad de un consumo anulado
+        """
+        updated = Product.objects.filter(
+            pk=consumption.product_id,
+            stock__isnull=False
+        ).update(stock=F('stock') + consumption.quantity)
+
+        if not updated:
+            return None
+
+        return StockService._record(
+            consumption.product_id, 'reversal', consumption.quantity, consumption=consumption, user=user
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def restock(product_id, quantity, user=None, notes=''):
+        """
+        Ingresar mercadería
+        """
+        if quantity <= 0:
+            raise ValueError('La cantidad debe ser mayor a 0')
+
+        updated = Product.objects.filter(
+            pk=product_id,
+            stock__isnull=False
+        ).update(stock=F('stock') + quantity)
+
+        if not updated:
+            raise ValueError('El producto no controla stock')
+
+        return StockService._record(product_id, 'restock', quantity, user=user, notes=notes)
+
+    @staticmethod
+    @transaction.atomic
+    def adjust(product_id, counted_stock, user=None, notes=''):
+        """
+        Fijar el stock contado (inventario); el movimiento registra la diferencia
+        Con counted_stock=None el producto deja de controlar stock
+        """
+        if counted_stock is not None and counted_stock < 0:
+            raise ValueError('El stock no puede ser negativo')
+
+        product = Product.objects.select_for_update().only('stock').get(pk=product_id)
+        previous = product.stock
+        if counted_stock == previous:
+            return None
+
+        Product.objects.filter(pk=product_id).update(stock=counted_stock)
+        if counted_stock is None:
+            return None
+
+        return StockService._record(
+            product_id, 'adjustment', counted_stock - (previous or 0), user=user, notes=notes
+        )
+
+    @staticmethod
+    def low_stock(threshold=None):
+        """
+        Productos activos con stock en o por debajo del umbral
+        Lee el saldo cacheado en Product (índice parcial), no el libro
+        """
+        if threshold is None:
+            threshold = getattr(settings, 'LOW_STOCK_THRESHOLD', 5)
+        return Product.objects.filter(
+            is_active=True,
+            stock__isnull=False,
+            stock__lte=threshold
+        ).order_by('stock', 'name')
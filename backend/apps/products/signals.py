@@ -1,24 +1,20 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from apps.bookings.services import BookingService
 from .models import Consumption
 
 
 @receiver([post_save, post_delete], sender=Consumption)
-def update_booking_closure_consumptions_amount(sender, instance, **kwargs):
+def update_booking_closure_consumptions_amount(sender, instance, origin=None, **kwargs):
     """
     Actualiza el monto de consumos en el cierre del turno
     cuando se crea o elimina un consumo
     """
-    booking = instance.booking
+    # Si el consumo se borra en cascada (por ejemplo al borrar el turno),
+    # el cierre también se borra: no hay nada que recalcular
+    if origin is not None and not (
+        isinstance(origin, Consumption) or getattr(origin, 'model', None) is Consumption
+    ):
+        return
     
-    # Verificar si el turno tiene un cierre
-    if hasattr(booking, 'closure'):
-        # Calcular total de consumos
-        total_consumptions = sum(
-            c.total_price for c in booking.consumptions.all()
-        )
-        
-        # Actualizar closure
-        closure = booking.closure
-        closure.consumptions_amount = total_consumptions
-        closure.save()
+    BookingService.recalculate_consumptions_amount([instance.booking_id])
@@ -0,0 +1,235 @@
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from .models import Product, Consumption, StockMovement
+from .serializers import ProductSerializer
+from .services import StockService
+from apps.bookings.models import Booking, BookingClosure
+from apps.bookings.services import BookingService
+from apps.courts.models import Court
+
+User = get_user_model()
+
+
+class StockServiceTest(TestCase):
+    """Tests para el libro de stock"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name='Cerveza', category='beverage', price=3000, stock=2)
+        self.untracked = Product.objects.create(name='Alquiler paleta', category='equipment', price=5000, stock=None)
+
+    def test_sell_decrements_and_records_movement(self):
+        movement = StockService.sell(self.product.id, 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(movement.kind, 'sale')
+        self.assertEqual(movement.quantity, -2)
+        self.assertEqual(movement.balance_after, 0)
+
+    def test_sell_last_unit_twice_fails(self):
+        StockService.sell(self.product.id, 2)
+        with self.assertRaises(ValueError) as ctx:
+            StockService.sell(self.product.id, 1)
+        self.assertIn('Stock insuficiente', str(ctx.exception))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+    def test_untracked_product_has_no_movements(self):
+        self.assertIsNone(StockService.sell(self.untracked.id, 10))
+        self.assertFalse(StockMovement.objects.filter(product=self.untracked).exists())
+
+    def test_restock_and_adjust(self):
+        StockService.restock(self.product.id, 10)
+        movement = StockService.adjust(self.product.id, 9, notes='Inventario')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 9)
+        self.assertEqual(movement.quantity, -3)
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('kind', flat=True)),
+            ['restock', 'adjustment'],
+        )
+
+    def test_product_update_keeps_concurrent_stock(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        StockService.sell(self.product.id, 1)
+        serializer = ProductSerializer(stale, data={'price': 3500}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.price), (1, 3500))
+
+    def test_low_stock(self):
+        Product.objects.create(name='Agua', category='beverage', price=1500, stock=50)
+        Product.objects.create(name='Inactivo', category='beverage', price=1500, stock=0, is_active=False)
+        self.assertEqual([p.name for p in StockService.low_stock(5)], ['Cerveza'])
+
+
+class ConsumptionSignalTest(TestCase):
+    """Tests para el recálculo del cierre al cambiar los consumos"""
+
+    def setUp(self):
+        admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+        court = Court.objects.create(name='Cancha 1', court_type='indoor', price=24000)
+        self.booking = BookingService.create_booking(
+            court=court,
+            date=date.today() + timedelta(days=7),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            customer_name='Consumos',
+            user=admin,
+        )
+        BookingService.close_booking(self.booking.id, booking_amount=Decimal('24000'), cash_amount=Decimal('24000'))
+        self.product = Product.objects.create(name='Gatorade', category='beverage', price=2000, stock=None)
+
+    def add_consumption(self, quantity=1):
+        return Consumption.objects.create(
+            booking=self.booking, product=self.product, quantity=quantity, unit_price=Decimal('2000')
+        )
+
+    def test_consumption_signal_uses_aggregate(self):
+        self.add_consumption(2)
+        with CaptureQueriesContext(connection) as ctx:
+            consumption = self.add_consumption(1)
+        # Ningún SELECT trae filas completas de consumos
+        self.assertFalse(any(
+            '"products_consumption"."quantity"' in q['sql'] and q['sql'].startswith('SELECT')
+            for q in ctx.captured_queries
+        ))
+        closure = BookingClosure.objects.get(booking=self.booking)
+        self.assertEqual(closure.consumptions_amount, Decimal('6000'))
+        self.assertEqual(closure.total_amount, Decimal('30000'))
+
+        consumption.delete()
+        closure.refresh_from_db()
+        self.assertEqual(closure.consumptions_amount, Decimal('4000'))
+        self.assertEqual(closure.total_amount, Decimal('28000'))
+
+
+class ConsumptionStockAPITest(APITestCase):
+    """Tests para el descuento de stock desde la API de consumos"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+        court = Court.objects.create(name='Cancha 1', court_type='indoor', price=24000)
+        self.booking = Booking.objects.create(
+            court=court,
+            date=date.today() + timedelta(days=1),
+            start_time=time(10, 0),
+            end_time=time(11, 30),
+            status='reserved',
+            customer_name='Bar',
+        )
+        self.product = Product.objects.create(name='Cerveza', category='beverage', price=3000, stock=1)
+        self.client = APIClient()
+        login = self.client.post('/api/auth/login/', {'username': 'admin', 'password': 'admin123'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    def create_consumption(self):
+        return self.client.post('/api/consumptions/', {
+            'booking': self.booking.id,
+            'product': self.product.id,
+            'quantity': 1,
+            'unit_price': '3000.00',
+        })
+
+    def test_create_and_delete_consumption_moves_stock(self):
+        response = self.create_consumption()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+
+        consumption = Consumption.objects.get(booking=self.booking)
+        response = self.client.delete(f'/api/consumptions/{consumption.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('kind', flat=True)),
+            ['sale', 'reversal'],
+        )
+
+    def test_sale_without_stock_fails(self):
+        self.create_consumption()
+        response = self.create_consumption()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Consumption.objects.count(), 1)
+
+    def test_restock_endpoint_and_low_stock(self):
+        response = self.client.post(f'/api/products/{self.product.id}/restock/', {'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['balance_after'], 6)
+        response = self.client.get('/api/products/low-stock/?threshold=5')
+        self.assertEqual(response.data, [])
+
+    def test_product_update_does_not_touch_stock(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=10)
+        StockService.sell(self.product.id, 3)
+        # El formulario manda el stock que tenía cargado (10)
+        response = self.client.put(f'/api/products/{self.product.id}/', {
+            'name': 'Cerveza', 'category': 'beverage', 'price': '3500.00', 'stock': 10, 'is_active': True,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stock'], 7)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.price), (7, 3500))
+        self.assertFalse(StockMovement.objects.filter(kind='adjustment').exists())
+
+    def test_update_consumption_checks_only_extra_quantity(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=4)
+        response = self.client.post('/api/consumptions/', {
+            'booking': self.booking.id, 'product': self.product.id, 'quantity': 3, 'unit_price': '3000.00',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = f'/api/consumptions/{Consumption.objects.get().id}/'
+        response = self.client.patch(url, {'quantity': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        response = self.client.patch(url, {'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_batch_creates_consumptions_and_moves_stock(self):
+        water = Product.objects.create(name='Agua', category='beverage', price=1500, stock=None)
+        Product.objects.filter(pk=self.product.pk).update(stock=3)
+        BookingService.close_booking(self.booking.id, booking_amount=Decimal('24000'), cash_amount=Decimal('24000'))
+        response = self.client.post('/api/consumptions/batch/', {
+            'booking': self.booking.id,
+            'items': [
+                {'product': self.product.id, 'quantity': 2},
+                {'product': water.id, 'quantity': 4, 'unit_price': '1000.00'},
+                {'product': self.product.id, 'quantity': 1},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[1]['total_price'], '4000.00')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('quantity', 'balance_after')),
+            [(-2, 1), (-1, 0)],
+        )
+        closure = BookingClosure.objects.get(booking=self.booking)
+        self.assertEqual(closure.consumptions_amount, Decimal('13000'))
+        self.assertEqual(closure.total_amount, Decimal('37000'))
+    
+    def test_batch_without_stock_creates_nothing(self):
+        response = self.client.post('/api/consumptions/batch/', {
+            'booking': self.booking.id,
+            'items': [
+                {'product': self.product.id, 'quantity': 1},
+                {'product': self.product.id, 'quantity': 1},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Stock insuficiente', str(response.data))
+        self.assertFalse(Consumption.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
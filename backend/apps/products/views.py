@@ -1,14 +1,20 @@
-from rest_framework import viewsets, status
+from django.db import transaction
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import Product, Consumption
 from .serializers import (
-    ProductSerializer, ProductListSerializer,
-    ConsumptionSerializer, ConsumptionCreateSerializer
+    ProductSerializer, ProductListSerializer, ProductUpdateSerializer,
+    ConsumptionSerializer, ConsumptionCreateSerializer,
+    StockMovementSerializer, RestockSerializer, StockAdjustmentSerializer,
+    ConsumptionBatchSerializer
 )
+from .services import StockService
 from apps.users.permissions import IsAdminOrReadOnly, IsAdminOrReception
+from apps.bookings.idempotency import idempotent
+from apps.bookings.services import BookingService
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -26,6 +32,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'list':
             return ProductListSerializer
+        if self.action in ['update', 'partial_update']:
+            return ProductUpdateSerializer
         return ProductSerializer
     
     def get_queryset(self):
@@ -41,6 +49,89 @@ class ProductViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(is_active=True)
         
         return queryset
+    
+    @transaction.atomic
+    def perform_create(self, serializer):
+        """
+        El stock inicial se registra como ajuste en el libro de stock
+        """
+        stock = serializer.validated_data.pop('stock', None)
+        product = serializer.save(stock=None)
+        if stock is not None:
+            StockService.adjust(product.id, stock, user=self.request.user, notes='Stock inicial')
+            product.refresh_from_db(fields=['stock'])
+    
+    @action(detail=True, methods=['post'])
+    def restock(self, request, pk=None):
+        """
+        Ingresar mercadería
+        """
+        product = self.get_object()
+        serializer = RestockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            movement = StockService.restock(
+                product.id,
+                serializer.validated_data['quantity'],
+                user=request.user,
+                notes=serializer.validated_data['notes']
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(StockMovementSerializer(movement).data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, pk=None):
+        """
+        Ajustar el stock al valor contado en inventario
+        """
+        product = self.get_object()
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        movement = StockService.adjust(
+            product.id,
+            serializer.validated_data['stock'],
+            user=request.user,
+            notes=serializer.validated_data['notes']
+        )
+        product.refresh_from_db(fields=['stock'])
+        return Response({
+            'stock': product.stock,
+            'movement': StockMovementSerializer(movement).data if movement else None,
+        })
+    
+    @action(detail=True, methods=['get'])
+    def movements(self, request, pk=None):
+        """
+        Últimos movimientos del libro de stock del producto
+        """
+        product = self.get_object()
+        movements = product.stock_movements.all()[:100]
+        return Response(StockMovementSerializer(movements, many=True).data)
+    
+    @action(detail=False, methods=['get'], url_path='low-stock')
+    def low_stock(self, request):
+        """
+        Productos activos con stock bajo
+        Query params: threshold (por defecto LOW_STOCK_THRESHOLD)
+        """
+        threshold = request.query_params.get('threshold')
+        try:
+            threshold = int(threshold) if threshold is not None else None
+        except ValueError:
+            return Response(
+                {'error': 'threshold debe ser un número'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        products = StockService.low_stock(threshold)
+        return Response(ProductListSerializer(products, many=True).data)
 
 
 class ConsumptionViewSet(viewsets.ModelViewSet):
@@ -59,12 +150,101 @@ class ConsumptionViewSet(viewsets.ModelViewSet):
             return ConsumptionCreateSerializer
         return ConsumptionSerializer
     
+    @idempotent('consumption_create')
+    def create(self, request, *args, **kwargs):
+        """
+        Crear consumo
+        Acepta la cabecera Idempotency-Key para reintentos seguros
+        """
+        return super().create(request, *args, **kwargs)
+    
+    @transaction.atomic
     def perform_create(self, serializer):
         """
         Crear consumo con precio del producto si no se especifica
+        y descontar el stock en la misma transacción
         """
         product = serializer.validated_data.get('product')
         if 'unit_price' not in serializer.validated_data:
-            serializer.save(unit_price=product.price)
+            consumption = serializer.save(unit_price=product.price)
         else:
-            serializer.save()
+            consumption = serializer.save()
+        
+        try:
+            StockService.sell(product.id, consumption.quantity, consumption=consumption, user=self.request.user)
+        except ValueError as e:
+            raise serializers.ValidationError({'quantity': str(e)})
+    
+    @action(detail=False, methods=['post'])
+    @idempotent('consumption_batch')
+    @transaction.atomic
+    def batch(self, request):
+        """
+        Cargar varios consumos de un turno en una sola solicitud
+        Body: {"booking": id, "items": [{"product": id, "quantity": n, "unit_price": opcional}]}
+        - Valida productos y stock de todas las líneas con una consulta
+        - Inserta los consumos con bulk_create (sin una señal por fila)
+        - Descuenta el stock y recalcula el cierre una sola vez
+        """
+        serializer = ConsumptionBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        booking = serializer.validated_data['booking']
+        
+        consumptions = Consumption.objects.bulk_create([
+            Consumption(
+                booking=booking,
+                product=item['product'],
+                quantity=item['quantity'],
+                unit_price=item['unit_price'],
+                # bulk_create no llama a save(): calcular el total acá
+                total_price=item['quantity'] * item['unit_price'],
+            )
+            for item in serializer.validated_data['items']
+        ])
+        
+        try:
+            StockService.sell_many(consumptions, user=request.user)
+        except ValueError as e:
+            transaction.set_rollback(True)
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        BookingService.recalculate_consumptions_amount([booking.id])
+        
+        return Response(
+            ConsumptionSerializer(consumptions, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """
+        Si cambia el producto o la cantidad, anular la venta anterior
+        y registrar la nueva
+        """
+        previous = Consumption(
+            pk=serializer.instance.pk,
+            product_id=serializer.instance.product_id,
+            quantity=serializer.instance.quantity
+        )
+        consumption = serializer.save()
+        if (consumption.product_id, consumption.quantity) == (previous.product_id, previous.quantity):
+            return
+        
+        StockService.reverse_sale(previous, user=self.request.user)
+        try:
+            StockService.sell(
+                consumption.product_id, consumption.quantity, consumption=consumption, user=self.request.user
+            )
+        except ValueError as e:
+            raise serializers.ValidationError({'quantity': str(e)})
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Devolver el stock del consumo antes de borrarlo
+        """
+        StockService.reverse_sale(instance, user=self.request.user)
+        instance.delete()
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -17,6 +17,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -151,6 +152,75 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# =============================================================================
+# Cache compartido entre workers
+# =============================================================================
+# Throttles, cache de disponibilidad, contadores y versión de la configuración
+# de horarios usan este cache, así que tiene que ser el mismo para todos los
+# workers de gunicorn. Sin REDIS_URL se usa una tabla UNLOGGED de PostgreSQL
+# (migración bookings 0009); con REDIS_URL, Redis (requiere el paquete redis).
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'apps.bookings.cache_backend.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int),
+                # Borrado de vencidas: una de cada CULL_EVERY escrituras, en lotes
+                'CULL_EVERY': config('CACHE_CULL_EVERY', default=200, cast=int),
+                'CULL_BATCH_SIZE': 1000,
+            },
+        }
+    }
+
+# Availability cache (public slots), en segundos
+AVAILABILITY_CACHE_TIMEOUT = config('AVAILABILITY_CACHE_TIMEOUT', default=3600, cast=int)
+# Contadores de métricas (hits del cache, locks): se vuelcan al cache compartido cada N segundos
+COUNTERS_FLUSH_INTERVAL = config('COUNTERS_FLUSH_INTERVAL', default=10, cast=int)
+
+# Copia en memoria de la configuración de horarios: antigüedad máxima en segundos
+CONFIGURATION_CACHE_MAX_AGE = config('CONFIGURATION_CACHE_MAX_AGE', default=60, cast=int)
+# Segundos durante los que la copia se usa sin revalidar la versión compartida
+CONFIGURATION_CACHE_REVALIDATE = config('CONFIGURATION_CACHE_REVALIDATE', default=1, cast=float)
+
+# Stream de notificaciones (SSE): heartbeat y duración máxima de cada conexión, en segundos
+NOTIFICATIONS_STREAM_HEARTBEAT = config('NOTIFICATIONS_STREAM_HEARTBEAT', default=15, cast=int)
+NOTIFICATIONS_STREAM_MAX_SECONDS = config('NOTIFICATIONS_STREAM_MAX_SECONDS', default=300, cast=int)
+# Streams abiertos por worker: cada uno ocupa un thread de gunicorn, dejar threads libres para la API
+NOTIFICATIONS_STREAM_MAX_PER_WORKER = config('NOTIFICATIONS_STREAM_MAX_PER_WORKER', default=1, cast=int)
+
+# Canales del outbox de notificaciones (in_app, email, whatsapp), separados por coma
+NOTIFICATION_CHANNELS = config('NOTIFICATION_CHANNELS', default='in_app', cast=Csv())
+
+# Retención de notificaciones en días (manage.py prune_notifications)
+NOTIFICATIONS_READ_RETENTION_DAYS = config('NOTIFICATIONS_READ_RETENTION_DAYS', default=30, cast=int)
+NOTIFICATIONS_UNREAD_RETENTION_DAYS = config('NOTIFICATIONS_UNREAD_RETENTION_DAYS', default=90, cast=int)
+
+# Turnos fijos: semanas hacia adelante que se materializan como turnos
+RECURRING_BOOKINGS_WEEKS_AHEAD = config('RECURRING_BOOKINGS_WEEKS_AHEAD', default=8, cast=int)
+# Máximo de semanas que se pueden materializar a pedido (acción materialize)
+RECURRING_BOOKINGS_MAX_WEEKS = config('RECURRING_BOOKINGS_MAX_WEEKS', default=52, cast=int)
+
+# Minutos que se retiene un horario durante la reserva online
+SLOT_HOLD_MINUTES = config('SLOT_HOLD_MINUTES', default=10, cast=int)
+# Retenciones vigentes por cliente (IP) en la reserva online
+SLOT_HOLD_MAX_PER_CLIENT = config('SLOT_HOLD_MAX_PER_CLIENT', default=2, cast=int)
+
+# Horas que se guarda la respuesta de una clave Idempotency-Key
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+
+# Umbral por defecto para el listado de productos con stock bajo
+LOW_STOCK_THRESHOLD = config('LOW_STOCK_THRESHOLD', default=5, cast=int)
+
 # =============================================================================
 # Production Security Settings (only applied when DEBUG=False)
 # =============================================================================
@@ -22,6 +22,7 @@ urlpatterns = [
     path('api/auth/', include('apps.users.urls')),
     path('api/courts/', include('apps.courts.urls')),
     path('api/bookings/', include('apps.bookings.urls')),
+    path('api/recurring-bookings/', include('apps.bookings.urls_recurring')),
     path('api/products/', include('apps.products.urls')),
     path('api/consumptions/', include('apps.products.urls_consumptions')),
     path('api/reports/', include('apps.payments.urls')),
@@ -0,0 +1,144 @@
+import { useState, useEffect } from 'react'
+import { X, AlertCircle } from 'lucide-react'
+import { useBookingsStore } from '../store/bookingsStore'
+import { formatCurrency, formatTime } from '../utils/formatters'
+
+// Cierre de caja: cierra en una sola solicitud los turnos jugados del día,
+// cobrando el precio de la cancha en efectivo o por transferencia.
+// Los pagos divididos o con consumos se cierran desde el detalle del turno.
+function BulkCloseModal({ isOpen, onClose, bookings, courts, onSuccess }) {
+  const { bulkCloseBookings, loading, error, clearError } = useBookingsStore()
+  const [methods, setMethods] = useState({})
+  const [excluded, setExcluded] = useState({})
+  const [rowErrors, setRowErrors] = useState({})
+
+  useEffect(() => {
+    if (isOpen) {
+      clearError()
+      setMethods({})
+      setExcluded({})
+      setRowErrors({})
+    }
+  }, [isOpen, clearError])
+
+  const priceOf = (booking) => courts.find((c) => c.id === booking.court_id)?.price || 0
+
+  const selected = bookings.filter((b) => !excluded[b.id])
+  const total = selected.reduce((sum, b) => sum + parseFloat(priceOf(b)), 0)
+
+  const handleSubmit = async (e) => {
+    e.preventDefault()
+    if (selected.length === 0) return
+    try {
+      const result = await bulkCloseBookings(
+        selected.map((b) => {
+          const price = String(priceOf(b))
+          const byTransfer = methods[b.id] === 'transfer'
+          return {
+            booking_id: b.id,
+            booking_amount: price,
+            cash_amount: byTransfer ? '0' : price,
+            transfer_amount: byTransfer ? price : '0',
+          }
+        })
+      )
+      const failed = {}
+      result.results.filter((r) => !r.closed).forEach((r) => { failed[r.booking_id] = r.error })
+      setRowErrors(failed)
+      if (result.closed > 0) onSuccess()
+      if (result.failed === 0) onClose()
+    } catch (err) {
+      // Error is handled by store
+    }
+  }
+
+  if (!isOpen) return null
+
+  return (
+    <div className="fixed inset-0 bg-black/60 backdrop-blur-sm flex items-center justify-center z-50 p-3 sm:p-4">
+      <div className="bg-white rounded-xl shadow-xl max-w-2xl w-full max-h-[90vh] overflow-y-auto">
+        <div className="flex justify-between items-center p-4 sm:p-6 border-b">
+          <h2 className="text-lg sm:text-xl font-bold">Cerrar turnos de hoy</h2>
+          <button onClick={onClose} className="text-gray-400 hover:text-gray-600">
+            <X className="w-6 h-6" />
+          </button>
+        </div>
+
+        <form onSubmit={handleSubmit} className="p-4 sm:p-6 space-y-4">
+          {error && (
+            <div className="bg-red-50 border border-red-200 text-red-700 px-4 py-3 rounded-md text-sm">
+              {error}
+            </div>
+          )}
+
+          {bookings.length === 0 ? (
+            <p className="text-center py-8 text-gray-500">No hay turnos jugados pendientes de cierre</p>
+          ) : (
+            <ul className="divide-y border rounded-md">
+              {bookings.map((booking) => (
+                <li key={booking.id} className="px-3 py-2 text-sm">
+                  <div className="flex flex-wrap items-center gap-3">
+                    <input
+                      type="checkbox"
+                      checked={!excluded[booking.id]}
+                      onChange={(e) => setExcluded((prev) => ({ ...prev, [booking.id]: !e.target.checked }))}
+                      className="h-4 w-4 text-indigo-600 border-gray-300 rounded"
+                    />
+                    <span className="flex-1 min-w-[10rem]">
+                      <span className="font-medium">{formatTime(booking.start_time)}</span>
+                      {' '}{booking.court_name} &middot; {booking.customer_name || 'Sin nombre'}
+                    </span>
+                    <span className="font-medium">{formatCurrency(priceOf(booking))}</span>
+                    <select
+                      value={methods[booking.id] || 'cash'}
+                      onChange={(e) => setMethods((prev) => ({ ...prev, [booking.id]: e.target.value }))}
+                      disabled={excluded[booking.id]}
+                      className="px-2 py-1 border border-gray-300 rounded-md focus:ring-indigo-500 focus:border-indigo-500"
+                    >
+                      <option value="cash">Efectivo</option>
+                      <option value="transfer">Transferencia</option>
+                    </select>
+                  </div>
+                  {rowErrors[booking.id] && (
+                    <p className="flex items-center gap-1 mt-1 text-xs text-red-600">
+                      <AlertCircle className="w-3 h-3" />
+                      {rowErrors[booking.id]}
+                    </p>
+                  )}
+                </li>
+              ))}
+            </ul>
+          )}
+
+          <div className="bg-gray-50 p-4 rounded-md">
+            <div className="flex justify-between items-center">
+              <span className="font-medium">Total turnos ({selected.length}):</span>
+              <span className="text-xl font-bold text-primary-600">
+                {formatCurrency(total)}
+              </span>
+            </div>
+          </div>
+
+          <div className="flex justify-end space-x-3 pt-4">
+            <button
+              type="button"
+              onClick={onClose}
+              className="px-4 py-2 border border-gray-300 rounded-md text-gray-700 hover:bg-gray-50"
+            >
+              Cancelar
+            </button>
+            <button
+              type="submit"
+              disabled={loading || selected.length === 0}
+              className="px-4 py-2 bg-indigo-600 text-white rounded-md hover:bg-indigo-700 disabled:opacity-50"
+            >
+              {loading ? 'Cerrando...' : 'Cerrar Turnos'}
+            </button>
+          </div>
+        </form>
+      </div>
+    </div>
+  )
+}
+
+export default BulkCloseModal
@@ -1,24 +1,40 @@
 import { useState, useEffect } from 'react'
-import { X } from 'lucide-react'
+import { X, Plus, Trash2 } from 'lucide-react'
 import { useProductsStore } from '../store/productsStore'
 import { formatCurrency } from '../utils/formatters'
 
 function ConsumptionModal({ isOpen, onClose, booking, products, onSuccess }) {
-  const { createConsumption, loading, error, clearError } = useProductsStore()
+  const { createConsumptionsBatch, loading, error, clearError } = useProductsStore()
   
   const [formData, setFormData] = useState({
     product: '',
     quantity: 1,
     unit_price: '',
   })
+  // Líneas ya agregadas: se cargan todas juntas con el endpoint de lote
+  const [items, setItems] = useState([])
   
   const selectedProduct = products.find((p) => p.id === parseInt(formData.product))
   const calculatedPrice = selectedProduct ? selectedProduct.price : 0
-  const totalPrice = (parseFloat(formData.unit_price) || calculatedPrice) * formData.quantity
+  
+  const lineTotal = (item) => {
+    const product = products.find((p) => p.id === item.product)
+    return (parseFloat(item.unit_price) || product?.price || 0) * item.quantity
+  }
+  
+  const currentItem = () => ({
+    product: parseInt(formData.product),
+    quantity: parseInt(formData.quantity) || 1,
+    unit_price: formData.unit_price,
+  })
+  
+  const pendingItems = formData.product ? [...items, currentItem()] : items
+  const totalPrice = pendingItems.reduce((sum, item) => sum + lineTotal(item), 0)
   
   useEffect(() => {
     if (isOpen) {
       clearError()
+      setItems([])
     }
   }, [isOpen, clearError])
   
@@ -31,15 +47,25 @@ function ConsumptionModal({ isOpen, onClose, booking, products, onSuccess }) {
     }
   }, [selectedProduct])
   
+  const handleAddItem = () => {
+    if (!formData.product) return
+    setItems((prev) => [...prev, currentItem()])
+    setFormData({ product: '', quantity: 1, unit_price: '' })
+  }
+  
+  const handleRemoveItem = (index) => {
+    setItems((prev) => prev.filter((_, i) => i !== index))
+  }
+  
   const handleSubmit = async (e) => {
     e.preventDefault()
+    if (pendingItems.length === 0) return
     try {
-      await createConsumption({
-        booking: booking.id,
-        product: formData.product,
-        quantity: formData.quantity,
-        unit_price: formData.unit_price || calculatedPrice,
-      })
+      // Sin precio se usa el precio actual del producto
+      await createConsumptionsBatch(
+        booking.id,
+        pendingItems.map(({ unit_price, ...item }) => (unit_price ? { ...item, unit_price } : item))
+      )
       onSuccess()
     } catch (err) {
       // Error is handled by store
@@ -57,7 +83,7 @@ function ConsumptionModal({ isOpen, onClose, booking, products, onSuccess }) {
     <div className="fixed inset-0 bg-black/60 backdrop-blur-sm flex items-center justify-center z-[60] p-3 sm:p-4">
       <div className="bg-white rounded-xl shadow-xl max-w-md w-full max-h-[90vh] overflow-y-auto">
         <div className="flex justify-between items-center p-4 sm:p-6 border-b">
-          <h2 className="text-lg sm:text-xl font-bold">Agregar Consumo</h2>
+          <h2 className="text-lg sm:text-xl font-bold">Agregar Consumos</h2>
           <button onClick={onClose} className="text-gray-400 hover:text-gray-600">
             <X className="w-6 h-6" />
           </button>
@@ -70,15 +96,37 @@ function ConsumptionModal({ isOpen, onClose, booking, products, onSuccess }) {
             </div>
           )}
           
+          {items.length > 0 && (
+            <ul className="divide-y border rounded-md">
+              {items.map((item, index) => (
+                <li key={index} className="flex justify-between items-center px-3 py-2 text-sm">
+                  <span>
+                    {item.quantity} x {products.find((p) => p.id === item.product)?.name}
+                  </span>
+                  <span className="flex items-center gap-2">
+                    {formatCurrency(lineTotal(item))}
+                    <button
+                      type="button"
+                      onClick={() => handleRemoveItem(index)}
+                      className="text-gray-400 hover:text-red-600"
+                    >
+                      <Trash2 className="w-4 h-4" />
+                    </button>
+                  </span>
+                </li>
+              ))}
+            </ul>
+          )}
+          
           <div>
             <label className="block text-sm font-medium text-gray-700 mb-2">
-              Producto *
+              Producto {items.length === 0 && '*'}
             </label>
             <select
               name="product"
               value={formData.product}
               onChange={handleChange}
-              required
+              required={items.length === 0}
               className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-indigo-500 focus:border-indigo-500"
             >
               <option value="">Seleccionar producto</option>
@@ -125,6 +173,16 @@ function ConsumptionModal({ isOpen, onClose, booking, products, onSuccess }) {
             </p>
           </div>
           
+          <button
+            type="button"
+            onClick={handleAddItem}
+            disabled={!formData.product}
+            className="w-full flex items-center justify-center gap-2 px-4 py-2 border border-dashed border-indigo-300 text-indigo-600 rounded-md hover:bg-indigo-50 disabled:opacity-50"
+          >
+            <Plus className="w-4 h-4" />
+            Agregar otro producto
+          </button>
+          
           <div className="bg-gray-50 p-4 rounded-md">
             <div className="flex justify-between items-center">
               <span className="font-medium">Total:</span>
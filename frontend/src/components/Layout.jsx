@@ -10,18 +10,24 @@ function Layout() {
   const navigate = useNavigate()
   const { user, logout } = useAuthStore()
   const {
-    notifications, unreadCount,
-    fetchNotifications, markAsRead, markAllAsRead,
-    startPolling, stopPolling,
+    notifications, unreadCount, nextCursor,
+    fetchNotifications, fetchOlderNotifications, fetchUnreadCount, markAsRead, markAllAsRead,
+    startStream, stopStream,
   } = useNotificationsStore()
   const [mobileMenuOpen, setMobileMenuOpen] = useState(false)
   const [showNotifications, setShowNotifications] = useState(false)
   const notifRef = useRef(null)
 
   useEffect(() => {
-    startPolling()
-    return () => stopPolling()
-  }, [startPolling, stopPolling])
+    // El stream es solo para administradores (los destinatarios de las notificaciones)
+    if (user?.role !== 'admin') {
+      fetchUnreadCount()
+      fetchNotifications()
+      return undefined
+    }
+    startStream()
+    return () => stopStream()
+  }, [user?.role, startStream, stopStream, fetchUnreadCount, fetchNotifications])
 
   // Close dropdown on click outside
   useEffect(() => {
@@ -42,7 +48,7 @@ function Layout() {
   }
   
   const handleLogout = () => {
-    stopPolling()
+    stopStream()
     logout()
     navigate('/admin/login')
   }
@@ -199,6 +205,14 @@ function Layout() {
                             </div>
                           ))
                         )}
+                        {nextCursor && (
+                          <button
+                            onClick={fetchOlderNotifications}
+                            className="w-full py-2 text-xs text-indigo-600 hover:text-indigo-800 font-medium"
+                          >
+                            Ver anteriores
+                          </button>
+                        )}
                       </div>
                     </motion.div>
                   )}
@@ -20,10 +20,10 @@ const STEPS = [
 function AvailabilityView() {
   const navigate = useNavigate()
   const {
-    courts, availableSlots, currentBooking,
+    courts, availableSlots, availabilityMatrix, currentBooking,
     loading, error,
-    fetchCourts, fetchAvailableSlots, createBooking,
-    reset, clearError,
+    fetchCourts, fetchAvailableSlots, fetchAvailabilityMatrix, createBooking,
+    holdSlot, releaseHold, reset, clearError,
   } = usePublicBookingsStore()
 
   const [step, setStep] = useState(1)
@@ -36,8 +36,11 @@ function AvailabilityView() {
   })
   useEffect(() => {
     fetchCourts()
-    return () => reset()
-  }, [fetchCourts, reset])
+    return () => {
+      releaseHold()
+      reset()
+    }
+  }, [fetchCourts, releaseHold, reset])
 
   useEffect(() => {
     if (selectedDate && selectedCourt) {
@@ -49,10 +52,40 @@ function AvailabilityView() {
   const today = startOfToday()
   const dates = Array.from({ length: 14 }, (_, i) => addDays(today, i))
 
+  // Horarios libres de los 14 días (todas las canchas) en una sola request
+  useEffect(() => {
+    const from = startOfToday()
+    fetchAvailabilityMatrix(format(from, 'yyyy-MM-dd'), format(addDays(from, 13), 'yyyy-MM-dd'))
+  }, [fetchAvailabilityMatrix])
+
+  const freeSlotsByDate = {}
+  availabilityMatrix?.courts.forEach((court) => {
+    court.days.forEach((day) => {
+      freeSlotsByDate[day.date] = (freeSlotsByDate[day.date] || 0) + day.available.filter(Boolean).length
+    })
+  })
+
   const courtSlots = availableSlots.filter(
     (s) => s.court_id === selectedCourt?.id
   )
 
+  // Retener el horario mientras se completan los datos; si ya lo tomó otro, refrescar la grilla
+  const handleSelectSlot = async (slot) => {
+    clearError()
+    try {
+      await holdSlot({
+        court: selectedCourt.id,
+        date: format(selectedDate, 'yyyy-MM-dd'),
+        start_time: slot.start_time,
+        end_time: slot.end_time,
+      })
+      setSelectedSlot(slot)
+      setStep(4)
+    } catch (err) {
+      fetchAvailableSlots(format(selectedDate, 'yyyy-MM-dd'), selectedCourt.id)
+    }
+  }
+
   const handleSubmit = async () => {
     clearError()
     try {
@@ -72,6 +105,7 @@ function AvailabilityView() {
   const goBack = () => {
     clearError()
     if (step > 1 && step < 5) {
+      if (step === 4) releaseHold()
       setStep(step - 1)
     } else {
       navigate('/')
@@ -162,20 +196,25 @@ function AvailabilityView() {
                 {dates.map((date) => {
                   const isSelected = selectedDate && format(selectedDate, 'yyyy-MM-dd') === format(date, 'yyyy-MM-dd')
                   const isToday = format(date, 'yyyy-MM-dd') === format(today, 'yyyy-MM-dd')
+                  const freeSlots = freeSlotsByDate[format(date, 'yyyy-MM-dd')]
+                  const isFull = freeSlots === 0
                   return (
                     <motion.button
                       key={date.toISOString()}
                       whileHover={{ scale: 1.03 }}
                       whileTap={{ scale: 0.97 }}
+                      disabled={isFull}
                       onClick={() => {
                         setSelectedDate(date)
                         setSelectedSlot(null)
                         setStep(2)
                       }}
                       className={`p-4 rounded-xl border-2 transition-all text-center ${
-                        isSelected
-                          ? 'border-indigo-500 bg-indigo-50 shadow-lg'
-                          : 'border-gray-200 bg-white hover:border-indigo-300 hover:shadow-md'
+                        isFull
+                          ? 'border-gray-100 bg-gray-50 opacity-60 cursor-not-allowed'
+                          : isSelected
+                            ? 'border-indigo-500 bg-indigo-50 shadow-lg'
+                            : 'border-gray-200 bg-white hover:border-indigo-300 hover:shadow-md'
                       }`}
                     >
                       <p className="text-xs text-gray-500 uppercase tracking-wide">
@@ -192,6 +231,11 @@ function AvailabilityView() {
                           Hoy
                         </span>
                       )}
+                      {freeSlots !== undefined && (
+                        <p className={`mt-1 text-xs ${isFull ? 'text-gray-400' : 'text-green-600'}`}>
+                          {isFull ? 'Completo' : `${freeSlots} libres`}
+                        </p>
+                      )}
                     </motion.button>
                   )
                 })}
@@ -288,10 +332,7 @@ function AvailabilityView() {
                       <button
                         key={`${slot.start_time}-${slot.end_time}`}
                         disabled={!slot.available}
-                        onClick={() => {
-                          setSelectedSlot(slot)
-                          setStep(4)
-                        }}
+                        onClick={() => handleSelectSlot(slot)}
                         className={`p-4 rounded-xl border-2 transition-all text-center ${
                           !slot.available
                             ? 'border-gray-100 bg-gray-50 text-gray-300 cursor-not-allowed'
@@ -4,9 +4,10 @@ import { format, parse, startOfWeek, getDay, addDays, startOfDay, endOfDay } fro
 import { es } from 'date-fns/locale'
 import { useBookingsStore } from '../store/bookingsStore'
 import { useCourtsStore } from '../store/courtsStore'
-import { Plus, RefreshCw } from 'lucide-react'
+import { Plus, RefreshCw, CheckCheck } from 'lucide-react'
 import BookingModal from '../components/BookingModal'
 import BookingDetailModal from '../components/BookingDetailModal'
+import BulkCloseModal from '../components/BulkCloseModal'
 import { motion } from 'framer-motion'
 
 const locales = {
@@ -29,6 +30,7 @@ function CalendarView() {
   const [showDetailModal, setShowDetailModal] = useState(false)
   const [selectedBooking, setSelectedBooking] = useState(null)
   const [newBookingSlot, setNewBookingSlot] = useState(null)
+  const [showBulkCloseModal, setShowBulkCloseModal] = useState(false)
   
   useEffect(() => {
     fetchCourts()
@@ -68,6 +70,12 @@ function CalendarView() {
     }
   })
   
+  // Turnos de hoy ya empezados y todavía sin cerrar (cierre de caja)
+  const now = new Date()
+  const closableToday = bookings
+    .filter((b) => b.status === 'reserved' && b.date === format(now, 'yyyy-MM-dd') && b.start_time.slice(0, 5) <= format(now, 'HH:mm'))
+    .sort((a, b) => a.start_time.localeCompare(b.start_time))
+  
   const handleSelectSlot = ({ start, end }) => {
     setNewBookingSlot({ start, end })
     setShowCreateModal(true)
@@ -133,6 +141,20 @@ function CalendarView() {
             <RefreshCw className={`w-4 h-4 mr-2 ${loading ? 'animate-spin' : ''}`} />
             Actualizar
           </motion.button>
+          <motion.button
+            whileHover={{ scale: 1.05 }}
+            whileTap={{ scale: 0.95 }}
+            onClick={() => setShowBulkCloseModal(true)}
+            className="flex items-center px-4 py-2.5 bg-white border-2 border-gray-200 text-gray-700 rounded-xl hover:border-indigo-300 hover:shadow-md transition-all font-medium"
+          >
+            <CheckCheck className="w-4 h-4 mr-2" />
+            Cerrar día
+            {closableToday.length > 0 && (
+              <span className="ml-2 px-2 py-0.5 bg-indigo-100 text-indigo-700 text-xs rounded-full">
+                {closableToday.length}
+              </span>
+            )}
+          </motion.button>
           <motion.button
             whileHover={{ scale: 1.05 }}
             whileTap={{ scale: 0.95 }}
@@ -248,6 +270,16 @@ function CalendarView() {
           onUpdate={loadWeekBookings}
         />
       )}
+      
+      {showBulkCloseModal && (
+        <BulkCloseModal
+          isOpen={showBulkCloseModal}
+          onClose={() => setShowBulkCloseModal(false)}
+          bookings={closableToday}
+          courts={courts}
+          onSuccess={loadWeekBookings}
+        />
+      )}
     </div>
   )
 }
@@ -3,11 +3,12 @@ import { format } from 'date-fns'
 import { reportService } from '../services/reportService'
 import { useCourtsStore } from '../store/courtsStore'
 import { formatDate, formatTime, formatCurrency, getStatusLabel } from '../utils/formatters'
-import { Search, RefreshCw } from 'lucide-react'
+import { Search, RefreshCw, Download } from 'lucide-react'
 
 function HistoryView() {
   const { courts, fetchCourts } = useCourtsStore()
   const [history, setHistory] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   
@@ -26,18 +27,25 @@ function HistoryView() {
     loadHistory()
   }, [])
   
-  const loadHistory = async () => {
+  const buildParams = () => {
+    const params = {}
+    if (filters.date_from) params.date_from = filters.date_from
+    if (filters.date_to) params.date_to = filters.date_to
+    if (filters.court) params.court = filters.court
+    if (filters.status) params.status = filters.status
+    return params
+  }
+  
+  const loadHistory = async (cursor = null) => {
     setLoading(true)
     setError(null)
     try {
-      const params = {}
-      if (filters.date_from) params.date_from = filters.date_from
-      if (filters.date_to) params.date_to = filters.date_to
-      if (filters.court) params.court = filters.court
-      if (filters.status) params.status = filters.status
+      const params = buildParams()
+      if (cursor) params.cursor = cursor
       
       const data = await reportService.getHistory(params)
-      setHistory(data)
+      setHistory((prev) => (cursor ? [...prev, ...data.results] : data.results))
+      setNextCursor(data.next_cursor)
     } catch (err) {
       setError('Error al cargar el historial')
     } finally {
@@ -54,6 +62,21 @@ function HistoryView() {
     loadHistory()
   }
   
+  const handleExport = async () => {
+    setError(null)
+    try {
+      const blob = await reportService.exportHistory(buildParams(), 'csv')
+      const url = URL.createObjectURL(blob)
+      const link = document.createElement('a')
+      link.href = url
+      link.download = `historial_${filters.date_from || 'inicio'}_${filters.date_to || 'hoy'}.csv`
+      link.click()
+      URL.revokeObjectURL(url)
+    } catch (err) {
+      setError('Error al exportar el historial')
+    }
+  }
+  
   return (
     <div className="space-y-6">
       <div className="flex flex-col sm:flex-row sm:justify-between sm:items-center gap-4">
@@ -126,7 +149,14 @@ function HistoryView() {
           </div>
         </div>
         
-        <div className="mt-4 flex justify-end">
+        <div className="mt-4 flex justify-end gap-2">
+          <button
+            onClick={handleExport}
+            className="flex items-center px-4 py-2 border border-gray-300 text-gray-700 rounded-md hover:bg-gray-50"
+          >
+            <Download className="w-4 h-4 mr-2" />
+            Exportar CSV
+          </button>
           <button
             onClick={handleSearch}
             disabled={loading}
@@ -224,6 +254,18 @@ function HistoryView() {
             </table>
           </div>
         )}
+        
+        {nextCursor && (
+          <div className="p-4 border-t text-center">
+            <button
+              onClick={() => loadHistory(nextCursor)}
+              disabled={loading}
+              className="px-4 py-2 text-indigo-600 border border-indigo-600 rounded-md hover:bg-indigo-50 disabled:opacity-50"
+            >
+              {loading ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -127,12 +127,13 @@ function ProductsManagement() {
 }
 
 function ProductModal({ product, onClose, onSuccess }) {
-  const { createProduct, updateProduct, loading, error, clearError } = useProductsStore()
+  const { createProduct, updateProduct, adjustStock, loading, error, clearError } = useProductsStore()
+  const initialStock = product && product.stock !== null ? product.stock : ''
   const [formData, setFormData] = useState({
     name: product?.name || '',
     category: product?.category || 'beverage',
     price: product?.price || '',
-    stock: product?.stock !== null ? product.stock : '',
+    stock: initialStock,
     is_active: product?.is_active ?? true,
   })
   
@@ -143,14 +144,21 @@ function ProductModal({ product, onClose, onSuccess }) {
   const handleSubmit = async (e) => {
     e.preventDefault()
     try {
-      const data = {
-        ...formData,
-        stock: formData.stock === '' ? null : formData.stock,
-      }
+      const stock = formData.stock === '' ? null : Number(formData.stock)
       if (product) {
-        await updateProduct(product.id, data)
+        // El stock no viaja con la edición: si el usuario lo cambió, se
+        // registra como ajuste de inventario (las ventas no se pisan)
+        await updateProduct(product.id, {
+          name: formData.name,
+          category: formData.category,
+          price: formData.price,
+          is_active: formData.is_active,
+        })
+        if (String(formData.stock) !== String(initialStock)) {
+          await adjustStock(product.id, stock)
+        }
       } else {
-        await createProduct(data)
+        await createProduct({ ...formData, stock })
       }
       onSuccess()
     } catch (err) {
@@ -231,6 +239,11 @@ function ProductModal({ product, onClose, onSuccess }) {
               className="w-full px-3 py-2 border border-gray-300 rounded-md focus:ring-indigo-500 focus:border-indigo-500"
               placeholder="Dejar vacío para no controlar stock"
             />
+            {product && (
+              <p className="mt-1 text-xs text-gray-500">
+                Modificarlo registra un ajuste de inventario al valor contado
+              </p>
+            )}
           </div>
           
           <div className="flex items-center">
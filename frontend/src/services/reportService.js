@@ -21,6 +21,18 @@ export const reportService = {
     }
   },
   
+  async exportHistory(params = {}, output = 'csv') {
+    try {
+      const response = await api.get('/reports/history/export/', {
+        params: { ...params, output },
+        responseType: 'blob',
+      })
+      return response.data
+    } catch (error) {
+      throw error
+    }
+  },
+  
   async getMonthlySummary(year, month) {
     try {
       const response = await api.get('/reports/monthly-summary/', {
@@ -131,6 +131,29 @@ export const useBookingsStore = create((set, get) => ({
     }
   },
   
+  bulkCloseBookings: async (items) => {
+    set({ loading: true, error: null })
+    try {
+      const response = await api.post('/bookings/bulk-close/', { items })
+      const closedIds = new Set(
+        response.data.results.filter((r) => r.closed).map((r) => r.booking_id)
+      )
+      set((state) => ({
+        bookings: state.bookings.map((b) =>
+          closedIds.has(b.id) ? { ...b, status: 'completed', status_display: 'Jugado' } : b
+        ),
+        loading: false,
+      }))
+      return response.data
+    } catch (error) {
+      set({
+        error: error.response?.data?.error || 'Error al cerrar turnos',
+        loading: false,
+      })
+      throw error
+    }
+  },
+  
   setFilters: (filters) => {
     set({ filters })
   },
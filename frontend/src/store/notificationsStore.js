@@ -1,16 +1,35 @@
 import { create } from 'zustand'
 import api from '../utils/api'
 
+// Espera entre consultas cuando el servidor no acepta más streams
+const POLL_INTERVAL_MS = 30000
+
 export const useNotificationsStore = create((set, get) => ({
   notifications: [],
   unreadCount: 0,
+  nextCursor: null,
   loading: false,
-  pollingInterval: null,
+  streamController: null,
+  lastEventId: null,
 
   fetchNotifications: async () => {
     try {
       const response = await api.get('/notifications/')
-      set({ notifications: response.data })
+      set({ notifications: response.data.results, nextCursor: response.data.next_cursor })
+    } catch (error) {
+      // Silently fail
+    }
+  },
+
+  fetchOlderNotifications: async () => {
+    const { nextCursor } = get()
+    if (!nextCursor) return
+    try {
+      const response = await api.get('/notifications/', { params: { before: nextCursor } })
+      set((state) => ({
+        notifications: [...state.notifications, ...response.data.results],
+        nextCursor: response.data.next_cursor,
+      }))
     } catch (error) {
       // Silently fail
     }
@@ -51,23 +70,94 @@ export const useNotificationsStore = create((set, get) => ({
     }
   },
 
-  startPolling: () => {
-    const { fetchUnreadCount, fetchNotifications } = get()
-    // Fetch immediately
-    fetchUnreadCount()
-    fetchNotifications()
-    // Poll every 30 seconds
-    const interval = setInterval(() => {
-      fetchUnreadCount()
-    }, 30000)
-    set({ pollingInterval: interval })
+  startStream: () => {
+    get().stopStream()
+    const controller = new AbortController()
+    set({ streamController: controller })
+    get().fetchNotifications()
+
+    // fetch en lugar de EventSource para mandar el token en el header
+    const connect = async () => {
+      let retry = 3000
+      try {
+        const headers = {
+          Accept: 'text/event-stream',
+          Authorization: `Bearer ${localStorage.getItem('access_token')}`,
+        }
+        const { lastEventId } = get()
+        if (lastEventId) headers['Last-Event-ID'] = String(lastEventId)
+
+        const response = await fetch(`${api.defaults.baseURL}/notifications/stream/`, {
+          headers,
+          signal: controller.signal,
+        })
+        if (response.status === 401) {
+          // Pasar por axios para que el interceptor renueve el token
+          await get().fetchUnreadCount()
+        } else if (response.status === 403) {
+          // Solo los administradores reciben notificaciones
+          return
+        } else if (response.status === 503) {
+          // Sin lugar para otro stream en el servidor: consultar el contador
+          // y volver a intentar más tarde (como el polling)
+          await get().fetchUnreadCount()
+          retry = POLL_INTERVAL_MS
+        } else if (response.ok) {
+          const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+          let buffer = ''
+          while (true) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += value
+            const frames = buffer.split('\n\n')
+            buffer = frames.pop()
+            frames.forEach((frame) => {
+              const parsed = get().handleStreamFrame(frame)
+              if (parsed.retry) retry = parsed.retry
+            })
+          }
+        }
+      } catch (error) {
+        // Silently fail
+      }
+      if (!controller.signal.aborted) {
+        setTimeout(connect, retry)
+      }
+    }
+    connect()
+  },
+
+  handleStreamFrame: (frame) => {
+    const parsed = { event: 'message', data: '' }
+    frame.split('\n').forEach((line) => {
+      if (line.startsWith(':')) return
+      const index = line.indexOf(':')
+      const field = index === -1 ? line : line.slice(0, index)
+      const value = index === -1 ? '' : line.slice(index + 1).trimStart()
+      if (field === 'event') parsed.event = value
+      else if (field === 'data') parsed.data += value
+      else if (field === 'id') parsed.id = Number(value)
+      else if (field === 'retry') parsed.retry = Number(value)
+    })
+    if (!parsed.data) return parsed
+
+    const data = JSON.parse(parsed.data)
+    if (parsed.event === 'notification') {
+      set((state) => ({
+        notifications: [data, ...state.notifications.filter((n) => n.id !== data.id)],
+      }))
+    } else if (parsed.event === 'unread_count') {
+      set({ unreadCount: data.unread_count })
+    }
+    if (parsed.id) set({ lastEventId: parsed.id })
+    return parsed
   },
 
-  stopPolling: () => {
-    const { pollingInterval } = get()
-    if (pollingInterval) {
-      clearInterval(pollingInterval)
-      set({ pollingInterval: null })
+  stopStream: () => {
+    const { streamController } = get()
+    if (streamController) {
+      streamController.abort()
+      set({ streamController: null })
     }
   },
 }))
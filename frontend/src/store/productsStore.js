@@ -56,6 +56,25 @@ export const useProductsStore = create((set) => ({
     }
   },
   
+  adjustStock: async (id, stock) => {
+    set({ loading: true, error: null })
+    try {
+      await api.post(`/products/${id}/adjust/`, { stock, notes: 'Ajuste desde edición de producto' })
+      const response = await api.get(`/products/${id}/`)
+      set((state) => ({
+        products: state.products.map((p) => (p.id === id ? response.data : p)),
+        loading: false,
+      }))
+      return response.data
+    } catch (error) {
+      set({
+        error: error.response?.data?.detail || 'Error al ajustar el stock',
+        loading: false,
+      })
+      throw error
+    }
+  },
+  
   deleteProduct: async (id) => {
     set({ loading: true, error: null })
     try {
@@ -107,6 +126,24 @@ export const useProductsStore = create((set) => ({
     }
   },
   
+  createConsumptionsBatch: async (bookingId, items) => {
+    set({ loading: true, error: null })
+    try {
+      const response = await api.post('/consumptions/batch/', { booking: bookingId, items })
+      set((state) => ({
+        consumptions: [...state.consumptions, ...response.data],
+        loading: false,
+      }))
+      return response.data
+    } catch (error) {
+      set({
+        error: error.response?.data?.error || error.response?.data?.detail || 'Error al crear consumos',
+        loading: false,
+      })
+      throw error
+    }
+  },
+
   deleteConsumption: async (id) => {
     set({ loading: true, error: null })
     try {
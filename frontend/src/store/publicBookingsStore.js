@@ -14,8 +14,11 @@ const publicApi = axios.create({
 export const usePublicBookingsStore = create((set, get) => ({
   courts: [],
   availableSlots: [],
+  availabilityMatrix: null,
   slotConfig: null,
   currentBooking: null,
+  currentHold: null,
+  bookingAttemptKey: null,
   cancellationResult: null,
   verifyResult: null,
   searchResults: [],
@@ -55,13 +58,67 @@ export const usePublicBookingsStore = create((set, get) => ({
     }
   },
   
+  // Disponibilidad de un rango de fechas en una sola request (máx. 31 días)
+  fetchAvailabilityMatrix: async (dateFrom, dateTo, courtId = null) => {
+    set({ loading: true, error: null })
+    try {
+      const params = { date_from: dateFrom, date_to: dateTo }
+      if (courtId) params.court_id = courtId
+      
+      const response = await publicApi.get('/availability/', { params })
+      set({
+        availabilityMatrix: response.data,
+        slotConfig: response.data.config,
+        loading: false,
+      })
+      return response.data
+    } catch (error) {
+      set({
+        error: error.response?.data?.error || 'Error al cargar horarios',
+        loading: false,
+      })
+    }
+  },
+  
+  // Retener el horario elegido mientras el cliente completa sus datos
+  holdSlot: async (slotData) => {
+    try {
+      const response = await publicApi.post('/holds/', slotData)
+      set({ currentHold: response.data })
+      return response.data
+    } catch (error) {
+      set({ error: error.response?.data?.error || 'Este horario ya no está disponible' })
+      throw error
+    }
+  },
+  
+  releaseHold: async () => {
+    const { currentHold } = get()
+    if (!currentHold) return
+    try {
+      await publicApi.delete(`/holds/${currentHold.hold_id}/`)
+    } catch (error) {
+      // Silently fail: la retención vence sola
+    }
+    set({ currentHold: null })
+  },
+  
   createBooking: async (bookingData) => {
     set({ loading: true, error: null })
     try {
-      const response = await publicApi.post('/bookings/', bookingData)
-      set({ currentBooking: response.data, loading: false })
+      const { currentHold } = get()
+      // La misma clave en reintentos (doble tap, red inestable) evita reservas duplicadas
+      const attemptKey = get().bookingAttemptKey || crypto.randomUUID()
+      set({ bookingAttemptKey: attemptKey })
+      const payload = currentHold ? { ...bookingData, hold_id: currentHold.hold_id } : bookingData
+      const response = await publicApi.post('/bookings/', payload, {
+        headers: { 'Idempotency-Key': attemptKey },
+      })
+      set({ currentBooking: response.data, currentHold: null, bookingAttemptKey: null, loading: false })
       return response.data
     } catch (error) {
+      // Sin respuesta del servidor se conserva la clave para reintentar
+      if (error.response) set({ bookingAttemptKey: null })
       const errorMsg = error.response?.data?.error ||
                        error.response?.data?.customer_name?.[0] ||
                        error.response?.data?.customer_phone?.[0] ||